@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+
+import numpy
+from PIL import Image
+
+from inky.dither import METHODS, dither
+from inky.inky_uc8159 import Inky
+
+print("""dither-benchmark.py
+
+Time each of the built-in dithering methods with one worker process
+and with one per CPU core, at the 5.7" (600x448) and 7.3" (800x480)
+Impression resolutions.
+
+usage: ./dither-benchmark.py [--image <image_file>] [--workers <n>]
+
+- Without an image a random noise frame is used, the worst case for error diffusion.
+
+""")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--image", "-i", type=str, help="Image to dither")
+parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(), help="Worker processes for the parallel run")
+parser.add_argument("--saturation", "-s", type=float, default=0.5, help="Colour palette saturation")
+args = parser.parse_args()
+
+# Any 7-colour driver will do, it is only used for its palette
+palette = Inky(resolution=(600, 448))._palette_blend(args.saturation)[:7 * 3]
+
+for resolution in ((600, 448), (800, 480)):
+    if args.image:
+        image = Image.open(args.image).convert("RGB").resize(resolution)
+    else:
+        width, height = resolution
+        image = Image.fromarray(numpy.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=numpy.uint8))
+
+    print(f"{resolution[0]}x{resolution[1]}")
+    for method in METHODS:
+        timings = []
+        for workers in (1, args.workers):
+            # The first run builds lookup tables and starts worker processes
+            dither(image, palette, method, workers=workers)
+            t_start = time.time()
+            dither(image, palette, method, workers=workers)
+            timings.append(time.time() - t_start)
+
+        single, parallel = timings
+        print(f"  {method:>9}: {single:6.3f}s, {parallel:6.3f}s with {args.workers} workers ({single / parallel:4.1f}x)")
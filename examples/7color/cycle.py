@@ -9,9 +9,7 @@ colors = ["Black", "White", "Green", "Blue", "Red", "Yellow", "Orange"]
 
 for color in range(7):
     print("Color: {}".format(colors[color]))
-    for y in range(inky.height):
-        for x in range(inky.width):
-            inky.set_pixel(x, y, color)
+    inky.fill_rect(0, 0, inky.width, inky.height, color)
     inky.set_border(color)
     inky.show()
     time.sleep(5.0)
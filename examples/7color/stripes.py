@@ -6,10 +6,11 @@ from inky.auto import auto
 
 inky = auto(ask_user=True, verbose=True)
 
-for y in range(inky.height - 1):
-    color = y // (inky.height // 7)
-    for x in range(inky.width - 1):
-        inky.set_pixel(x, y, color * 0x11)
+stripe = inky.height // 7
+
+for color in range(8):
+    top = color * stripe
+    inky.fill_rect(0, top, inky.width - 1, min(stripe, inky.height - 1 - top), color)
 
 inky.show()
 # To simulate:
@@ -4,7 +4,7 @@ import argparse
 
 from font_hanken_grotesk import HankenGroteskBold, HankenGroteskMedium
 from font_intuitive import Intuitive
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw, ImageFont
 
 from inky.auto import auto
 
@@ -50,11 +50,6 @@ if inky_display.resolution == (250, 122):
     scale_size = 1.30
     padding = -5
 
-# Create a new canvas to draw on
-
-img = Image.new("P", inky_display.resolution)
-draw = ImageDraw.Draw(img)
-
 # Load the fonts
 
 intuitive_font = ImageFont.truetype(Intuitive, int(22 * scale_size))
@@ -70,42 +65,39 @@ name = args.name
 y_top = int(inky_display.height * (5.0 / 10.0))
 y_bottom = y_top + int(inky_display.height * (4.0 / 10.0))
 
-# Draw the red, white, and red strips
+# Draw straight into the display's buffer, in the same coordinates as set_image()
 
-for y in range(0, y_top):
-    for x in range(0, inky_display.width):
-        img.putpixel((x, y), inky_display.BLACK if inky_display.colour == "black" else inky_display.RED)
+with inky_display.canvas() as img:
+    draw = ImageDraw.Draw(img)
 
-for y in range(y_top, y_bottom):
-    for x in range(0, inky_display.width):
-        img.putpixel((x, y), inky_display.WHITE)
+    # Draw the red, white, and red strips
 
-for y in range(y_bottom, inky_display.height):
-    for x in range(0, inky_display.width):
-        img.putpixel((x, y), inky_display.BLACK if inky_display.colour == "black" else inky_display.RED)
+    strip_colour = inky_display.BLACK if inky_display.colour == "black" else inky_display.RED
+    draw.rectangle((0, 0, inky_display.width - 1, y_top - 1), fill=strip_colour)
+    draw.rectangle((0, y_top, inky_display.width - 1, y_bottom - 1), fill=inky_display.WHITE)
+    draw.rectangle((0, y_bottom, inky_display.width - 1, inky_display.height - 1), fill=strip_colour)
 
-# Calculate the positioning and draw the "Hello" text
+    # Calculate the positioning and draw the "Hello" text
 
-hello_w, hello_h = getsize(hanken_bold_font, "Hello")
-hello_x = int((inky_display.width - hello_w) / 2)
-hello_y = 0 + padding
-draw.text((hello_x, hello_y), "Hello", inky_display.WHITE, font=hanken_bold_font)
+    hello_w, hello_h = getsize(hanken_bold_font, "Hello")
+    hello_x = int((inky_display.width - hello_w) / 2)
+    hello_y = 0 + padding
+    draw.text((hello_x, hello_y), "Hello", inky_display.WHITE, font=hanken_bold_font)
 
-# Calculate the positioning and draw the "my name is" text
+    # Calculate the positioning and draw the "my name is" text
 
-mynameis_w, mynameis_h = getsize(hanken_medium_font, "my name is")
-mynameis_x = int((inky_display.width - mynameis_w) / 2)
-mynameis_y = hello_h + padding
-draw.text((mynameis_x, mynameis_y), "my name is", inky_display.WHITE, font=hanken_medium_font)
+    mynameis_w, mynameis_h = getsize(hanken_medium_font, "my name is")
+    mynameis_x = int((inky_display.width - mynameis_w) / 2)
+    mynameis_y = hello_h + padding
+    draw.text((mynameis_x, mynameis_y), "my name is", inky_display.WHITE, font=hanken_medium_font)
 
-# Calculate the positioning and draw the name text
+    # Calculate the positioning and draw the name text
 
-name_w, name_h = getsize(intuitive_font, name)
-name_x = int((inky_display.width - name_w) / 2)
-name_y = int(y_top + ((y_bottom - y_top - name_h) / 2))
-draw.text((name_x, name_y), name, inky_display.BLACK, font=intuitive_font)
+    name_w, name_h = getsize(intuitive_font, name)
+    name_x = int((inky_display.width - name_w) / 2)
+    name_y = int(y_top + ((y_bottom - y_top - name_h) / 2))
+    draw.text((name_x, name_y), name, inky_display.BLACK, font=intuitive_font)
 
 # Display the completed name badge
 
-inky_display.set_image(img)
 inky_display.show()
@@ -24,6 +24,7 @@ from .auto import auto  # noqa: F401
 # Simulators
 from .simulator import InkySimulator  # noqa: F401
 from .simple_simulator import InkySimpleSimulator  # noqa: F401
+from .headless import InkyHeadless  # noqa: F401
 
 # Import hardware-dependent modules only if on Raspberry Pi
 # and simulation is not forced
@@ -0,0 +1,40 @@
+"""Asyncio support for Inky displays."""
+import asyncio
+
+
+async def wait_for_edge(request, timeout, event_type=None):
+    """Wait for an edge event on a gpiod line request without blocking the event loop.
+
+    The request's file descriptor is registered with the running event loop,
+    which becomes readable as soon as the kernel has queued an edge event.
+    Events of other types, eg: left over from an earlier busy period, are read
+    and the wait carries on.
+
+    :param request: gpiod line request with edge detection enabled
+    :param timeout: time to wait in seconds
+    :param event_type: gpiod.EdgeEvent.Type to wait for, default: any edge
+    :return: list of edge events read from the request, or None on timeout
+
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    fd = request.fd
+
+    while True:
+        ready = loop.create_future()
+
+        def _readable(ready=ready):
+            if not ready.done():
+                ready.set_result(None)
+
+        loop.add_reader(fd, _readable)
+        try:
+            await asyncio.wait_for(ready, max(0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            loop.remove_reader(fd)
+
+        events = request.read_edge_events()
+        if event_type is None or any(event.event_type == event_type for event in events):
+            return events
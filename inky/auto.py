@@ -36,7 +36,7 @@ def auto(i2c_bus=None, ask_user=False, verbose=False, simulation=None):
     :param i2c_bus: Optional I2C bus for EEPROM detection
     :param ask_user: If True, prompt for display type if not detected
     :param verbose: If True, print verbose information
-    :param simulation: Force simulation mode (True/False) or auto-detect (None)
+    :param simulation: Force simulation mode (True/False), "headless" for a simulator with no window, "wire" to run the hardware driver against an emulated display, or auto-detect (None)
     :return: Appropriate Inky implementation
     """
     # Check for environment variable override
@@ -63,7 +63,7 @@ def auto(i2c_bus=None, ask_user=False, verbose=False, simulation=None):
                 print("Simulation mode requested")
                 
         # Default to impressions simulator if no specific type is requested
-        return create_inky("impressions", simulation=True, verbose=verbose)
+        return create_inky("impressions", simulation=simulation or True, verbose=verbose)
     
     # Try to detect display from EEPROM if using hardware
     _eeprom = eeprom.read_eeprom(i2c_bus=i2c_bus)
@@ -121,4 +121,4 @@ def auto(i2c_bus=None, ask_user=False, verbose=False, simulation=None):
         # Default to impressions simulator if in simulation mode with no detection
         if verbose:
             print("No display type specified, defaulting to impressions simulator")
-        return create_inky("impressions", simulation=True, verbose=verbose)
+        return create_inky("impressions", simulation=simulation or True, verbose=verbose)
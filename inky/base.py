@@ -1,7 +1,10 @@
 """Inky e-Ink Display Base Class."""
+import asyncio
 from abc import ABC, abstractmethod
 
-class BaseInky(ABC):
+from .draw import DrawMixin
+
+class BaseInky(DrawMixin, ABC):
     """Abstract base class for Inky e-Ink Display drivers."""
 
     # Common color constants
@@ -68,6 +71,16 @@ class BaseInky(ABC):
         """
         pass
 
+    async def show_async(self):
+        """Show buffer on display without blocking the event loop.
+
+        Drivers that can await their busy line override this, by default
+        show() is run in the event loop's executor.
+
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.show)
+
     @abstractmethod
     def setup(self):
         """Set up the display and initialize hardware."""
@@ -0,0 +1,253 @@
+"""Content-addressed cache of display buffers."""
+import collections
+import hashlib
+import json
+import os
+import threading
+
+import numpy
+
+from .lut import cache_dir
+
+# Default size limit for cached frames, enough for ~100 Impression frames
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Source digests remembered, see FrameCache.remember_source()
+MAX_SOURCES = 1024
+
+
+def image_digest(image):
+    """Return a digest of a PIL image's pixel content.
+
+    :param image: PIL image
+
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def display_params(display):
+    """Return the properties of a display that change how an image is converted for it.
+
+    :param display: Inky display driver
+
+    """
+    cls = type(display)
+    return {
+        "display": f"{cls.__module__}.{cls.__qualname__}",
+        "resolution": tuple(display.resolution),
+        "colour": getattr(display, "colour", None),
+    }
+
+
+class FrameCache:
+    """Least recently used cache of display buffers, bounded by size in bytes.
+
+    Buffers are keyed by the digest of their source image plus everything that
+    changes how it is converted, eg: display type, rotation, saturation and
+    dither method. A hit can go straight to the display's buffer, skipping all
+    image processing.
+
+    Finding a frame needs the digest of its source image. The digest loaded
+    from each source, eg: a file path and modification time, is remembered in
+    sources.json next to the frames, so frames can be found without decoding
+    the source again after a restart.
+
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialise the cache.
+
+        :param directory: directory to store frames in, default: "frames" in inky.lut.cache_dir(),
+            frames are kept in memory only if it is disabled
+        :param max_bytes: total size of cached frames to keep
+
+        """
+        if directory is None:
+            directory = cache_dir()
+            if directory is not None:
+                directory = os.path.join(directory, "frames")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        # Key to size in bytes, least recently used first
+        self._entries = collections.OrderedDict()
+        self._memory = {}
+        # Source identity to image digest, least recently used first
+        self._sources = collections.OrderedDict()
+
+        if self.directory is not None:
+            self._scan()
+            self._load_sources()
+
+    @staticmethod
+    def key(source, **params):
+        """Return the cache key for a source image and its conversion parameters.
+
+        :param source: digest of the source image, eg: from image_digest()
+        :param params: anything that changes the resulting buffer, eg: rotation=90, saturation=0.5
+
+        """
+        digest = hashlib.sha256(source.encode())
+        for name in sorted(params):
+            digest.update(f"\0{name}={params[name]!r}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached buffer for key, or None.
+
+        :param key: key from FrameCache.key()
+
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+            if self.directory is None:
+                return self._memory[key].copy()
+
+            path = self._path(key)
+            try:
+                buf = numpy.load(path)
+                # Recency survives restarts as the file's modification time
+                os.utime(path)
+            except (OSError, ValueError):
+                self._forget(key)
+                return None
+            return buf
+
+    def put(self, key, buf):
+        """Store a buffer, evicting the least recently used frames to stay within max_bytes.
+
+        :param key: key from FrameCache.key()
+        :param buf: display buffer to store
+
+        """
+        buf = numpy.array(buf, copy=True)
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+
+            if self.directory is None:
+                self._memory[key] = buf
+                size = buf.nbytes
+            else:
+                path = self._path(key)
+                temp = f"{path}.{os.getpid()}.tmp"
+                try:
+                    os.makedirs(self.directory, exist_ok=True)
+                    with open(temp, "wb") as f:
+                        numpy.save(f, buf)
+                    os.replace(temp, path)
+                    size = os.path.getsize(path)
+                except OSError:
+                    return
+
+            self._entries[key] = size
+            self.size += size
+
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                self._forget(next(iter(self._entries)))
+
+    def source_digest(self, source):
+        """Return the digest remembered for an image source, or None.
+
+        :param source: JSON serialisable identity of the source, eg: ("file", path, mtime)
+
+        """
+        with self._lock:
+            name = json.dumps(source)
+            digest = self._sources.get(name)
+            if digest is not None:
+                self._sources.move_to_end(name)
+            return digest
+
+    def remember_source(self, source, digest):
+        """Remember the digest of the image loaded from a source.
+
+        :param source: JSON serialisable identity of the source, eg: ("file", path, mtime)
+        :param digest: digest of the image, eg: from image_digest()
+
+        """
+        with self._lock:
+            name = json.dumps(source)
+            if self._sources.get(name) == digest:
+                self._sources.move_to_end(name)
+                return
+            self._sources[name] = digest
+            self._sources.move_to_end(name)
+            while len(self._sources) > MAX_SOURCES:
+                self._sources.popitem(last=False)
+            self._save_sources()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _forget(self, key):
+        self.size -= self._entries.pop(key)
+        if self.directory is None:
+            del self._memory[key]
+            return
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _scan(self):
+        """Index frames left by earlier runs, oldest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".npy")]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.size += size
+
+        # The limit may have been lowered, or frames added by another process
+        while self.size > self.max_bytes and self._entries:
+            self._forget(next(iter(self._entries)))
+
+    def _sources_path(self):
+        return os.path.join(self.directory, "sources.json")
+
+    def _load_sources(self):
+        try:
+            with open(self._sources_path()) as f:
+                sources = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(sources, list):
+            self._sources.update((name, digest) for name, digest in sources[-MAX_SOURCES:])
+
+    def _save_sources(self):
+        if self.directory is None:
+            return
+        path = self._sources_path()
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp, "w") as f:
+                json.dump(list(self._sources.items()), f)
+            os.replace(temp, path)
+        except OSError:
+            pass
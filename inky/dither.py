@@ -0,0 +1,231 @@
+"""Dithering for Inky's 7-colour displays."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from .lut import lab_lut, lookup, nearest, palette_lut
+
+# Error diffusion kernels as (row offset, column offset, weight) relative to the pixel
+# being quantized, with the sum of weights that the error is divided by.
+KERNELS = {
+    "floyd": (16, (
+        (0, 1, 7),
+        (1, -1, 3), (1, 0, 5), (1, 1, 1),
+    )),
+    "stucki": (42, (
+        (0, 1, 8), (0, 2, 4),
+        (1, -2, 2), (1, -1, 4), (1, 0, 8), (1, 1, 4), (1, 2, 2),
+        (2, -2, 1), (2, -1, 2), (2, 0, 4), (2, 1, 2), (2, 2, 1),
+    )),
+    # Atkinson diffuses only 6/8 of the error, keeping contrast in flat areas
+    "atkinson": (8, (
+        (0, 1, 1), (0, 2, 1),
+        (1, -1, 1), (1, 0, 1), (1, 1, 1),
+        (2, 0, 1),
+    )),
+}
+
+BAYER_4X4 = numpy.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+], dtype=numpy.float32)
+
+METHODS = ("none", "bayer") + tuple(KERNELS)
+
+MATCHES = ("rgb", "lab")
+
+# Rows of the band above that error diffusion runs over, and throws away, to build
+# up the error that would have reached a band's first row in a single pass
+SEAM_ROWS = 16
+
+_executor = None
+_executor_workers = 0
+
+
+def _palette_array(palette):
+    """Turn a flat [r, g, b, r, g, b...] palette list into an (n, 3) float array."""
+    return numpy.array(palette, dtype=numpy.float32).reshape((-1, 3))
+
+
+def _image_array(image, dtype=numpy.float32):
+    if hasattr(image, "convert"):
+        image = image.convert("RGB")
+    return numpy.asarray(image, dtype=dtype)[:, :, :3]
+
+
+def quantize(image, palette, lut=None):
+    """Map each pixel to the nearest palette colour, without dithering.
+
+    :param image: PIL image, or (height, width, 3) array of RGB values
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param lut: lookup table for palette from inky.lut.palette_lut(), optional
+
+    Returns a (height, width) array of palette indexes.
+
+    """
+    if lut is not None:
+        if hasattr(image, "convert"):
+            return lookup(_image_array(image, numpy.uint8), lut)
+        return lookup(numpy.asarray(image), lut)
+
+    pixels = _image_array(image)
+    height, width, _ = pixels.shape
+    return nearest(pixels.reshape((-1, 3)), _palette_array(palette)).reshape((height, width))
+
+
+def bayer(image, palette, spread=64.0, lut=None):
+    """Ordered dither using a 4x4 Bayer threshold matrix.
+
+    :param image: PIL image, or (height, width, 3) array of RGB values
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param spread: amplitude of the threshold pattern, in RGB units
+    :param lut: lookup table for palette from inky.lut.palette_lut(), optional
+
+    Returns a (height, width) array of palette indexes.
+
+    """
+    pixels = _image_array(image)
+    height, width, _ = pixels.shape
+    threshold = (BAYER_4X4 + 0.5) / 16.0 - 0.5
+    threshold = numpy.tile(threshold, ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+    pixels = pixels + threshold[:, :, None] * spread
+    return quantize(pixels, palette, lut)
+
+
+def diffuse(image, palette, kernel="floyd", lut=None):
+    """Error diffusion dither.
+
+    Error diffusion is sequential along a row, but a pixel only depends on pixels
+    to its left and on rows above it. Pixels on a slanted wavefront, x + k * y,
+    are therefore independent of each other and are quantized together, leaving
+    one vectorized step per wavefront instead of one Python step per pixel.
+
+    :param image: PIL image, or (height, width, 3) array of RGB values
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param kernel: one of "floyd", "stucki" or "atkinson"
+    :param lut: lookup table to match pixels with, eg: from inky.lut.lab_lut(), default: exact RGB distance
+
+    Returns a (height, width) array of palette indexes.
+
+    """
+    try:
+        divisor, weights = KERNELS[kernel]
+    except KeyError:
+        raise ValueError(f"Unknown dither kernel {kernel!r}, expected one of {', '.join(KERNELS)}") from None
+
+    colours = _palette_array(palette)
+    pixels = _image_array(image)
+    height, width, _ = pixels.shape
+
+    # Slope of the wavefront, every pixel that diffuses into a later row
+    # must have been quantized on an earlier step than its target
+    slope = max([1] + [-dx // dy + 1 for dy, dx, _ in weights if dy > 0 and dx < 0])
+
+    # Pad the working copy so diffused error never needs bounds checks
+    pad = max(max(abs(dx), dy) for dy, dx, _ in weights)
+    work = numpy.zeros((height + pad, width + pad * 2, 3), dtype=numpy.float32)
+    work[:height, pad:pad + width] = pixels
+    weights = [(dy, dx, numpy.float32(weight / divisor)) for dy, dx, weight in weights]
+
+    result = numpy.zeros((height, width), dtype=numpy.uint8)
+    rows = numpy.arange(height)
+
+    for step in range(width + slope * (height - 1)):
+        # Rows whose pixel on this wavefront falls inside the image
+        first = max(0, -((width - 1 - step) // slope))
+        last = min(height - 1, step // slope)
+        ys = rows[first:last + 1]
+        xs = step - slope * ys
+
+        value = numpy.clip(work[ys, xs + pad], 0, 255)
+        index = nearest(value, colours) if lut is None else lookup(value, lut)
+        result[ys, xs] = index
+        error = value - colours[index]
+
+        for dy, dx, weight in weights:
+            work[ys + dy, xs + pad + dx] += error * weight
+
+    return result
+
+
+def _apply(pixels, palette, method, lut, skip=0):
+    if method in KERNELS:
+        result = diffuse(pixels, palette, method, lut)
+    elif method == "none":
+        result = quantize(pixels, palette, lut)
+    else:
+        result = bayer(pixels, palette, lut=lut)
+    return result[skip:]
+
+
+def _pool(workers):
+    """Return a process pool with the given number of workers, reused between calls."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def _apply_bands(pixels, palette, method, lut, workers):
+    """Dither horizontal bands of the image in parallel.
+
+    Error diffusion bands start SEAM_ROWS early so their first row receives
+    error much like it would from the band above, hiding the seam.
+
+    """
+    height = pixels.shape[0]
+    # Bands start on a multiple of 4 rows to keep the Bayer pattern aligned
+    step = (-(-height // workers) + 3) // 4 * 4
+    overlap = SEAM_ROWS if method in KERNELS else 0
+
+    jobs = []
+    for start in range(0, height, step):
+        skip = min(start, overlap)
+        band = pixels[start - skip:start + step]
+        jobs.append(_pool(workers).submit(_apply, band, palette, method, lut, skip))
+
+    return numpy.concatenate([job.result() for job in jobs])
+
+
+def dither(image, palette, method="floyd", match="rgb", workers=1):
+    """Dither an image to a palette.
+
+    Matching uses lookup tables cached by inky.lut, except RGB error diffusion
+    which matches each pixel exactly so the table's rounding is not fed forward.
+
+    :param image: PIL image, or (height, width, 3) array of RGB values
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param method: one of "floyd", "stucki", "atkinson", "bayer" or "none"
+    :param match: "rgb" to match colours by RGB distance, or "lab" for perceptual CIEDE2000 matching
+    :param workers: number of processes to split the image between, None for one per CPU core
+
+    Returns a (height, width) array of palette indexes.
+
+    """
+    if match not in MATCHES:
+        raise ValueError(f"Unknown colour match {match!r}, expected one of {', '.join(MATCHES)}")
+    if method not in METHODS:
+        raise ValueError(f"Unknown dither method {method!r}, expected one of {', '.join(METHODS)}")
+
+    if method in KERNELS:
+        lut = lab_lut(palette) if match == "lab" else None
+    else:
+        lut = lab_lut(palette) if match == "lab" else palette_lut(palette)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        # Tables are sent to the workers so they are never rebuilt per process
+        lut = None if lut is None else numpy.asarray(lut)
+        return _apply_bands(_image_array(image), palette, method, lut, workers)
+
+    if method == "none":
+        # Skip the float conversion, a table lookup works on 8-bit values directly
+        return quantize(image, palette, lut)
+    return _apply(image, palette, method, lut)
@@ -0,0 +1,192 @@
+"""Array-based drawing on display buffers."""
+import contextlib
+
+import numpy
+from PIL import Image
+
+from .framebuffer import PackedFramebuffer
+
+
+class DrawMixin:
+    """Bulk drawing methods shared by every Inky driver.
+
+    Pixels are clipped to the display and colours validated for whole arrays
+    at once, with the same rules as the driver's set_pixel(): either values not
+    in _draw_colours are skipped, or values are masked with _draw_mask.
+
+    """
+
+    # Colours accepted by set_pixel(), or None to accept any value masked with _draw_mask
+    _draw_colours = None
+    _draw_mask = 0x07
+
+    def _draw_buf(self):
+        """Return the buffer to draw into."""
+        return self.buf
+
+    def _draw_values(self, values):
+        """Return (values, valid) for an array of colours, valid is None if all are."""
+        values = numpy.asarray(values)
+        if self._draw_colours is not None:
+            return values.astype(numpy.uint8), numpy.isin(values, self._draw_colours)
+        return (values & self._draw_mask).astype(numpy.uint8), None
+
+    def _clip(self, x, y, width, height):
+        """Return the part of a rectangle on the display as (x0, y0, x1, y1), or None."""
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, self.width), min(y + height, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def set_pixels(self, xs, ys, values):
+        """Set many pixels at once.
+
+        Pixels outside the display, and colours the display does not support, are skipped.
+
+        :param xs: x positions, array-like
+        :param ys: y positions, array-like
+        :param values: colour for each pixel, or one colour for all of them
+
+        """
+        xs, ys, values = numpy.broadcast_arrays(numpy.asarray(xs, dtype=numpy.intp),
+                                                numpy.asarray(ys, dtype=numpy.intp),
+                                                numpy.asarray(values))
+        xs, ys = xs.ravel(), ys.ravel()
+        values, keep = self._draw_values(values.ravel())
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        keep = inside if keep is None else keep & inside
+
+        buf = self._draw_buf()
+        if isinstance(buf, PackedFramebuffer):
+            buf.set_pixels(ys[keep], xs[keep], values[keep])
+        else:
+            buf[ys[keep], xs[keep]] = values[keep]
+
+    def fill_rect(self, x, y, width, height, v):
+        """Fill a rectangle with one colour, clipped to the display.
+
+        :param x: left edge
+        :param y: top edge
+        :param width: width in pixels
+        :param height: height in pixels
+        :param v: colour to fill with
+
+        """
+        region = self._clip(x, y, width, height)
+        value, valid = self._draw_values(v)
+        if region is None or (valid is not None and not valid):
+            return
+
+        x0, y0, x1, y1 = region
+        buf = self._draw_buf()
+        if isinstance(buf, PackedFramebuffer):
+            ys, xs = numpy.mgrid[y0:y1, x0:x1]
+            buf.set_pixels(ys.ravel(), xs.ravel(), numpy.full(xs.size, value, dtype=numpy.uint8))
+        else:
+            buf[y0:y1, x0:x1] = value
+
+    def hline(self, x, y, length, v):
+        """Draw a horizontal line, clipped to the display.
+
+        :param x: left end
+        :param y: row
+        :param length: length in pixels
+        :param v: colour to draw with
+
+        """
+        self.fill_rect(x, y, length, 1, v)
+
+    def vline(self, x, y, length, v):
+        """Draw a vertical line, clipped to the display.
+
+        :param x: column
+        :param y: top end
+        :param length: length in pixels
+        :param v: colour to draw with
+
+        """
+        self.fill_rect(x, y, 1, length, v)
+
+    def blit(self, source, x=0, y=0):
+        """Copy a 2d array of colours onto the display, clipped to its edges.
+
+        Colours the display does not support are skipped, leaving the pixel beneath.
+
+        :param source: 2d array of colours, indexed [y, x]
+        :param x: x position of the array's left edge
+        :param y: y position of the array's top edge
+
+        """
+        source = numpy.asarray(source)
+        height, width = source.shape
+        region = self._clip(x, y, width, height)
+        if region is None:
+            return
+
+        x0, y0, x1, y1 = region
+        values, valid = self._draw_values(source[y0 - y:y1 - y, x0 - x:x1 - x])
+        buf = self._draw_buf()
+        if isinstance(buf, PackedFramebuffer):
+            ys, xs = numpy.mgrid[y0:y1, x0:x1]
+            if valid is not None:
+                ys, xs, values = ys[valid], xs[valid], values[valid]
+            buf.set_pixels(ys.ravel(), xs.ravel(), values.ravel())
+        elif valid is None:
+            buf[y0:y1, x0:x1] = values
+        else:
+            buf[y0:y1, x0:x1][valid] = values[valid]
+
+    @contextlib.contextmanager
+    def canvas(self):
+        """Draw on the display buffer with PIL.
+
+        Yields a "P" mode image of palette indexes that shares memory with the
+        buffer, so drawing with PIL's ImageDraw lands straight in it with no
+        conversion or copy. Colours are not validated, draw with the display's
+        colour constants. Compact buffers, see inky.framebuffer, can not be
+        shared and are unpacked for drawing then packed again on exit.
+
+        The buffer must not be replaced, eg: by set_image(), while the canvas is open.
+
+        :Example: ::
+
+            >>> with display.canvas() as image:
+            >>>     ImageDraw.Draw(image).text((10, 10), "Hello", fill=display.BLACK)
+            >>> display.show()
+
+        """
+        buf = self._draw_buf()
+        # Some panels show a window onto the buffer, set_image() pastes there too
+        x0, y0 = getattr(self, "offset_x", 0), getattr(self, "offset_y", 0)
+        x1, y1 = x0 + self.width, y0 + self.height
+        shared = (isinstance(buf, numpy.ndarray) and buf.dtype == numpy.uint8 and buf.flags.c_contiguous
+                  and buf.flags.writeable and buf.shape[0] >= y1 and buf.shape[1] >= x1)
+
+        if shared:
+            # The image starts at the window's first pixel, with the buffer's row stride
+            stride = buf.strides[0]
+            yield self._canvas_image(buf.reshape(-1)[y0 * stride + x0:], stride)
+            return
+
+        data = numpy.array(buf, dtype=numpy.uint8)
+        region = numpy.ascontiguousarray(data[y0:y1, x0:x1])
+        yield self._canvas_image(region, region.strides[0])
+
+        data[y0:y1, x0:x1] = region
+        if isinstance(buf, PackedFramebuffer):
+            buf.pack(data)
+        else:
+            buf[y0:y1, x0:x1] = region
+
+    def _canvas_image(self, buf, stride):
+        """Return a "P" mode image sharing memory with a contiguous uint8 buffer.
+
+        :param buf: buffer starting at the image's first pixel
+        :param stride: bytes from the start of one row to the next
+
+        """
+        image = Image.frombuffer("P", (self.width, self.height), buf, "raw", "P", stride, 1)
+        # frombuffer() images are copied on the first write unless marked writable
+        image.readonly = 0
+        return image
@@ -0,0 +1,13 @@
+"""Emulated Inky displays, for running the hardware drivers with no HAT attached.
+
+Stand-ins for spidev, gpiod, gpiodevice and smbus2 feed the bytes a driver
+sends to an emulated UC8159, AC073TC1A or SSD16xx controller, which decodes
+them into RAM, holds the busy line as the panel would, and renders each
+refresh. Byte counts and bus and busy times are kept in Emulator.stats.
+
+WireSimulator renders a driver's frames from the bytes it sent, see
+create_inky(..., simulation="wire").
+"""
+from .board import PANELS, Emulator, Stats  # noqa: F401
+from .controller import AC073TC1A, UC8159, SSD16xx  # noqa: F401
+from .wire import WireSimulator  # noqa: F401
@@ -0,0 +1,265 @@
+"""An Inky display emulated behind fake SPI, GPIO and I2C buses."""
+import collections
+import sys
+
+import numpy
+from PIL import Image
+
+from ..eeprom import EEP_ADDRESS, EPDType
+from ..packing import unorient
+from ..timing import TIMINGS
+from . import bus
+from .controller import AC073TC1A, UC8159, SSD16xx
+
+RESET_PIN = 27  # PIN13
+BUSY_PIN = 17   # PIN11
+DC_PIN = 22     # PIN15
+CS0_PIN = 8
+
+# Panel geometry as seen by each driver: RAM (rows, cols) in scan order, the
+# rotation from the driver's buffer to RAM, and where the visible area sits in
+# the buffer. 7-colour controllers take their RAM size from TRES instead.
+Panel = collections.namedtuple("Panel", "controller rows cols rotation offset_x offset_y width height variants")
+
+PANELS = {
+    "phat": Panel(SSD16xx, 212, 104, -90, 0, 0, 212, 104, {"red": 1, "black": 4, "yellow": 5}),
+    "what": Panel(SSD16xx, 300, 400, 0, 0, 0, 400, 300, {"yellow": 2, "black": 3, "red": 6}),
+    "phatssd1608": Panel(SSD16xx, 250, 136, -90, 0, 6, 250, 122, {"black": 10, "red": 11, "yellow": 12}),
+    "whatssd1683": Panel(SSD16xx, 300, 400, 0, 0, 0, 400, 300, {"black": 17, "red": 18, "yellow": 19}),
+    "impressions": Panel(UC8159, 448, 600, 0, 0, 0, 600, 448, {"multi": 14}),
+    "7colour": Panel(UC8159, 448, 600, 0, 0, 0, 600, 448, {"multi": 14}),
+    "impressions73": Panel(AC073TC1A, 480, 800, 0, 0, 0, 800, 480, {"multi": 20}),
+}
+
+PALETTES = {
+    "black": [(255, 255, 255), (0, 0, 0), (0, 0, 0)],
+    "red": [(255, 255, 255), (0, 0, 0), (255, 0, 0)],
+    "yellow": [(255, 255, 255), (0, 0, 0), (255, 255, 0)],
+    "multi": [
+        (0, 0, 0),        # Black
+        (255, 255, 255),  # White
+        (0, 255, 0),      # Green
+        (0, 0, 255),      # Blue
+        (255, 0, 0),      # Red
+        (255, 255, 0),    # Yellow
+        (255, 140, 0),    # Orange
+        (255, 255, 255),  # Clean
+    ],
+}
+
+
+class Stats:
+    """Counters for the traffic an emulated display has received."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Reset every counter to zero."""
+        self.transfers = 0
+        self.bytes = 0
+        self.ignored_bytes = 0
+        # {command byte: times sent} and {command byte: data bytes sent after it}
+        self.commands = collections.Counter()
+        self.command_bytes = collections.Counter()
+        self.refreshes = 0
+        self.unpowered_refreshes = 0
+        # Time the bytes would take on the wire at the bus clock
+        self.spi_seconds = 0.0
+        # Nominal time the panel held its busy line, before time_scale
+        self.busy_seconds = 0.0
+
+    def __repr__(self):
+        commands = ", ".join(f"0x{command:02x}: {count}x {self.command_bytes[command]}B"
+                             for command, count in sorted(self.commands.items()))
+        return (f"Stats(transfers={self.transfers}, bytes={self.bytes}, refreshes={self.refreshes}, "
+                f"spi_seconds={self.spi_seconds:.3f}, busy_seconds={self.busy_seconds:.3f}, commands={{{commands}}})")
+
+
+class Emulator:
+    """An Inky display on fake SPI, GPIO and I2C buses, for running the real drivers with no HAT.
+
+    The emulated controller decodes the commands the driver sends, keeps its
+    RAM and registers, drives the busy line for resets, power changes and
+    refreshes, and renders what a refresh would have put on the panel.
+
+    :Example: ::
+
+        >>> with Emulator("impressions73", time_scale=0) as emulator:
+        >>>     display = emulator.create()
+        >>>     display.set_image(image)
+        >>>     display.show()
+        >>> emulator.image().save("screen.png")
+        >>> print(emulator.stats)
+
+    """
+
+    def __init__(self, display_type, colour=None, time_scale=1.0, cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN):
+        """Initialise the emulator.
+
+        :param display_type: display type, eg: "phat", see inky.factory.HARDWARE_DISPLAY_CLASSES
+        :param colour: "red", "black" or "yellow" for displays that need one, default: "black"
+        :param time_scale: factor applied to busy periods, 1.0 for real time or 0 to skip them
+        :param cs_pin: chip select pin
+        :param dc_pin: data/command pin
+        :param reset_pin: reset pin
+        :param busy_pin: busy pin
+
+        """
+        if display_type not in PANELS:
+            raise ValueError(f"Unknown display type: {display_type}")
+
+        self.display_type = display_type
+        self.panel = PANELS[display_type]
+        if "multi" in self.panel.variants:
+            colour = "multi"
+        elif colour is None:
+            colour = "black"
+        if colour not in self.panel.variants:
+            raise ValueError(f"Colour {colour} not supported by {display_type}")
+        self.colour = colour
+
+        self.cs_pin = cs_pin
+        self.dc_pin = dc_pin
+        self.reset_pin = reset_pin
+        self.busy_pin = busy_pin
+        self._lines = {cs_pin: True, dc_pin: False, reset_pin: True}
+
+        self.stats = Stats()
+        self.busy = bus.BusyLine(self.stats, time_scale)
+        refresh_time = TIMINGS[display_type].refresh
+        if self.panel.controller is SSD16xx:
+            self.controller = SSD16xx(self.busy, self.stats, self.panel.rows, self.panel.cols, refresh_time)
+        else:
+            self.controller = self.panel.controller(self.busy, self.stats, refresh_time)
+
+        self.eeprom_address = EEP_ADDRESS
+        eeprom_colour = "7colour" if colour == "multi" else colour
+        self.eeprom = EPDType(self.panel.width, self.panel.height, eeprom_colour, 12, self.panel.variants[colour]).encode()
+
+        self.spi = bus.SpiDev(self)
+        self.i2c = bus.SMBus(self)
+        self._saved = None
+
+    def set_line(self, offset, active):
+        """Drive a GPIO line from the host.
+
+        :param offset: line offset
+        :param active: True for high
+
+        """
+        if offset == self.reset_pin and active and not self._lines.get(offset, True):
+            # The controller comes out of reset on the rising edge
+            self.controller.reset()
+        self._lines[offset] = active
+
+    def get_line(self, offset):
+        """Return the level of a GPIO line, True for high."""
+        if offset == self.busy_pin:
+            return self.busy.busy == self.controller.busy_high
+        return self._lines.get(offset, False)
+
+    def transfer(self, data, speed_hz=0):
+        """Clock bytes out of the host over SPI.
+
+        :param data: bytes sent
+        :param speed_hz: bus clock, for the time on the wire
+
+        """
+        self.stats.transfers += 1
+        self.stats.bytes += len(data)
+        if speed_hz:
+            self.stats.spi_seconds += len(data) * 8 / speed_hz
+        if self._lines[self.cs_pin]:
+            # Chip select is active low, the controller is not listening
+            self.stats.ignored_bytes += len(data)
+            return
+        self.controller.write(self._lines[self.dc_pin], data)
+
+    def install(self):
+        """Replace the gpiod, gpiodevice, spidev and smbus2 modules with stand-ins wired to this emulator.
+
+        Drivers bind gpiod and gpiodevice when they are first imported, so a
+        driver imported before installing keeps the real modules. create()
+        wires its driver to the emulator directly, whatever it imported.
+
+        """
+        if self._saved is None:
+            modules = bus.install(self)
+            self._saved = {name: sys.modules.get(name) for name in modules}
+            sys.modules.update(modules)
+        return self
+
+    def uninstall(self):
+        """Put back the modules replaced by install()."""
+        if self._saved is not None:
+            bus.uninstall(self)
+            for name, module in self._saved.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            self._saved = None
+
+    def close(self):
+        """Uninstall the stand-in modules and stop any busy period in progress."""
+        self.uninstall()
+        self.busy.close()
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def create(self, **kwargs):
+        """Create the hardware driver for this display, installing the stand-in modules first.
+
+        :param kwargs: extra arguments for the driver, eg: compact
+
+        """
+        from ..factory import HARDWARE_DISPLAY_CLASSES, dynamic_import
+
+        self.install()
+        driver = dynamic_import(HARDWARE_DISPLAY_CLASSES[self.display_type])
+        if self.colour == "multi":
+            display = driver(**kwargs)
+        else:
+            display = driver(colour=self.colour, **kwargs)
+
+        # The driver module may have been imported before install(), and kept
+        # the real gpiod, so hand setup() lines and a bus it will not replace.
+        # Values and edges must be the ones that module compares against.
+        module = next(sys.modules[cls.__module__] for cls in type(display).__mro__
+                      if hasattr(sys.modules[cls.__module__], "Value"))
+        display._spi_bus = self.spi
+        display._gpio = bus.LineRequest(self, value=module.Value, event_type=module.gpiod.EdgeEvent.Type)
+        return display
+
+    def pixels(self, ram=False):
+        """Return the panel contents as a 2d array of palette indexes, laid out as the driver's buffer.
+
+        :param ram: decode the controller RAM instead of what was last refreshed
+
+        Returns None if the panel has not been refreshed.
+
+        """
+        pixels = self.controller.pixels(ram)
+        if pixels is None:
+            return None
+        return numpy.ascontiguousarray(unorient(pixels, rotation=self.panel.rotation))
+
+    def image(self, ram=False):
+        """Return the visible area of the panel as a "P" mode image, or None if it has not been refreshed.
+
+        :param ram: render the controller RAM instead of what was last refreshed
+
+        """
+        pixels = self.pixels(ram)
+        if pixels is None:
+            return None
+        panel = self.panel
+        pixels = pixels[panel.offset_y:panel.offset_y + panel.height, panel.offset_x:panel.offset_x + panel.width]
+        image = Image.frombytes("P", (panel.width, panel.height), pixels.tobytes())
+        image.putpalette([c for colour in PALETTES[self.colour] for c in colour])
+        return image
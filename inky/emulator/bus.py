@@ -0,0 +1,367 @@
+"""Stand-ins for the spidev, gpiod, gpiodevice and smbus2 modules, wired to an emulated display."""
+import enum
+import os
+import select
+import sys
+import threading
+import time
+import types
+from datetime import timedelta
+
+
+class Value(enum.Enum):
+    """Logical line value, as gpiod.line.Value."""
+
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class Direction(enum.Enum):
+    """Line direction, as gpiod.line.Direction."""
+
+    AS_IS = 1
+    INPUT = 2
+    OUTPUT = 3
+
+
+class Edge(enum.Enum):
+    """Edge detection setting, as gpiod.line.Edge."""
+
+    NONE = 1
+    RISING = 2
+    FALLING = 3
+    BOTH = 4
+
+
+class Bias(enum.Enum):
+    """Line bias, as gpiod.line.Bias."""
+
+    AS_IS = 1
+    UNKNOWN = 2
+    DISABLED = 3
+    PULL_UP = 4
+    PULL_DOWN = 5
+
+
+class LineSettings:
+    """Settings for a requested line, as gpiod.LineSettings. Stored, but not acted on."""
+
+    def __init__(self, direction=Direction.AS_IS, edge_detection=Edge.NONE, bias=Bias.AS_IS, active_low=False,
+                 debounce_period=timedelta(), output_value=Value.INACTIVE, **kwargs):
+        self.direction = direction
+        self.edge_detection = edge_detection
+        self.bias = bias
+        self.active_low = active_low
+        self.debounce_period = debounce_period
+        self.output_value = output_value
+
+
+class EdgeEvent:
+    """An edge on the busy line, as gpiod.EdgeEvent."""
+
+    class Type(enum.Enum):
+        RISING_EDGE = 1
+        FALLING_EDGE = 2
+
+    def __init__(self, event_type, timestamp_ns, line_offset, global_seqno, line_seqno):
+        self.event_type = event_type
+        self.timestamp_ns = timestamp_ns
+        self.line_offset = line_offset
+        self.global_seqno = global_seqno
+        self.line_seqno = line_seqno
+
+    def __repr__(self):
+        return f"EdgeEvent({self.event_type.name}, offset={self.line_offset}, seqno={self.line_seqno})"
+
+
+class BusyLine:
+    """The controller's busy output.
+
+    Each busy period ends with an edge, queued on a pipe so the line has a real
+    file descriptor that select() and event loops can wait on. Periods are
+    scaled by time_scale, 0 queues the edge straight away. The line is held
+    until the host reads the edge, as drivers sleep for fixed, unscaled times
+    before they check it and a shortened period could end before they look.
+
+    """
+
+    def __init__(self, stats, time_scale=1.0):
+        """Initialise the busy line, not busy.
+
+        :param stats: inky.emulator.Stats to add busy time to
+        :param time_scale: factor applied to every busy period, 0 to skip them
+
+        """
+        self.stats = stats
+        self.time_scale = time_scale
+        self.busy = False
+        self.edges = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+
+    @property
+    def fd(self):
+        """File descriptor that becomes readable when a busy period ends."""
+        return self._read_fd
+
+    def start(self, seconds):
+        """Hold the line busy.
+
+        :param seconds: nominal length of the busy period, before scaling
+
+        """
+        with self._lock:
+            self._cancel()
+            self.busy = True
+            self.stats.busy_seconds += seconds
+            delay = seconds * self.time_scale
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._release)
+                self._timer.daemon = True
+                self._timer.start()
+            else:
+                os.write(self._write_fd, b"\x01")
+
+    def _release(self):
+        with self._lock:
+            if self._timer is None or self._timer is not threading.current_thread():
+                return
+            self._timer = None
+            os.write(self._write_fd, b"\x01")
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._drain()
+
+    def _drain(self):
+        try:
+            return len(os.read(self._read_fd, 64))
+        except BlockingIOError:
+            return 0
+
+    def wait(self, timeout):
+        """Wait for a busy period to end, return True if it did.
+
+        :param timeout: time to wait in seconds, or None to wait forever
+
+        """
+        readable, _, _ = select.select([self._read_fd], [], [], timeout)
+        return bool(readable)
+
+    def read(self):
+        """Return the number of edges queued since the last read."""
+        with self._lock:
+            count = self._drain()
+            if count and self._timer is None:
+                self.busy = False
+            self.edges += count
+            return count
+
+    def close(self):
+        with self._lock:
+            self._cancel()
+            self.busy = False
+
+
+class LineRequest:
+    """Requested GPIO lines, as returned by gpiod.Chip.request_lines()."""
+
+    def __init__(self, emulator, config=None, value=None, event_type=None):
+        """Initialise the request.
+
+        :param emulator: inky.emulator.Emulator the lines are wired to
+        :param config: dict of {offset: LineSettings}, output values are applied
+        :param value: the driver's gpiod.line.Value, default: the one currently imported
+        :param event_type: the driver's gpiod.EdgeEvent.Type, default: the one currently imported
+
+        """
+        self._emulator = emulator
+        # Values and event types must compare equal to those the driver imported, fake or real
+        self._value = value or getattr(sys.modules.get("gpiod.line"), "Value", Value)
+        self._event_type = event_type or getattr(sys.modules.get("gpiod"), "EdgeEvent", EdgeEvent).Type
+        for offset, settings in (config or {}).items():
+            output_value = getattr(settings, "output_value", None)
+            if getattr(settings, "direction", None) is not None and settings.direction.name == "OUTPUT":
+                self.set_value(offset, output_value)
+
+    @property
+    def fd(self):
+        return self._emulator.busy.fd
+
+    def set_value(self, offset, value):
+        self._emulator.set_line(offset, value == self._value.ACTIVE)
+
+    def get_value(self, offset):
+        return self._value.ACTIVE if self._emulator.get_line(offset) else self._value.INACTIVE
+
+    def wait_edge_events(self, timeout=None):
+        if isinstance(timeout, timedelta):
+            timeout = timeout.total_seconds()
+        return self._emulator.busy.wait(timeout)
+
+    def read_edge_events(self, max_events=None):
+        emulator = self._emulator
+        event_type = self._event_type.FALLING_EDGE if emulator.controller.busy_high else self._event_type.RISING_EDGE
+        first = emulator.busy.edges
+        count = emulator.busy.read()
+        return [EdgeEvent(event_type, time.monotonic_ns(), emulator.busy_pin, first + n + 1, first + n + 1)
+                for n in range(count)]
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class Chip:
+    """GPIO chip, as returned by gpiodevice.find_chip_by_platform()."""
+
+    def __init__(self, emulator):
+        self._emulator = emulator
+
+    def line_offset_from_id(self, id):
+        return id
+
+    def request_lines(self, config, consumer=None, **kwargs):
+        return LineRequest(self._emulator, config)
+
+
+class SpiDev:
+    """SPI device, as spidev.SpiDev. Bytes written go to the emulated controller."""
+
+    def __init__(self, emulator, bus=None, device=None):
+        self._emulator = emulator
+        self.bus = bus
+        self.device = device
+        self.max_speed_hz = 0
+        self.no_cs = False
+        self.mode = 0
+
+    def open(self, bus, device):
+        self.bus = bus
+        self.device = device
+
+    def close(self):
+        pass
+
+    def _write(self, values):
+        self._emulator.transfer(bytes(values), self.max_speed_hz)
+
+    def writebytes(self, values):
+        self._write(values)
+
+    def writebytes2(self, values):
+        self._write(values)
+
+    def xfer(self, values, *args):
+        self._write(values)
+        # Nothing is clocked back, MISO reads as zeros
+        return [0] * len(values)
+
+    xfer2 = xfer
+    xfer3 = xfer
+
+
+class SMBus:
+    """I2C bus, as smbus2.SMBus, with the display's EEPROM at its usual address."""
+
+    def __init__(self, emulator, bus=None):
+        self._emulator = emulator
+        self._address = 0
+
+    def _eeprom(self, i2c_addr):
+        eeprom = self._emulator.eeprom
+        if eeprom is None or i2c_addr != self._emulator.eeprom_address:
+            raise OSError(f"No device at i2c address 0x{i2c_addr:02x}")
+        return eeprom
+
+    def write_i2c_block_data(self, i2c_addr, register, data):
+        self._eeprom(i2c_addr)
+        # The EEPROM takes a 16-bit address, the register is its high byte
+        self._address = (register << 8) | (data[0] if data else 0)
+
+    def read_i2c_block_data(self, i2c_addr, register, length):
+        eeprom = self._eeprom(i2c_addr)
+        data = list(eeprom[self._address:self._address + length])
+        return data + [0xFF] * (length - len(data))
+
+    def close(self):
+        pass
+
+
+_installed = []
+_modules = None
+
+
+def current():
+    """Return the emulator the stand-in modules are wired to, the last one installed."""
+    if not _installed:
+        raise RuntimeError("No Inky emulator is installed")
+    return _installed[-1]
+
+
+def install(emulator):
+    """Wire the stand-in modules to an emulator, return them as {module name: module}.
+
+    The same modules are returned every time, so drivers that imported them
+    for an earlier emulator talk to the newly installed one.
+
+    :param emulator: inky.emulator.Emulator to wire them to
+
+    """
+    global _modules
+    _installed.append(emulator)
+    if _modules is None:
+        _modules = _create_modules()
+    return _modules
+
+
+def uninstall(emulator):
+    """Stop routing the stand-in modules to an emulator."""
+    if emulator in _installed:
+        _installed.remove(emulator)
+
+
+def _create_modules():
+    line = types.ModuleType("gpiod.line")
+    line.Value = Value
+    line.Direction = Direction
+    line.Edge = Edge
+    line.Bias = Bias
+
+    gpiod = types.ModuleType("gpiod")
+    gpiod.line = line
+    gpiod.LineSettings = LineSettings
+    gpiod.EdgeEvent = EdgeEvent
+    gpiod.Chip = lambda path=None: Chip(current())
+
+    platform = types.ModuleType("gpiodevice.platform")
+
+    gpiodevice = types.ModuleType("gpiodevice")
+    gpiodevice.platform = platform
+    gpiodevice.friendly_errors = False
+    gpiodevice.find_chip_by_platform = lambda: Chip(current())
+    gpiodevice.check_pins_available = lambda chip, pins, fatal=True: True
+
+    spidev = types.ModuleType("spidev")
+    spidev.SpiDev = lambda bus=None, device=None: SpiDev(current(), bus, device)
+
+    smbus2 = types.ModuleType("smbus2")
+    smbus2.SMBus = lambda bus=None, force=False: SMBus(current(), bus)
+
+    return {
+        "gpiod": gpiod,
+        "gpiod.line": line,
+        "gpiodevice": gpiodevice,
+        "gpiodevice.platform": platform,
+        "spidev": spidev,
+        "smbus2": smbus2,
+    }
@@ -0,0 +1,322 @@
+"""Emulated display controllers, decoding the command streams the drivers send."""
+import struct
+from abc import ABC, abstractmethod
+
+import numpy
+
+# Palette indexes of the 2-colour (plus white) panels
+WHITE = 0
+BLACK = 1
+RED = 2
+
+
+class Controller(ABC):
+    """Display controller that receives commands and data over SPI.
+
+    A byte sent with the data/command line low is a command, bytes sent with
+    it high are that command's parameters. Parameters are collected in
+    registers, keyed by command, except for commands that write display RAM.
+
+    """
+
+    # Level of the busy line while the controller is busy
+    busy_high = True
+
+    # Nominal busy times, in seconds
+    RESET_TIME = 0.0
+    REFRESH_TIME = 0.0
+
+    def __init__(self, busy, stats, refresh_time=None):
+        """Initialise the controller.
+
+        :param busy: inky.emulator.bus.BusyLine the controller drives
+        :param stats: inky.emulator.Stats to count commands and bytes in
+        :param refresh_time: nominal time a refresh holds the busy line, default: REFRESH_TIME
+
+        """
+        self.busy = busy
+        self.stats = stats
+        self.refresh_time = self.REFRESH_TIME if refresh_time is None else refresh_time
+        self.registers = {}
+        self.command = None
+        self.asleep = False
+        self.frame = None
+
+    def reset(self):
+        """Hardware reset, registers are cleared but RAM is kept."""
+        self.registers = {}
+        self.command = None
+        self.asleep = False
+        if self.RESET_TIME:
+            self.busy.start(self.RESET_TIME)
+
+    def write(self, dc, data):
+        """Receive bytes from the SPI bus.
+
+        :param dc: state of the data/command line, True for data
+        :param data: bytes received
+
+        """
+        if self.asleep:
+            # Only a hardware reset wakes the controller from deep sleep
+            self.stats.ignored_bytes += len(data)
+            return
+
+        if not dc:
+            for command in data:
+                self.command = command
+                self.stats.commands[command] += 1
+                self._command(command)
+            return
+
+        if self.command is None:
+            self.stats.ignored_bytes += len(data)
+            return
+
+        self.stats.command_bytes[self.command] += len(data)
+        if not self._write_ram(self.command, data):
+            params = self.registers.setdefault(self.command, bytearray())
+            params.extend(data)
+            self._parameters(self.command, bytes(params))
+
+    def _command(self, command):
+        """Start a command, clearing its parameters."""
+        self.registers[command] = bytearray()
+
+    def _parameters(self, command, params):
+        """Act on the parameters received for a command so far."""
+
+    def _write_ram(self, command, data):
+        """Write data for a RAM command, return False for any other command."""
+        return False
+
+    def _refresh(self):
+        """Latch RAM onto the panel and hold busy while it refreshes."""
+        self.frame = self.ram.copy()
+        self.stats.refreshes += 1
+        self.busy.start(self.refresh_time)
+
+    @abstractmethod
+    def pixels(self, ram=False):
+        """Return the panel contents, in RAM scan order, as a 2d array of palette indexes.
+
+        :param ram: decode the controller RAM instead of what was last refreshed
+
+        Returns None if the panel has not been refreshed.
+
+        """
+
+
+class SSD16xx(Controller):
+    """Solomon SSD1675, SSD1608 and SSD1683 controllers.
+
+    Two 1-bit RAM planes, black/white written with 0x24 and red/yellow with
+    0x26, addressed in bytes across and rows down through the window set by
+    0x44/0x45 from the address counters set by 0x4E/0x4F. The waveform LUT
+    sent with 0x32 is kept in registers.
+
+    """
+
+    busy_high = True
+
+    DRIVER_CONTROL = 0x01
+    DEEP_SLEEP = 0x10
+    DATA_MODE = 0x11
+    SW_RESET = 0x12
+    MASTER_ACTIVATE = 0x20
+    WRITE_RAM = 0x24
+    WRITE_ALTRAM = 0x26
+    WRITE_LUT = 0x32
+    WRITE_BORDER = 0x3C
+    SET_RAMXPOS = 0x44
+    SET_RAMYPOS = 0x45
+    SET_RAMXCOUNT = 0x4E
+    SET_RAMYCOUNT = 0x4F
+
+    SW_RESET_TIME = 0.01
+    REFRESH_TIME = 15.0
+
+    def __init__(self, busy, stats, rows, cols, refresh_time=None):
+        """Initialise the controller.
+
+        :param busy: inky.emulator.bus.BusyLine the controller drives
+        :param stats: inky.emulator.Stats to count commands and bytes in
+        :param rows: gate lines, rows of RAM
+        :param cols: source lines, columns of RAM in pixels
+        :param refresh_time: nominal time a refresh holds the busy line, default: REFRESH_TIME
+
+        """
+        Controller.__init__(self, busy, stats, refresh_time)
+        self.rows = rows
+        self.cols = cols
+        self.ram = numpy.zeros((2, rows, cols // 8), dtype=numpy.uint8)
+        self._reset_addressing()
+
+    def _reset_addressing(self):
+        self.window = (0, self.cols // 8 - 1, 0, self.rows - 1)
+        self.x = 0
+        self.y = 0
+
+    def reset(self):
+        Controller.reset(self)
+        self._reset_addressing()
+
+    @property
+    def lut(self):
+        """The waveform LUT last sent, or None."""
+        lut = self.registers.get(self.WRITE_LUT)
+        return bytes(lut) if lut else None
+
+    def _command(self, command):
+        Controller._command(self, command)
+        if command == self.SW_RESET:
+            self.registers = {}
+            self._reset_addressing()
+            self.busy.start(self.SW_RESET_TIME)
+        elif command == self.MASTER_ACTIVATE:
+            self._refresh()
+
+    def _parameters(self, command, params):
+        if command == self.SET_RAMXPOS and len(params) >= 2:
+            self.window = (params[0], params[1]) + self.window[2:]
+        elif command == self.SET_RAMYPOS and len(params) >= 4:
+            y_start, y_end = struct.unpack("<HH", params[:4])
+            self.window = self.window[:2] + (y_start, y_end)
+        elif command == self.SET_RAMXCOUNT and len(params) >= 1:
+            self.x = params[0]
+        elif command == self.SET_RAMYCOUNT and len(params) >= 2:
+            self.y = struct.unpack("<H", params[:2])[0]
+        elif command == self.DEEP_SLEEP and len(params) >= 1:
+            self.asleep = params[0] & 0x03 != 0
+
+    def _write_ram(self, command, data):
+        if command not in (self.WRITE_RAM, self.WRITE_ALTRAM):
+            return False
+
+        # Addresses run across the window then down, data entry mode 0x03, and
+        # wrap back to its start. Anything past the edge of RAM is lost.
+        x_start, x_end, y_start, y_end = self.window
+        x_end = min(x_end, self.cols // 8 - 1)
+        y_end = min(y_end, self.rows - 1)
+        width, height = x_end - x_start + 1, y_end - y_start + 1
+        if width <= 0 or height <= 0:
+            return True
+
+        start = (self.y - y_start) * width + (self.x - x_start)
+        offsets = (start + numpy.arange(len(data))) % (width * height)
+        plane = self.ram[0 if command == self.WRITE_RAM else 1]
+        plane[y_start + offsets // width, x_start + offsets % width] = numpy.frombuffer(data, dtype=numpy.uint8)
+
+        end = (start + len(data)) % (width * height)
+        self.x, self.y = x_start + end % width, y_start + end // width
+        return True
+
+    def pixels(self, ram=False):
+        planes = self.ram if ram else self.frame
+        if planes is None:
+            return None
+        plane_a, plane_b = numpy.unpackbits(planes, axis=-1)
+        return numpy.where(plane_b, RED, numpy.where(plane_a, WHITE, BLACK)).astype(numpy.uint8)
+
+
+class UC8159(Controller):
+    """UltraChip UC8159 7-colour controller.
+
+    4 bits per pixel, two pixels to a byte, written with DTM1 (0x10) at the
+    resolution set by TRES (0x61). A refresh needs power on (PON) first. The
+    busy line is low while busy.
+
+    """
+
+    busy_high = False
+
+    POF = 0x02
+    PON = 0x04
+    DSLP = 0x07
+    DTM1 = 0x10
+    DRF = 0x12
+    TRES = 0x61
+
+    RESET_TIME = 0.05
+    POWER_ON_TIME = 0.1
+    POWER_OFF_TIME = 0.05
+    REFRESH_TIME = 27.0
+
+    def __init__(self, busy, stats, refresh_time=None):
+        """Initialise the controller.
+
+        :param busy: inky.emulator.bus.BusyLine the controller drives
+        :param stats: inky.emulator.Stats to count commands and bytes in
+        :param refresh_time: nominal time a refresh holds the busy line, default: REFRESH_TIME
+
+        """
+        Controller.__init__(self, busy, stats, refresh_time)
+        self.width = 0
+        self.height = 0
+        self.powered = False
+        self.ram = numpy.zeros(0, dtype=numpy.uint8)
+        self._offset = 0
+
+    def reset(self):
+        self.powered = False
+        Controller.reset(self)
+
+    def _command(self, command):
+        Controller._command(self, command)
+        if command == self.DTM1:
+            self._offset = 0
+        elif command == self.PON:
+            self.powered = True
+            self.busy.start(self.POWER_ON_TIME)
+        elif command == self.POF:
+            self.powered = False
+            self.busy.start(self.POWER_OFF_TIME)
+        elif command == self.DRF:
+            if not self.powered:
+                # Without power on the panel does not change
+                self.stats.unpowered_refreshes += 1
+                return
+            self._refresh()
+
+    def _parameters(self, command, params):
+        if command == self.TRES and len(params) >= 4:
+            width, height = struct.unpack(">HH", params[:4])
+            if (width, height) != (self.width, self.height):
+                self.width, self.height = width, height
+                self.ram = numpy.zeros(width * height // 2, dtype=numpy.uint8)
+        elif command == self.DSLP and len(params) >= 1:
+            self.asleep = params[0] == 0xA5
+
+    def _write_ram(self, command, data):
+        if command != self.DTM1:
+            return False
+
+        # Data past the end of RAM, or before TRES is set, is lost
+        data = numpy.frombuffer(data, dtype=numpy.uint8)[:max(self.ram.size - self._offset, 0)]
+        self.ram[self._offset:self._offset + data.size] = data
+        self._offset += data.size
+        return True
+
+    def pixels(self, ram=False):
+        data = self.ram if ram else self.frame
+        if data is None:
+            return None
+        pixels = numpy.empty(data.size * 2, dtype=numpy.uint8)
+        numpy.right_shift(data, 4, out=pixels[0::2])
+        numpy.bitwise_and(data, 0x0F, out=pixels[1::2])
+        return pixels.reshape((self.height, self.width))
+
+
+class AC073TC1A(UC8159):
+    """E Ink AC073TC1A 7.3" 7-colour controller.
+
+    Uses the UC8159 commands for resolution, data, power and refresh, with
+    its own set of init registers.
+
+    """
+
+    RESET_TIME = 0.05
+    POWER_ON_TIME = 0.15
+    POWER_OFF_TIME = 0.05
+    # The driver notes 41 seconds in testing
+    REFRESH_TIME = 41.0
@@ -0,0 +1,94 @@
+"""Wire-accurate simulation: the real driver, rendered from the bytes it sends."""
+from ..recorder import FrameRecorderMixin
+from .board import Emulator
+
+
+class WireSimulator(FrameRecorderMixin):
+    """Render a hardware driver's frames from what it sent over the emulated bus.
+
+    The simulators draw straight from the driver's buffer, so packing and bus
+    costs never show up off-device. Here the production show() packs and
+    writes the frame, the emulated controller decodes the bytes, and every
+    refresh is rendered from its RAM. Frames that differ from the buffer
+    point to a packing bug.
+
+    The driver's show() is wrapped on the instance to time it, and put back
+    by close().
+
+    :Example: ::
+
+        >>> display = create_inky("impressions73", simulation="wire")
+        >>> display.set_image(image)
+        >>> display.show()
+        >>> display.wire.image().save("screen.png")
+        >>> print(f"{display.wire.fps:.1f} frames per second", display.wire.stats)
+
+    """
+
+    def __init__(self, display, emulator, sink=None):
+        """Initialise the simulator and start rendering.
+
+        :param display: Inky display driver created against the emulator
+        :param emulator: inky.emulator.Emulator the driver is wired to
+        :param sink: directory to write each refresh to as a PNG, or a callable to pass each refresh's image to, optional
+
+        """
+        self.display = display
+        self.emulator = emulator
+        self._init_recorder(sink)
+
+        self._show = display.show
+        display.show = self._timed_show
+        display.wire = self
+
+    @property
+    def stats(self):
+        """Traffic counters from the emulator, see inky.emulator.Stats."""
+        return self.emulator.stats
+
+    def _timed_show(self, *args, **kwargs):
+        refreshes = self.emulator.stats.refreshes
+        t_start = self._frame_started()
+        self._show(*args, **kwargs)
+        self._frame_finished(t_start, shown=self.emulator.stats.refreshes != refreshes)
+
+    def pixels(self):
+        """Return the last refresh as a 2d array of palette indexes, laid out as the driver's buffer."""
+        return self.emulator.pixels()
+
+    def image(self):
+        """Return the visible area of the last refresh as a "P" mode image, or None before the first."""
+        return self.emulator.image()
+
+    def close(self):
+        """Restore the driver's show() and close the emulator."""
+        self.display.__dict__.pop("show", None)
+        self.display.__dict__.pop("wire", None)
+        self.emulator.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create(display_type, colour=None, time_scale=0, sink=None, **kwargs):
+    """Create a hardware driver wired to an emulated display, return it with a WireSimulator attached as .wire.
+
+    :param display_type: display type, eg: "phat", see inky.factory.HARDWARE_DISPLAY_CLASSES
+    :param colour: "red", "black" or "yellow" for displays that need one, default: "black"
+    :param time_scale: factor applied to the panel's busy periods, 0 to skip them or 1.0 for real time
+    :param sink: directory to write each refresh to as a PNG, or a callable to pass each refresh's image to, optional
+    :param kwargs: extra arguments for the driver, eg: compact
+
+    """
+    emulator = Emulator(display_type, colour=colour, time_scale=time_scale)
+    # The driver is handed the emulated buses, the stand-in modules are only
+    # needed while it is created
+    try:
+        display = emulator.create(**kwargs)
+    finally:
+        emulator.uninstall()
+    WireSimulator(display, emulator, sink)
+    return display
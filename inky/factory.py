@@ -3,6 +3,7 @@ import importlib
 import os
 import sys
 from .platform import should_use_hardware, get_implementation_type
+from .timing import TIMINGS
 
 # Dictionary mapping display types to their implementation classes
 HARDWARE_DISPLAY_CLASSES = {
@@ -82,6 +83,7 @@ def create_simulator_inky(display_type, colour=None, use_pygame=True, **kwargs):
     :param display_type: Type of Inky display to simulate
     :param colour: Colour capability (if applicable)
     :param use_pygame: Whether to use pygame (True) or simple PIL simulator (False)
+    :param kwargs: Extra arguments for the simulator, eg: time_warp to refresh as the display would, that many times faster than real time
     :return: Appropriate simulator Inky implementation
     """
     # Set default colour based on display type
@@ -98,7 +100,7 @@ def create_simulator_inky(display_type, colour=None, use_pygame=True, **kwargs):
     if use_pygame:
         try:
             from .simulator import InkySimulator
-            return InkySimulator(resolution=resolution, colour=colour, **kwargs)
+            return InkySimulator(resolution=resolution, colour=colour, display_type=display_type if display_type in TIMINGS else None, **kwargs)
         except ImportError as e:
             print(f"Advanced simulator not available: {e}")
             print("Falling back to simple simulator...")
@@ -112,15 +114,58 @@ def create_simulator_inky(display_type, colour=None, use_pygame=True, **kwargs):
         print(f"Simple simulator not available: {e}")
         raise ImportError("No simulator implementation available. Please check your installation.")
 
+def create_headless_inky(display_type, colour=None, **kwargs):
+    """Create a headless simulator, see inky.headless.
+
+    :param display_type: Type of Inky display to simulate
+    :param colour: Colour capability (if applicable)
+    :param kwargs: Extra arguments for InkyHeadless, eg: frames or sink
+    :return: Headless simulator Inky implementation
+    """
+    if display_type not in RESOLUTION_MAPPINGS:
+        raise ValueError(f"Unknown display type: {display_type}")
+
+    if colour is None:
+        colour = "multi" if display_type in ("impressions", "7colour", "impressions73") else "black"
+
+    resolution = kwargs.pop('resolution', None) or RESOLUTION_MAPPINGS[display_type]
+
+    from .headless import InkyHeadless
+    return InkyHeadless(resolution=resolution, colour=colour, **kwargs)
+
+def create_wire_inky(display_type, colour=None, **kwargs):
+    """Create a hardware implementation wired to an emulated display, see inky.emulator.wire.
+
+    :param display_type: Type of Inky display to simulate
+    :param colour: Colour capability (if applicable)
+    :param kwargs: Extra arguments for inky.emulator.wire.create, eg: time_scale or sink
+    :return: Hardware Inky implementation, with the simulator attached as .wire
+    """
+    if display_type not in HARDWARE_DISPLAY_CLASSES:
+        raise ValueError(f"Unknown display type: {display_type}")
+
+    from .emulator import wire
+    return wire.create(display_type, colour, **kwargs)
+
 def create_inky(display_type, colour=None, simulation=None, verbose=False, **kwargs):
     """Create appropriate Inky implementation based on platform and settings.
     
     :param display_type: Type of Inky display
     :param colour: Colour capability (if applicable)
-    :param simulation: Force simulation mode (True/False), or auto-detect (None)
+    :param simulation: Force simulation mode (True/False), "headless" for a simulator with no window, "wire" to run the hardware driver against an emulated display, or auto-detect (None)
     :param verbose: Print verbose information
     :return: Appropriate Inky implementation
     """
+    if simulation == "headless":
+        if verbose:
+            print(f"Creating headless simulator for {display_type} ({colour})")
+        return create_headless_inky(display_type, colour, **kwargs)
+
+    if simulation == "wire":
+        if verbose:
+            print(f"Creating wire simulator for {display_type} ({colour})")
+        return create_wire_inky(display_type, colour, **kwargs)
+
     # Determine if we should use hardware or simulator
     use_hardware = should_use_hardware()
     
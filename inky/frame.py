@@ -0,0 +1,132 @@
+"""Compiled frames and the .inkyframe file format."""
+import json
+import mmap
+import struct
+import zlib
+
+import numpy
+
+MAGIC = b"INKYFRM\x00"
+VERSION = 1
+
+# Magic, format version and the length of the JSON header that follows
+_PREAMBLE = struct.Struct("<8sHI")
+
+
+def driver_name(display):
+    """Return the name a compiled frame uses to identify the driver it was made for.
+
+    :param display: Inky display driver
+
+    """
+    cls = type(display)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class CompiledFrame:
+    """Display data packed and ready to send, exactly as it goes over SPI.
+
+    Frames are made by a driver's compile() method and shown with its
+    show_frame() method, skipping flip, rotate and pack work. They can be saved
+    to an .inkyframe file and loaded back, memory-mapped, in another process.
+
+    """
+
+    def __init__(self, driver, resolution, colour, border, planes, checksum=None):
+        """Initialise a compiled frame.
+
+        :param driver: name of the driver the frame was compiled by, see driver_name()
+        :param resolution: (width, height) of the display
+        :param colour: colour of the display
+        :param border: border colour
+        :param planes: packed data for each RAM write, in the order they are written
+        :param checksum: CRC32 of the planes, calculated if not given
+
+        """
+        self.driver = driver
+        self.resolution = tuple(resolution)
+        self.colour = colour
+        self.border = border
+        self.planes = tuple(numpy.frombuffer(plane, dtype=numpy.uint8) for plane in planes)
+        self.checksum = self._crc32() if checksum is None else checksum
+        self._mmap = None
+
+    def _crc32(self):
+        crc = 0
+        for plane in self.planes:
+            crc = zlib.crc32(plane, crc)
+        return crc
+
+    def verify(self):
+        """Raise a ValueError if the frame data does not match its checksum."""
+        if self._crc32() != self.checksum:
+            raise ValueError("Frame data does not match its checksum")
+
+    def check(self, display):
+        """Raise a ValueError if the frame was not compiled for this display.
+
+        :param display: Inky display driver
+
+        """
+        if self.driver != driver_name(display) or self.resolution != tuple(display.resolution) or self.colour != display.colour:
+            raise ValueError(f"Frame compiled for {self.driver} {self.resolution[0]}x{self.resolution[1]} ({self.colour}), "
+                             f"not {driver_name(display)} {display.width}x{display.height} ({display.colour})")
+
+    def save(self, path):
+        """Save the frame to an .inkyframe file.
+
+        :param path: file to write
+
+        """
+        header = json.dumps({
+            "driver": self.driver,
+            "resolution": list(self.resolution),
+            "colour": self.colour,
+            "border": self.border,
+            "planes": [len(plane) for plane in self.planes],
+            "crc32": self.checksum,
+        }).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.writelines(plane.tobytes() for plane in self.planes)
+
+    @classmethod
+    def load(cls, path, verify=True):
+        """Load a frame from an .inkyframe file.
+
+        The file is memory-mapped and the planes are views of it, so data is
+        only read from disk as it is sent to the display.
+
+        :param path: file to read
+        :param verify: check the frame data against its checksum
+
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, length = _PREAMBLE.unpack_from(data)
+        except struct.error:
+            raise ValueError(f"{path} is not an Inky frame") from None
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Inky frame")
+        if version != VERSION:
+            raise ValueError(f"{path} is an Inky frame version {version}, expected {VERSION}")
+
+        offset = _PREAMBLE.size + length
+        header = json.loads(bytes(data[_PREAMBLE.size:offset]).decode("utf-8"))
+
+        planes = []
+        for size in header["planes"]:
+            if offset + size > len(data):
+                raise ValueError(f"{path} is truncated")
+            planes.append(memoryview(data)[offset:offset + size])
+            offset += size
+
+        frame = cls(header["driver"], header["resolution"], header["colour"], header["border"], planes, header["crc32"])
+        # Keep the mapping alive as long as the planes that view it
+        frame._mmap = data
+        if verify:
+            frame.verify()
+        return frame
@@ -0,0 +1,287 @@
+"""Display buffers kept packed at the display's native bit depth."""
+from abc import ABC, abstractmethod
+
+import numpy
+
+from .packing import BitPlanePacker, NibblePacker, orient_index, unorient
+
+
+class PackedFramebuffer(ABC):
+    """Display buffer stored in the display's wire format.
+
+    Pixels are packed at the bit depth the display uses, in the order it scans
+    them, so showing the buffer sends it as-is with no packing step. Single
+    pixels are read and written with buf[y, x], which maps coordinates through
+    the display's flips and rotation. Anything else, eg: slices, unpacks the
+    buffer to a regular array, and writes repack it, so they briefly take the
+    memory of a regular buffer again. The packer's scratch buffers are freed
+    after each repack, only the packed planes are kept.
+
+    """
+
+    def __init__(self, packer):
+        """Initialise the buffer, cleared to zero.
+
+        :param packer: inky.packing packer for the display's format and orientation
+
+        """
+        self.packer = packer
+        self.shape = packer.key[0]
+        self.ndim = 2
+        self.dtype = numpy.dtype(numpy.uint8)
+        self.fill(0)
+
+    @property
+    def planes(self):
+        """The packed data, exactly as it is written to the display."""
+        return self.packer.planes
+
+    @property
+    def nbytes(self):
+        return sum(plane.nbytes for plane in self.planes)
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    def _index(self, key):
+        """Return the position of pixel key = (y, x) in display scan order, flattened."""
+        y, x = key
+        height, width = self.shape
+        if y < 0:
+            y += height
+        if x < 0:
+            x += width
+        if not (0 <= y < height and 0 <= x < width):
+            raise IndexError(f"Pixel ({x}, {y}) is outside the {width}x{height} buffer")
+        packer = self.packer
+        row, col = orient_index(self.shape, y, x, packer.v_flip, packer.h_flip, packer.rotation)
+        return row * packer.shape[1] + col
+
+    def _is_pixel(self, key):
+        return isinstance(key, tuple) and len(key) == 2 and all(isinstance(i, (int, numpy.integer)) for i in key)
+
+    def __getitem__(self, key):
+        if self._is_pixel(key):
+            return self.get_pixel(self._index(key))
+        return self.unpack()[key]
+
+    def __setitem__(self, key, value):
+        if self._is_pixel(key):
+            self.set_pixel(self._index(key), int(value))
+            return
+        buf = self.unpack()
+        buf[key] = value
+        self.pack(buf)
+
+    def __array__(self, dtype=None, copy=None):
+        buf = self.unpack()
+        return buf if dtype is None else buf.astype(dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def set_pixels(self, ys, xs, values):
+        """Set many pixels at once.
+
+        :param ys: rows, all on the buffer
+        :param xs: columns, all on the buffer
+        :param values: value for each pixel
+
+        """
+        packer = self.packer
+        ys = numpy.asarray(ys, dtype=numpy.intp)
+        xs = numpy.asarray(xs, dtype=numpy.intp)
+        rows, cols = orient_index(self.shape, ys, xs, packer.v_flip, packer.h_flip, packer.rotation)
+        self.set_indexes(rows * packer.shape[1] + cols, numpy.asarray(values, dtype=numpy.uint8))
+
+    def pack(self, buf):
+        """Replace the buffer contents with a regular array of palette indexes.
+
+        :param buf: 2d array of palette indexes, the shape of this buffer
+
+        """
+        self.packer.pack(numpy.asarray(buf))
+        self.packer.release()
+
+    def reorient(self, v_flip, h_flip, rotation):
+        """Repack the buffer if the display's flips or rotation have changed.
+
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+
+        """
+        if self.packer.matches(self, v_flip, h_flip, rotation):
+            return
+        buf = self.unpack()
+        self.packer = self._packer(v_flip, h_flip, rotation)
+        self.pack(buf)
+
+    @abstractmethod
+    def unpack(self):
+        """Return the buffer as a regular array of palette indexes."""
+
+    @abstractmethod
+    def fill(self, value):
+        """Set every pixel to one value.
+
+        :param value: palette index
+
+        """
+
+    @abstractmethod
+    def get_pixel(self, index):
+        """Return the pixel at a position in display scan order, flattened."""
+
+    @abstractmethod
+    def set_pixel(self, index, value):
+        """Set the pixel at a position in display scan order, flattened."""
+
+    @abstractmethod
+    def set_indexes(self, indexes, values):
+        """Set the pixels at an array of positions in display scan order."""
+
+    @abstractmethod
+    def _packer(self, v_flip, h_flip, rotation):
+        """Return a packer for this buffer's format in the given orientation."""
+
+
+class BitPlaneFramebuffer(PackedFramebuffer):
+    """Buffer for the Inky pHAT and wHAT, two bits per pixel in separate planes.
+
+    The first plane has a bit set for every pixel that is not black, the second
+    for every red/yellow pixel. The planes take a quarter of the memory of one
+    byte per pixel.
+
+    """
+
+    def __init__(self, shape, v_flip=False, h_flip=False, rotation=0, white=0, black=1, red=2):
+        """Initialise the buffer.
+
+        :param shape: (rows, columns) of the buffer
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+        :param white: palette index of white
+        :param black: palette index of black
+        :param red: palette index of red/yellow
+
+        """
+        self.white = white
+        self.black = black
+        self.red = red
+        PackedFramebuffer.__init__(self, BitPlanePacker(shape, v_flip, h_flip, rotation, black=black, red=red))
+
+    def _packer(self, v_flip, h_flip, rotation):
+        return BitPlanePacker(self.shape, v_flip, h_flip, rotation, black=self.black, red=self.red)
+
+    def get_pixel(self, index):
+        mask = 0x80 >> (index & 7)
+        plane_a, plane_b = self.planes
+        if plane_b[index >> 3] & mask:
+            return self.red
+        if plane_a[index >> 3] & mask:
+            return self.white
+        return self.black
+
+    def set_pixel(self, index, value):
+        mask = 0x80 >> (index & 7)
+        for plane, bit in zip(self.planes, (value != self.black, value == self.red)):
+            if bit:
+                plane[index >> 3] |= mask
+            else:
+                plane[index >> 3] &= ~mask & 0xFF
+
+    def set_indexes(self, indexes, values):
+        """Set the pixels at an array of positions in display scan order."""
+        not_black = (values != self.black).astype(numpy.uint8)
+        red = (values == self.red).astype(numpy.uint8)
+        # Pixels that share a byte are set in separate passes, one per bit
+        for bit in range(8):
+            selected = (indexes & 7) == bit
+            if not selected.any():
+                continue
+            byte = indexes[selected] >> 3
+            mask = 0x80 >> bit
+            for plane, on in zip(self.planes, (not_black[selected], red[selected])):
+                plane[byte] = (plane[byte] & (~mask & 0xFF)) | (on * mask)
+
+    def fill(self, value):
+        size = self.size
+        for plane, bit in zip(self.planes, (value != self.black, value == self.red)):
+            plane.fill(0xFF if bit else 0x00)
+            # Bits past the last pixel are left clear, as numpy.packbits() does
+            if size % 8:
+                plane[-1] &= (0xFF << (8 - size % 8)) & 0xFF
+
+    def unpack(self):
+        """Return the buffer as a regular array of palette indexes."""
+        size = self.size
+        plane_a, plane_b = (numpy.unpackbits(plane)[:size].reshape(self.packer.shape) for plane in self.planes)
+        buf = numpy.where(plane_b, self.red, numpy.where(plane_a, self.white, self.black)).astype(numpy.uint8)
+        packer = self.packer
+        return numpy.ascontiguousarray(unorient(buf, packer.v_flip, packer.h_flip, packer.rotation))
+
+
+class NibbleFramebuffer(PackedFramebuffer):
+    """Buffer for the 7-colour Inky Impressions, two pixels per byte.
+
+    The plane takes half the memory of one byte per pixel. Values in remap are
+    replaced as pixels are written, so they read back as their replacement.
+
+    """
+
+    def __init__(self, shape, v_flip=False, h_flip=False, rotation=0, remap=None):
+        """Initialise the buffer.
+
+        :param shape: (rows, columns) of the buffer
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+        :param remap: dict of {pixel value: value to store}, eg: {7: 1}
+
+        """
+        self.remap = dict(remap or {})
+        PackedFramebuffer.__init__(self, NibblePacker(shape, v_flip, h_flip, rotation, remap=self.remap))
+
+    def _packer(self, v_flip, h_flip, rotation):
+        return NibblePacker(self.shape, v_flip, h_flip, rotation, remap=self.remap)
+
+    def get_pixel(self, index):
+        byte = self.planes[0][index >> 1]
+        return int(byte & 0x0F) if index & 1 else int(byte >> 4)
+
+    def set_pixel(self, index, value):
+        value = self.remap.get(value, value) & 0x0F
+        (plane,) = self.planes
+        if index & 1:
+            plane[index >> 1] = (plane[index >> 1] & 0xF0) | value
+        else:
+            plane[index >> 1] = (plane[index >> 1] & 0x0F) | (value << 4)
+
+    def set_indexes(self, indexes, values):
+        """Set the pixels at an array of positions in display scan order."""
+        for value, replacement in self.remap.items():
+            values = numpy.where(values == value, replacement, values)
+        values = (values & 0x0F).astype(numpy.uint8)
+        (plane,) = self.planes
+        odd = (indexes & 1).astype(bool)
+        byte = indexes[odd] >> 1
+        plane[byte] = (plane[byte] & 0xF0) | values[odd]
+        byte = indexes[~odd] >> 1
+        plane[byte] = (plane[byte] & 0x0F) | (values[~odd] << 4)
+
+    def fill(self, value):
+        value = self.remap.get(value, value) & 0x0F
+        self.planes[0].fill((value << 4) | value)
+
+    def unpack(self):
+        """Return the buffer as a regular array of palette indexes."""
+        (plane,) = self.planes
+        buf = numpy.empty(plane.size * 2, dtype=numpy.uint8)
+        numpy.right_shift(plane, 4, out=buf[0::2])
+        numpy.bitwise_and(plane, 0x0F, out=buf[1::2])
+        packer = self.packer
+        buf = buf.reshape(packer.shape)
+        return numpy.ascontiguousarray(unorient(buf, packer.v_flip, packer.h_flip, packer.rotation))
@@ -0,0 +1,148 @@
+"""Headless simulator for Inky displays, for tests, CI and batch rendering."""
+import numpy
+from PIL import Image
+
+from .base import BaseInky
+from .dither import dither as dither_image
+from .packing import orient
+from .recorder import FrameRecorderMixin
+
+DESATURATED_PALETTE = [
+    [0, 0, 0],        # Black
+    [255, 255, 255],  # White
+    [0, 255, 0],      # Green
+    [0, 0, 255],      # Blue
+    [255, 0, 0],      # Red
+    [255, 255, 0],    # Yellow
+    [255, 140, 0],    # Orange
+    [255, 255, 255]   # Clear
+]
+
+
+class InkyHeadless(FrameRecorderMixin, BaseInky):
+    """Simulator that renders frames to memory, and optionally PNG files, with no window or delay.
+
+    Each show() copies the buffer, flipped and rotated as a display would be,
+    into a ring buffer that keeps the most recent frames. Frames can also be
+    written to a directory as PNG files, or passed to a callable.
+
+    :Example: ::
+
+        >>> display = create_inky("impressions", simulation="headless", frames=4)
+        >>> display.set_image(image)
+        >>> display.show()
+        >>> display.image().save("frame.png")
+        >>> print(f"{display.fps:.0f} frames per second")
+
+    """
+
+    def __init__(self, resolution=(600, 448), colour="multi", frames=16, sink=None, **kwargs):
+        """Initialise a headless simulator.
+
+        :param resolution: (width, height) in pixels
+        :param colour: display colour, "multi", "red", "black" or "yellow"
+        :param frames: number of recent frames to keep in memory
+        :param sink: directory to write each frame to as a PNG, or a callable to pass each frame's image to, optional
+
+        """
+        if frames < 1:
+            raise ValueError(f"frames must be at least 1, not {frames}")
+        super().__init__(resolution, colour, **kwargs)
+
+        self.buf = numpy.zeros((self.height, self.width), dtype=numpy.uint8)
+        # Frames are stored in display orientation, a quarter turn swaps width and height
+        shape = orient(self.buf, self.v_flip, self.h_flip, self.rotation).shape
+        self._ring = numpy.zeros((frames,) + shape, dtype=numpy.uint8)
+        self._init_recorder(sink)
+
+    @property
+    def frames(self):
+        """The frames kept in memory, oldest first, as 2d arrays of palette indexes."""
+        count = min(self.frames_shown, len(self._ring))
+        return [self._ring[(self.frames_shown - count + i) % len(self._ring)] for i in range(count)]
+
+    def set_pixel(self, x, y, v):
+        """Set a single pixel.
+
+        :param x: x position on display
+        :param y: y position on display
+        :param v: colour to set
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.buf[y][x] = v & 0x07
+
+    def set_image(self, image, saturation=0.5, dither=None, match="rgb", workers=1):
+        """Copy an image to the display.
+
+        :param image: PIL image to display
+        :param saturation: Saturation for 7-color displays
+        :param dither: Dithering method for RGB images, one of "floyd", "stucki", "atkinson", "bayer" or "none", default: PIL's Floyd-Steinberg
+        :param match: Colour matching, "rgb" distance or "lab" for perceptual CIEDE2000 matching, "lab" maps each pixel to its nearest colour unless dither is given
+        :param workers: Number of processes to dither with, None for one per CPU core
+        """
+        if image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height))
+
+        if image.mode != "P" and (dither is not None or match != "rgb" or workers != 1):
+            if dither is None:
+                dither = "none" if match == "lab" else "floyd"
+            self.buf = dither_image(image, self._image_palette(), dither, match, workers)
+            return
+        if image.mode != "P":
+            palette = self._image_palette()
+            palette_image = Image.new("P", (1, 1))
+            palette_image.putpalette(palette + [0, 0, 0] * (256 - len(palette) // 3))
+            image.load()
+            image = image.im.convert("P", True, palette_image.im)
+
+        self.buf = numpy.array(image, dtype=numpy.uint8).reshape((self.height, self.width))
+
+    def set_border(self, colour):
+        """Set the border colour.
+
+        :param colour: The border colour.
+        """
+        self.border_colour = colour
+
+    def setup(self):
+        """Set up the display (not needed for simulator)."""
+
+    def show(self, busy_wait=True):
+        """Render the buffer to the next frame.
+
+        :param busy_wait: Ignored, frames are rendered immediately.
+        """
+        t_start = self._frame_started()
+        frame = self._ring[self.frames_shown % len(self._ring)]
+        numpy.copyto(frame, orient(self.buf, self.v_flip, self.h_flip, self.rotation), casting="unsafe")
+        self._frame_finished(t_start)
+
+    def _image_palette(self):
+        """Return the palette RGB images are dithered to, as a flat list."""
+        if self.colour == "multi":
+            return [c for colour in DESATURATED_PALETTE[:7] for c in colour]
+        if self.colour == "red":
+            return [255, 255, 255, 0, 0, 0, 255, 0, 0]
+        if self.colour == "yellow":
+            return [255, 255, 255, 0, 0, 0, 255, 255, 0]
+        return [255, 255, 255, 0, 0, 0]
+
+    def image(self, index=-1):
+        """Return a frame as a "P" mode image, or None before the first show().
+
+        :param index: index into frames, default: the last frame shown
+
+        """
+        if self.frames_shown == 0:
+            return None
+        frame = self.frames[index]
+        image = Image.frombytes("P", (frame.shape[1], frame.shape[0]), frame.tobytes())
+        # Frames are rendered with clean, which images are not dithered to, as white
+        image.putpalette([c for colour in DESATURATED_PALETTE for c in colour] if self.colour == "multi" else self._image_palette())
+        return image
+
+    def wait_for_window_close(self):
+        """Return immediately, there is no window."""
+
+    def register_button_handler(self, button, handler):
+        """Register a handler for button presses, which never happen without a window."""
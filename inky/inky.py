@@ -1,4 +1,6 @@
 """Inky e-Ink Display Driver."""
+import asyncio
+import hashlib
 import struct
 import time
 import warnings
@@ -10,7 +12,11 @@ import numpy
 from gpiod.line import Bias, Direction, Edge, Value
 from PIL import Image
 
-from . import eeprom
+from . import aio, eeprom
+from .draw import DrawMixin
+from .frame import CompiledFrame, driver_name
+from .framebuffer import BitPlaneFramebuffer
+from .packing import BitPlanePacker
 
 __version__ = "1.5.0"
 
@@ -41,7 +47,7 @@ _RESOLUTION = {
 }
 
 
-class Inky:
+class Inky(DrawMixin):
     """Inky e-Ink Display Driver.
 
     Generally it is more convenient to use either the :class:`inky.InkyPHAT` or :class:`inky.InkyWHAT` classes.
@@ -52,8 +58,11 @@ class Inky:
     RED = 2
     YELLOW = 2
 
+    # Colours accepted by set_pixel() and the drawing methods
+    _draw_colours = (WHITE, BLACK, RED)
+
     def __init__(self, resolution=(400, 300), colour="black", cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN, h_flip=False, v_flip=False,
-                 spi_bus=None, i2c_bus=None, gpio=None):
+                 spi_bus=None, i2c_bus=None, gpio=None, compact=False):
         """Initialise an Inky Display.
 
         :param resolution: Display resolution (width, height) in pixels, default: (400, 300).
@@ -70,6 +79,7 @@ class Inky:
         :param i2c_bus: SMB object. If `None` then :class:`smbus2.SMBus(1)` is used.
         :type i2c_bus: :class:`smbus2.SMBus`
         :param gpio: deprecated
+        :param bool compact: Keep the buffer packed at the display's native bit depth, default: `False`. See :mod:`inky.framebuffer`.
         """
         self._spi_bus = spi_bus
         self._i2c_bus = i2c_bus
@@ -94,7 +104,12 @@ class Inky:
             if self.eeprom.display_variant in (1, 6) and self.eeprom.get_color() == "red":
                 self.lut = "red_ht"
 
-        self.buf = numpy.zeros((self.height, self.width), dtype=numpy.uint8)
+        self.compact = compact
+        if compact:
+            # Stored in wire format, so show() sends it without packing
+            self.buf = BitPlaneFramebuffer((self.height, self.width), v_flip, h_flip, self.rotation, white=WHITE, black=BLACK, red=RED)
+        else:
+            self.buf = numpy.zeros((self.height, self.width), dtype=numpy.uint8)
         self.border_colour = 0
 
         self.dc_pin = dc_pin
@@ -111,6 +126,16 @@ class Inky:
         self._gpio = gpio
         self._gpio_setup = False
 
+        # Controller state, registers are only sent again when their value changes
+        self._registers = {}
+        self._packer = None
+        self._reset_required = True
+        # Set while a refresh started without waiting for it may still be running
+        self._refresh_pending = False
+
+        # Digest of each colour plane as last written to controller RAM
+        self._plane_digests = {}
+
         """Inky Lookup Tables.
 
         These lookup tables comprise of two sets of values.
@@ -256,13 +281,19 @@ class Inky:
 
             self._gpio_setup = True
 
-        self._gpio.set_value(self.reset_pin, Value.INACTIVE)
-        time.sleep(0.1)
-        self._gpio.set_value(self.reset_pin, Value.ACTIVE)
-        time.sleep(0.1)
+        if self._reset_required:
+            self._gpio.set_value(self.reset_pin, Value.INACTIVE)
+            time.sleep(0.1)
+            self._gpio.set_value(self.reset_pin, Value.ACTIVE)
+            time.sleep(0.1)
+
+            self._send_command(0x12)  # Soft Reset
+            self._busy_wait(1.0)
 
-        self._send_command(0x12)  # Soft Reset
-        self._busy_wait(1.0)
+            self._registers = {}
+            # RAM contents are not relied on through a reset, resend both planes
+            self._plane_digests = {}
+            self._reset_required = False
 
     def _busy_wait(self, timeout=30.0):
         """Wait for busy/wait pin."""
@@ -273,6 +304,23 @@ class Inky:
             for event in self._gpio.read_edge_events():
                 pass
 
+    async def _busy_wait_async(self, timeout=30.0):
+        """Wait for busy/wait pin without blocking the event loop."""
+        if self._gpio.get_value(self.busy_pin) == Value.ACTIVE:
+            events = await aio.wait_for_edge(self._gpio, timeout, gpiod.EdgeEvent.Type.FALLING_EDGE)
+            if events is None:
+                raise RuntimeError("Timeout waiting for busy signal to clear.")
+
+    def _wait_for_refresh(self):
+        """Wait for a refresh started with busy_wait=False to finish.
+
+        The controller must not be sent new data while it is still refreshing.
+
+        """
+        if self._refresh_pending:
+            self._busy_wait()
+            self._refresh_pending = False
+
     def _update(self, buf_a, buf_b, busy_wait=True):
         """Update display.
 
@@ -280,6 +328,7 @@ class Inky:
         :param buf_b: Yellow/Red pixels
 
         """
+        self._wait_for_refresh()
         self.setup()
 
         packed_height = list(struct.pack("<H", self.rows))
@@ -287,46 +336,53 @@ class Inky:
         if isinstance(packed_height[0], str):
             packed_height = map(ord, packed_height)
 
-        self._send_command(0x74, 0x54)  # Set Analog Block Control
-        self._send_command(0x7E, 0x3B)  # Set Digital Block Control
+        self._write_register(0x74, 0x54)  # Set Analog Block Control
+        self._write_register(0x7E, 0x3B)  # Set Digital Block Control
 
-        self._send_command(0x01, packed_height + [0x00])  # Gate setting
+        self._write_register(0x01, packed_height + [0x00])  # Gate setting
 
-        self._send_command(0x03, 0x17)  # Gate Driving Voltage
-        self._send_command(0x04, [0x41, 0xAC, 0x32])  # Source Driving Voltage
+        self._write_register(0x03, 0x17)  # Gate Driving Voltage
 
-        self._send_command(0x3A, 0x07)  # Dummy line period
-        self._send_command(0x3B, 0x04)  # Gate line width
-        self._send_command(0x11, 0x03)  # Data entry mode setting 0x03 = X/Y increment
+        source_voltage = [0x41, 0xAC, 0x32]  # Source Driving Voltage
+        if self.colour == "yellow":
+            source_voltage = [0x07, 0xAC, 0x32]  # Set voltage of VSH and VSL
+        if self.colour == "red" and self.resolution == (400, 300):
+            source_voltage = [0x30, 0xAC, 0x22]
+        self._write_register(0x04, source_voltage)
+
+        self._write_register(0x3A, 0x07)  # Dummy line period
+        self._write_register(0x3B, 0x04)  # Gate line width
+        self._write_register(0x11, 0x03)  # Data entry mode setting 0x03 = X/Y increment
 
-        self._send_command(0x2C, 0x3C)  # VCOM Register, 0x3c = -1.5v?
+        self._write_register(0x2C, 0x3C)  # VCOM Register, 0x3c = -1.5v?
 
-        self._send_command(0x3C, 0b00000000)
+        border = 0b00000000
         if self.border_colour == self.BLACK:
-            self._send_command(0x3C, 0b00000000)  # GS Transition Define A + VSS + LUT0
+            border = 0b00000000  # GS Transition Define A + VSS + LUT0
         elif self.border_colour == self.RED and self.colour == "red":
-            self._send_command(0x3C, 0b01110011)  # Fix Level Define A + VSH2 + LUT3
+            border = 0b01110011  # Fix Level Define A + VSH2 + LUT3
         elif self.border_colour == self.YELLOW and self.colour == "yellow":
-            self._send_command(0x3C, 0b00110011)  # GS Transition Define A + VSH2 + LUT3
+            border = 0b00110011  # GS Transition Define A + VSH2 + LUT3
         elif self.border_colour == self.WHITE:
-            self._send_command(0x3C, 0b00110001)  # GS Transition Define A + VSH2 + LUT1
-
-        if self.colour == "yellow":
-            self._send_command(0x04, [0x07, 0xAC, 0x32])  # Set voltage of VSH and VSL
-        if self.colour == "red" and self.resolution == (400, 300):
-            self._send_command(0x04, [0x30, 0xAC, 0x22])
+            border = 0b00110001  # GS Transition Define A + VSH2 + LUT1
+        self._write_register(0x3C, border)
 
-        self._send_command(0x32, self._luts[self.lut])  # Set LUTs
+        self._write_register(0x32, self._luts[self.lut])  # Set LUTs
 
-        self._send_command(0x44, [0x00, (self.cols // 8) - 1])  # Set RAM X Start/End
-        self._send_command(0x45, [0x00, 0x00] + packed_height)  # Set RAM Y Start/End
+        self._write_register(0x44, [0x00, (self.cols // 8) - 1])  # Set RAM X Start/End
+        self._write_register(0x45, [0x00, 0x00] + packed_height)  # Set RAM Y Start/End
 
         # 0x24 == RAM B/W, 0x26 == RAM Red/Yellow/etc
         for data in ((0x24, buf_a), (0x26, buf_b)):
             cmd, buf = data
+            # Skip planes that are already in RAM, since the last reset
+            digest = self._plane_digest(buf)
+            if self._plane_digests.get(cmd) == digest:
+                continue
             self._send_command(0x4E, 0x00)  # Set RAM X Pointer Start
             self._send_command(0x4F, [0x00, 0x00])  # Set RAM Y Pointer Start
             self._send_command(cmd, buf)
+            self._plane_digests[cmd] = digest
 
         self._send_command(0x22, 0xC7)  # Display Update Sequence
         self._send_command(0x20)  # Trigger Display Update
@@ -335,6 +391,31 @@ class Inky:
         if busy_wait:
             self._busy_wait()
             self._send_command(0x10, 0x01)  # Enter Deep Sleep
+            # Deep sleep can only be left with a hardware reset
+            self._reset_required = True
+        else:
+            self._refresh_pending = True
+
+    def _plane_digest(self, buf):
+        """Return a digest of a packed colour plane.
+
+        :param buf: packed plane
+
+        """
+        return hashlib.blake2b(numpy.ascontiguousarray(buf, dtype=numpy.uint8), digest_size=16).digest()
+
+    def _write_register(self, command, data):
+        """Send a command, unless the controller already holds the same data for it.
+
+        :param command: command byte
+        :param data: list of values, or a single value
+
+        """
+        value = bytes([data]) if isinstance(data, int) else bytes(data)
+        if self._registers.get(command) == value:
+            return
+        self._send_command(command, data)
+        self._registers[command] = value
 
     def set_pixel(self, x, y, v):
         """Set a single pixel on the buffer.
@@ -344,28 +425,68 @@ class Inky:
         :param int v: Colour to set, valid values are `inky.BLACK`, `inky.WHITE`, `inky.RED` and `inky.YELLOW`.
         """
         if v in (WHITE, BLACK, RED):
-            self.buf[y][x] = v
+            self.buf[y, x] = v
+
+    def _pack(self):
+        """Flip, rotate and pack the buffer into display data.
+
+        Returns the (Black/White, Yellow/Red) planes in the order they are written to the display.
+
+        The planes are written to buffers that are reused for every frame, copy them to keep them.
+
+        """
+        if self.compact:
+            self.buf.reorient(self.v_flip, self.h_flip, self.rotation)
+            return self.buf.planes
+
+        if self._packer is None or not self._packer.matches(self.buf, self.v_flip, self.h_flip, self.rotation):
+            self._packer = BitPlanePacker(self.buf.shape, self.v_flip, self.h_flip, self.rotation, black=BLACK, red=RED)
+
+        return self._packer.pack(self.buf)
 
     def show(self, busy_wait=True):
         """Show buffer on display.
 
         :param bool busy_wait: If True, wait for display update to finish before returning, default: `True`.
         """
-        region = self.buf
+        self._update(*self._pack(), busy_wait=busy_wait)
+
+    async def show_async(self):
+        """Show buffer on display, awaiting the refresh instead of blocking.
 
-        if self.v_flip:
-            region = numpy.fliplr(region)
+        The frame is packed and written over SPI in the event loop's executor,
+        then the coroutine yields to the event loop until the display releases
+        its busy line.
 
-        if self.h_flip:
-            region = numpy.flipud(region)
+        """
+        # Packing, SPI writes and any reset sleeps block, run them off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: self._update(*self._pack(), busy_wait=False))
+        await self._busy_wait_async()
+        self._refresh_pending = False
+        self._send_command(0x10, 0x01)  # Enter Deep Sleep
+        # Deep sleep can only be left with a hardware reset
+        self._reset_required = True
+
+    def compile(self):
+        """Pack the buffer into a frame that can be shown, or saved and shown, any number of times.
 
-        if self.rotation:
-            region = numpy.rot90(region, self.rotation // 90)
+        Returns an inky.frame.CompiledFrame.
 
-        buf_a = numpy.packbits(numpy.where(region == BLACK, 0, 1)).tolist()
-        buf_b = numpy.packbits(numpy.where(region == RED, 1, 0)).tolist()
+        """
+        return CompiledFrame(driver_name(self), self.resolution, self.colour, self.border_colour,
+                             tuple(plane.copy() for plane in self._pack()))
 
-        self._update(buf_a, buf_b, busy_wait=busy_wait)
+    def show_frame(self, frame, busy_wait=True):
+        """Show a compiled frame on display.
+
+        :param frame: CompiledFrame from compile() or CompiledFrame.load()
+        :param busy_wait: If True, wait for display update to finish before returning.
+
+        """
+        frame.check(self)
+        self.border_colour = frame.border
+        self._update(*frame.planes, busy_wait=busy_wait)
 
     def set_border(self, colour):
         """Set the border colour.
@@ -375,6 +496,17 @@ class Inky:
         if colour in (WHITE, BLACK, RED):
             self.border_colour = colour
 
+    def _set_buf(self, buf):
+        """Replace the buffer contents with an array of palette indexes.
+
+        :param buf: 2d array the shape of the buffer
+
+        """
+        if self.compact:
+            self.buf.pack(buf)
+        else:
+            self.buf = buf
+
     def set_image(self, image):
         """Copy an image to the buffer.
         """
@@ -391,22 +523,33 @@ class Inky:
             image.load()
             image = image.im.convert("P", True, palette_image.im)
 
-        self.buf = numpy.array(image, dtype=numpy.uint8).reshape((self.cols, self.rows))
+        self._set_buf(numpy.array(image, dtype=numpy.uint8).reshape((self.cols, self.rows)))
 
     def _spi_write(self, dc, values):
         """Write values over SPI.
 
         :param dc: whether to write as data or command
-        :param values: list of values to write
+        :param values: list of values, or a bytes-like object such as a packed frame, to write
+
         """
         self._gpio.set_value(self.cs_pin, Value.INACTIVE)
         self._gpio.set_value(self.dc_pin, Value.ACTIVE if dc else Value.INACTIVE)
-        try:
-            self._spi_bus.xfer3(values)
-        except AttributeError:
-            for x in range(((len(values) - 1) // _SPI_CHUNK_SIZE) + 1):
-                offset = x * _SPI_CHUNK_SIZE
-                self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE])
+
+        if isinstance(values, list):
+            try:
+                self._spi_bus.xfer3(values)
+            except AttributeError:
+                for x in range(((len(values) - 1) // _SPI_CHUNK_SIZE) + 1):
+                    offset = x * _SPI_CHUNK_SIZE
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE])
+        else:
+            # Packed frames are sent straight from their buffer, never expanded to a list
+            values = memoryview(values).cast("B")
+            try:
+                self._spi_bus.writebytes2(values)
+            except AttributeError:
+                for offset in range(0, len(values), _SPI_CHUNK_SIZE):
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE].tolist())
 
         self._gpio.set_value(self.cs_pin, Value.ACTIVE)
 
@@ -1,4 +1,5 @@
 """Inky e-Ink Display Driver."""
+import asyncio
 import time
 import warnings
 from datetime import timedelta
@@ -8,7 +9,12 @@ import gpiodevice
 from gpiod.line import Direction, Edge, Value
 from PIL import Image
 
-from . import eeprom
+from . import aio, eeprom
+from .dither import dither as dither_image
+from .draw import DrawMixin
+from .frame import CompiledFrame, driver_name
+from .framebuffer import NibbleFramebuffer
+from .packing import NibblePacker
 
 try:
     import numpy
@@ -79,7 +85,7 @@ _RESOLUTION = {
 }
 
 
-class Inky:
+class Inky(DrawMixin):
     """Inky e-Ink Display Driver."""
 
     BLACK = 0
@@ -116,7 +122,7 @@ class Inky:
         [255, 255, 255]   # Clear
     ]
 
-    def __init__(self, resolution=None, colour="multi", cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN, h_flip=False, v_flip=False, spi_bus=None, i2c_bus=None, gpio=None):  # noqa: E501
+    def __init__(self, resolution=None, colour="multi", cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN, h_flip=False, v_flip=False, spi_bus=None, i2c_bus=None, gpio=None, compact=False):  # noqa: E501
         """Initialise an Inky Display.
 
         :param resolution: (width, height) in pixels, default: (600, 448)
@@ -127,6 +133,7 @@ class Inky:
         :param busy_pin: device busy/wait pin
         :param h_flip: enable horizontal display flip, default: False
         :param v_flip: enable vertical display flip, default: False
+        :param compact: keep the buffer packed at the display's native bit depth, see inky.framebuffer, default: False
 
         """
         self._spi_bus = spi_bus
@@ -155,7 +162,12 @@ class Inky:
         self.colour = colour
         self.lut = colour
 
-        self.buf = numpy.zeros((self.rows, self.cols), dtype=numpy.uint8)
+        self.compact = compact
+        if compact:
+            # Stored in wire format, so show() sends it without packing
+            self.buf = NibbleFramebuffer((self.rows, self.cols), v_flip, h_flip, self.rotation, remap={CLEAN: WHITE})
+        else:
+            self.buf = numpy.zeros((self.rows, self.cols), dtype=numpy.uint8)
 
         self.dc_pin = dc_pin
         self.reset_pin = reset_pin
@@ -173,6 +185,26 @@ class Inky:
 
         self._luts = None
 
+        # Controller state, registers are only sent again when their value changes
+        self._registers = {}
+        # Quantization palettes for set_image(), by saturation
+        self._palette_images = {}
+        self._packer = None
+        self._reset_required = True
+        # Set while a refresh started without waiting for it may still be running
+        self._refresh_pending = False
+
+    def _palette_image(self, saturation):
+        """Return a "P" image holding the palette PIL quantizes to, built once per saturation."""
+        palette_image = self._palette_images.get(saturation)
+        if palette_image is None:
+            # Image size doesn't matter since it's just the palette we're using
+            palette_image = Image.new("P", (1, 1))
+            # Set our 7 colour palette (+ clear) and zero out the other 247 colours
+            palette_image.putpalette(self._palette_blend(saturation) + [0, 0, 0] * 248)
+            self._palette_images[saturation] = palette_image
+        return palette_image
+
     def _palette_blend(self, saturation, dtype="uint8"):
         saturation = float(saturation)
         palette = []
@@ -226,55 +258,59 @@ class Inky:
 
             self._gpio_setup = True
 
-        self._gpio.set_value(self.reset_pin, Value.INACTIVE)
-        time.sleep(0.1)
-        self._gpio.set_value(self.reset_pin, Value.ACTIVE)
-        time.sleep(0.1)
+        if self._reset_required:
+            self._gpio.set_value(self.reset_pin, Value.INACTIVE)
+            time.sleep(0.1)
+            self._gpio.set_value(self.reset_pin, Value.ACTIVE)
+            time.sleep(0.1)
 
-        self._gpio.set_value(self.reset_pin, Value.INACTIVE)
-        time.sleep(0.1)
-        self._gpio.set_value(self.reset_pin, Value.ACTIVE)
+            self._gpio.set_value(self.reset_pin, Value.INACTIVE)
+            time.sleep(0.1)
+            self._gpio.set_value(self.reset_pin, Value.ACTIVE)
 
-        self._busy_wait(1.0)
+            self._busy_wait(1.0)
 
-        # Sending init commands to display
-        self._send_command(AC073TC1_CMDH, [0x49, 0x55, 0x20, 0x08, 0x09, 0x18])
+            self._registers = {}
+            self._reset_required = False
 
-        self._send_command(AC073TC1_PWR, [0x3F, 0x00, 0x32, 0x2A, 0x0E, 0x2A])
+        # Sending init commands to display, registers are only sent again when their value has changed
+        self._write_register(AC073TC1_CMDH, [0x49, 0x55, 0x20, 0x08, 0x09, 0x18])
 
-        self._send_command(AC073TC1_PSR, [0x5F, 0x69])
+        self._write_register(AC073TC1_PWR, [0x3F, 0x00, 0x32, 0x2A, 0x0E, 0x2A])
 
-        self._send_command(AC073TC1_POFS, [0x00, 0x54, 0x00, 0x44])
+        self._write_register(AC073TC1_PSR, [0x5F, 0x69])
 
-        self._send_command(AC073TC1_BTST1, [0x40, 0x1F, 0x1F, 0x2C])
+        self._write_register(AC073TC1_POFS, [0x00, 0x54, 0x00, 0x44])
 
-        self._send_command(AC073TC1_BTST2, [0x6F, 0x1F, 0x16, 0x25])
+        self._write_register(AC073TC1_BTST1, [0x40, 0x1F, 0x1F, 0x2C])
 
-        self._send_command(AC073TC1_BTST3, [0x6F, 0x1F, 0x1F, 0x22])
+        self._write_register(AC073TC1_BTST2, [0x6F, 0x1F, 0x16, 0x25])
 
-        self._send_command(AC073TC1_IPC, [0x00, 0x04])
+        self._write_register(AC073TC1_BTST3, [0x6F, 0x1F, 0x1F, 0x22])
 
-        self._send_command(AC073TC1_PLL, [0x02])
+        self._write_register(AC073TC1_IPC, [0x00, 0x04])
 
-        self._send_command(AC073TC1_TSE, [0x00])
+        self._write_register(AC073TC1_PLL, [0x02])
 
-        self._send_command(AC073TC1_CDI, [0x3F])
+        self._write_register(AC073TC1_TSE, [0x00])
 
-        self._send_command(AC073TC1_TCON, [0x02, 0x00])
+        self._write_register(AC073TC1_CDI, [0x3F])
 
-        self._send_command(AC073TC1_TRES, [0x03, 0x20, 0x01, 0xE0])
+        self._write_register(AC073TC1_TCON, [0x02, 0x00])
 
-        self._send_command(AC073TC1_VDCS, [0x1E])
+        self._write_register(AC073TC1_TRES, [0x03, 0x20, 0x01, 0xE0])
 
-        self._send_command(AC073TC1_T_VDCS, [0x00])
+        self._write_register(AC073TC1_VDCS, [0x1E])
 
-        self._send_command(AC073TC1_AGID, [0x00])
+        self._write_register(AC073TC1_T_VDCS, [0x00])
 
-        self._send_command(AC073TC1_PWS, [0x2F])
+        self._write_register(AC073TC1_AGID, [0x00])
 
-        self._send_command(AC073TC1_CCSET, [0x00])
+        self._write_register(AC073TC1_PWS, [0x2F])
 
-        self._send_command(AC073TC1_TSSET, [0x00])
+        self._write_register(AC073TC1_CCSET, [0x00])
+
+        self._write_register(AC073TC1_TSSET, [0x00])
 
     def _busy_wait(self, timeout=40.0):
         """Wait for busy/wait pin."""
@@ -294,7 +330,31 @@ class Inky:
         for event in self._gpio.read_edge_events():
             print(timeout, event)
 
-    def _update(self, buf):
+    async def _busy_wait_async(self, timeout=40.0):
+        """Wait for busy/wait pin without blocking the event loop."""
+        # See _busy_wait, a busy pin held high gives no signal to wait on
+        if self._gpio.get_value(self.busy_pin) == Value.ACTIVE:
+            warnings.warn(f"Busy Wait: Held high. Waiting for {timeout:0.2f}s")
+            await asyncio.sleep(timeout)
+            return
+
+        events = await aio.wait_for_edge(self._gpio, timeout, gpiod.EdgeEvent.Type.RISING_EDGE)
+        if events is None:
+            warnings.warn(f"Busy Wait: Timed out after {timeout:0.2f}s")
+
+    def _wait_for_refresh(self):
+        """Wait for a refresh started with busy_wait=False to finish.
+
+        The controller must not be sent new data while it is still refreshing.
+
+        """
+        if self._refresh_pending:
+            self._busy_wait(45.0)
+            self._send_command(AC073TC1_POF, [0x00])
+            self._busy_wait(0.4)
+            self._refresh_pending = False
+
+    def _update(self, buf, busy_wait=True):
         """Update display.
 
         Dispatches display update to correct driver.
@@ -304,29 +364,36 @@ class Inky:
 
         """
 
+        self._wait_for_refresh()
         self.setup()
 
-        # TODO there has to be a better way to force the white colour to be used instead of clear...
-
-        for i in range(len(buf)):
-            if buf[i] & 0xF == 7:
-                buf[i] = (buf[i] & 0xF0) + 1
-                # print buf[i]
-            if buf[i] & 0xF0 == 0x70:
-                buf[i] = (buf[i] & 0xF) + 0x10
-                # print buf[i]
-
         self._send_command(AC073TC1_DTM, buf)
 
         self._send_command(AC073TC1_PON)
         self._busy_wait(0.4)
 
         self._send_command(AC073TC1_DRF, [0x00])
+        if not busy_wait:
+            self._refresh_pending = True
+            return
         self._busy_wait(45.0)  # 41 seconds in testing
 
         self._send_command(AC073TC1_POF, [0x00])
         self._busy_wait(0.4)
 
+    def _write_register(self, command, data):
+        """Send a command, unless the controller already holds the same data for it.
+
+        :param command: command byte
+        :param data: list of values, or a single value
+
+        """
+        value = bytes([data]) if isinstance(data, int) else bytes(data)
+        if self._registers.get(command) == value:
+            return
+        self._send_command(command, data)
+        self._registers[command] = value
+
     def set_pixel(self, x, y, v):
         """Set a single pixel.
 
@@ -335,7 +402,25 @@ class Inky:
         :param v: colour to set
 
         """
-        self.buf[y][x] = v & 0x07
+        self.buf[y, x] = v & 0x07
+
+    def _pack(self):
+        """Flip, rotate and pack the buffer into display data.
+
+        Returns a tuple with the frame data, two pixels per byte, in the order it is written to the display.
+
+        The planes are written to buffers that are reused for every frame, copy them to keep them.
+
+        """
+        if self.compact:
+            self.buf.reorient(self.v_flip, self.h_flip, self.rotation)
+            return self.buf.planes
+
+        if self._packer is None or not self._packer.matches(self.buf, self.v_flip, self.h_flip, self.rotation):
+            # Send white instead of clean, which the 7.3" display does not show as white
+            self._packer = NibblePacker(self.buf.shape, self.v_flip, self.h_flip, self.rotation, remap={CLEAN: WHITE})
+
+        return self._packer.pack(self.buf)
 
     def show(self, busy_wait=True):
         """Show buffer on display.
@@ -343,53 +428,94 @@ class Inky:
         :param busy_wait: If True, wait for display update to finish before returning.
 
         """
-        region = self.buf
+        self._update(*self._pack(), busy_wait=busy_wait)
+
+    async def show_async(self):
+        """Show buffer on display, awaiting the refresh instead of blocking.
+
+        The frame is packed and written over SPI in the event loop's executor,
+        then the coroutine yields to the event loop until the display releases
+        its busy line.
+
+        """
+        # Packing, SPI writes and any reset sleeps block, run them off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: self._update(*self._pack(), busy_wait=False))
+        await self._busy_wait_async(45.0)
 
-        if self.v_flip:
-            region = numpy.fliplr(region)
+        self._send_command(AC073TC1_POF, [0x00])
+        await self._busy_wait_async(0.4)
+        self._refresh_pending = False
+
+    def compile(self):
+        """Pack the buffer into a frame that can be shown, or saved and shown, any number of times.
 
-        if self.h_flip:
-            region = numpy.flipud(region)
+        Returns an inky.frame.CompiledFrame.
 
-        if self.rotation:
-            region = numpy.rot90(region, self.rotation // 90)
+        """
+        return CompiledFrame(driver_name(self), self.resolution, self.colour, self.border_colour,
+                             tuple(plane.copy() for plane in self._pack()))
 
-        buf = region.flatten()
+    def show_frame(self, frame, busy_wait=True):
+        """Show a compiled frame on display.
 
-        buf = ((buf[::2] << 4) & 0xF0) | (buf[1::2] & 0x0F)
+        :param frame: CompiledFrame from compile() or CompiledFrame.load()
+        :param busy_wait: If True, wait for display update to finish before returning.
 
-        self._update(buf.astype("uint8").tolist())
+        """
+        frame.check(self)
+        self.border_colour = frame.border
+        self._update(*frame.planes, busy_wait=busy_wait)
 
     def set_border(self, colour):
         """Set the border colour."""
         if colour in (BLACK, WHITE, GREEN, BLUE, RED, YELLOW, ORANGE, CLEAN):
             self.border_colour = colour
 
-    def set_image(self, image, saturation=0.5):
+    def _set_buf(self, buf):
+        """Replace the buffer contents with an array of palette indexes.
+
+        :param buf: 2d array the shape of the buffer
+
+        """
+        if self.compact:
+            self.buf.pack(buf)
+        else:
+            self.buf = buf
+
+    def set_image(self, image, saturation=0.5, dither=None, match="rgb", workers=1):
         """Copy an image to the display.
 
         :param image: PIL image to copy, must be 600x448
         :param saturation: Saturation for quantization palette - higher value results in a more saturated image
+        :param dither: Dithering method, one of "floyd", "stucki", "atkinson", "bayer" or "none", default: PIL's Floyd-Steinberg. Only "none" and "bayer" match colours with a cached inky.lut table
+        :param match: Colour matching, "rgb" distance or "lab" for perceptual CIEDE2000 matching, "lab" maps each pixel to its nearest colour unless dither is given
+        :param workers: Number of processes to dither with, None for one per CPU core
 
         """
         if not image.size == (self.width, self.height):
             raise ValueError("Image must be ({}x{}) pixels!".format(self.width, self.height))
+        if image.mode != "P" and (dither is not None or match != "rgb" or workers != 1):
+            # PIL can only match by RGB distance on one core, anything else goes through inky.dither
+            if dither is None:
+                # Perceptual matching alone is a table lookup, error diffusion is only used when asked for
+                dither = "none" if match == "lab" else "floyd"
+            # Dither to the 7 ink colours, clean is not used for images
+            palette = self._palette_blend(saturation)[:7 * 3]
+            self._set_buf(dither_image(image, palette, dither, match, workers).reshape((self.rows, self.cols)))
+            return
         if not image.mode == "P":
-            palette = self._palette_blend(saturation)
-            # Image size doesn't matter since it's just the palette we're using
-            palette_image = Image.new("P", (1, 1))
-            # Set our 7 colour palette (+ clear) and zero out the other 247 colours
-            palette_image.putpalette(palette + [0, 0, 0] * 248)
+            palette_image = self._palette_image(saturation)
             # Force source image data to be loaded for `.im` to work
             image.load()
             image = image.im.convert("P", True, palette_image.im)
-        self.buf = numpy.array(image, dtype=numpy.uint8).reshape((self.rows, self.cols))
+        self._set_buf(numpy.array(image, dtype=numpy.uint8).reshape((self.rows, self.cols)))
 
     def _spi_write(self, dc, values):
         """Write values over SPI.
 
         :param dc: whether to write as data or command
-        :param values: list of values to write
+        :param values: list of values, string, or a bytes-like object such as a packed frame, to write
 
         """
         self._gpio.set_value(self.cs_pin, Value.INACTIVE)
@@ -398,8 +524,21 @@ class Inky:
         if isinstance(values, str):
             values = [ord(c) for c in values]
 
-        for byte_value in values:
-            self._spi_bus.xfer([byte_value])
+        if isinstance(values, list):
+            try:
+                self._spi_bus.xfer3(values)
+            except AttributeError:
+                for x in range(((len(values) - 1) // _SPI_CHUNK_SIZE) + 1):
+                    offset = x * _SPI_CHUNK_SIZE
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE])
+        else:
+            # Packed frames are sent straight from their buffer, never expanded to a list
+            values = memoryview(values).cast("B")
+            try:
+                self._spi_bus.writebytes2(values)
+            except AttributeError:
+                for offset in range(0, len(values), _SPI_CHUNK_SIZE):
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE].tolist())
 
         self._gpio.set_value(self.cs_pin, Value.ACTIVE)
 
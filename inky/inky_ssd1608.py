@@ -1,4 +1,6 @@
 """Inky e-Ink Display Driver."""
+import asyncio
+import hashlib
 import time
 import warnings
 from datetime import timedelta
@@ -9,7 +11,11 @@ import numpy
 from gpiod.line import Bias, Direction, Edge, Value
 from PIL import Image
 
-from . import eeprom, ssd1608
+from . import aio, eeprom, ssd1608
+from .draw import DrawMixin
+from .frame import CompiledFrame, driver_name
+from .framebuffer import BitPlaneFramebuffer
+from .packing import BitPlanePacker
 
 WHITE = 0
 BLACK = 1
@@ -32,7 +38,7 @@ _RESOLUTION = {
 }
 
 
-class Inky:
+class Inky(DrawMixin):
     """Inky e-Ink Display Driver."""
 
     WHITE = 0
@@ -40,7 +46,10 @@ class Inky:
     RED = 2
     YELLOW = 2
 
-    def __init__(self, resolution=(250, 122), colour="black", cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN, h_flip=False, v_flip=False, spi_bus=None, i2c_bus=None, gpio=None):  # noqa: E501
+    # Colours accepted by set_pixel() and the drawing methods
+    _draw_colours = (WHITE, BLACK, RED)
+
+    def __init__(self, resolution=(250, 122), colour="black", cs_pin=CS0_PIN, dc_pin=DC_PIN, reset_pin=RESET_PIN, busy_pin=BUSY_PIN, h_flip=False, v_flip=False, spi_bus=None, i2c_bus=None, gpio=None, compact=False):  # noqa: E501
         """Initialise an Inky Display.
 
         :param resolution: (width, height) in pixels, default: (400, 300)
@@ -51,6 +60,7 @@ class Inky:
         :param busy_pin: device busy/wait pin
         :param h_flip: enable horizontal display flip, default: False
         :param v_flip: enable vertical display flip, default: False
+        :param compact: keep the buffer packed at the display's native bit depth, see inky.framebuffer, default: False
 
         """
         self._spi_bus = spi_bus
@@ -91,7 +101,12 @@ class Inky:
                 # TODO flash correct heights to new EEPROMs
                 # raise ValueError("Supplied width/height do not match Inky: {}x{}".format(self.eeprom.width, self.eeprom.height))
 
-        self.buf = numpy.zeros((self.cols, self.rows), dtype=numpy.uint8)
+        self.compact = compact
+        if compact:
+            # Stored in wire format, so show() sends it without packing
+            self.buf = BitPlaneFramebuffer((self.cols, self.rows), v_flip, h_flip, self.rotation, white=WHITE, black=BLACK, red=RED)
+        else:
+            self.buf = numpy.zeros((self.cols, self.rows), dtype=numpy.uint8)
 
         self.border_colour = 0
 
@@ -109,6 +124,22 @@ class Inky:
         self._gpio = gpio
         self._gpio_setup = False
 
+        # Partial refresh: the planes last written to controller RAM
+        self._windowed_writes = False
+        self._full_write_interval = 10
+        self._windowed_count = 0
+        self._last_planes = None
+
+        # Digest of each colour plane as last written to controller RAM
+        self._plane_digests = {}
+
+        # Controller state, registers are only sent again when their value changes
+        self._registers = {}
+        self._packer = None
+        self._reset_required = True
+        # Set while a refresh started without waiting for it may still be running
+        self._refresh_pending = False
+
         self._luts = {
             "black": [
                 0x02, 0x02, 0x01, 0x11, 0x12, 0x12, 0x22, 0x22, 0x66, 0x69,
@@ -165,14 +196,18 @@ class Inky:
 
             self._gpio_setup = True
 
-        self._gpio.set_value(self.reset_pin, Value.INACTIVE)
-        time.sleep(0.5)
-        self._gpio.set_value(self.reset_pin, Value.ACTIVE)
-        time.sleep(0.5)
+        if self._reset_required:
+            self._gpio.set_value(self.reset_pin, Value.INACTIVE)
+            time.sleep(0.5)
+            self._gpio.set_value(self.reset_pin, Value.ACTIVE)
+            time.sleep(0.5)
 
-        self._send_command(0x12)  # Soft Reset
-        time.sleep(1.0)
-        self._busy_wait()
+            self._send_command(0x12)  # Soft Reset
+            time.sleep(1.0)
+            self._busy_wait()
+
+            self._registers = {}
+            self._reset_required = False
 
     def _busy_wait(self, timeout=5.0):
         """Wait for busy/wait pin."""
@@ -183,6 +218,23 @@ class Inky:
             for event in self._gpio.read_edge_events():
                 pass
 
+    async def _busy_wait_async(self, timeout=5.0):
+        """Wait for busy/wait pin without blocking the event loop."""
+        if self._gpio.get_value(self.busy_pin) == Value.ACTIVE:
+            events = await aio.wait_for_edge(self._gpio, timeout, gpiod.EdgeEvent.Type.FALLING_EDGE)
+            if events is None:
+                raise RuntimeError("Timeout waiting for busy signal to clear.")
+
+    def _wait_for_refresh(self):
+        """Wait for a refresh started with busy_wait=False to finish.
+
+        The controller must not be sent new data while it is still refreshing.
+
+        """
+        if self._refresh_pending:
+            self._busy_wait(30.0)
+            self._refresh_pending = False
+
     def _update(self, buf_a, buf_b, busy_wait=True):
         """Update display.
 
@@ -192,49 +244,150 @@ class Inky:
         :param buf_b: Yellow/Red pixels
 
         """
+        self._wait_for_refresh()
         self.setup()
 
-        self._send_command(ssd1608.DRIVER_CONTROL, [self.rows - 1, (self.rows - 1) >> 8, 0x00])
+        self._write_register(ssd1608.DRIVER_CONTROL, [(self.rows - 1) & 0xFF, (self.rows - 1) >> 8, 0x00])
         # Set dummy line period
-        self._send_command(ssd1608.WRITE_DUMMY, [0x1B])
+        self._write_register(ssd1608.WRITE_DUMMY, [0x1B])
         # Set Line Width
-        self._send_command(ssd1608.WRITE_GATELINE, [0x0B])
+        self._write_register(ssd1608.WRITE_GATELINE, [0x0B])
         # Data entry sequence (scan direction leftward and downward)
-        self._send_command(ssd1608.DATA_MODE, [0x03])
+        self._write_register(ssd1608.DATA_MODE, [0x03])
+        # Only the changed region of RAM is written when windowed writes are enabled
+        window = self._dirty_window(buf_a, buf_b)
+        x_start, x_end, y_start, y_end = window or (0, self.cols // 8 - 1, 0, self.rows - 1)
         # Set ram X start and end position
-        xposBuf = [0x00, self.cols // 8 - 1]
-        self._send_command(ssd1608.SET_RAMXPOS, xposBuf)
+        xposBuf = [x_start, x_end]
+        self._write_register(ssd1608.SET_RAMXPOS, xposBuf)
         # Set ram Y start and end position
-        yposBuf = [0x00, 0x00, (self.rows - 1) & 0xFF, (self.rows - 1) >> 8]
-        self._send_command(ssd1608.SET_RAMYPOS, yposBuf)
+        yposBuf = [y_start & 0xFF, y_start >> 8, y_end & 0xFF, y_end >> 8]
+        self._write_register(ssd1608.SET_RAMYPOS, yposBuf)
         # VCOM Voltage
-        self._send_command(ssd1608.WRITE_VCOM, [0x70])
+        self._write_register(ssd1608.WRITE_VCOM, [0x70])
         # Write LUT DATA
-        self._send_command(ssd1608.WRITE_LUT, self._luts[self.lut])
+        self._write_register(ssd1608.WRITE_LUT, self._luts[self.lut])
 
+        border = None
         if self.border_colour == self.BLACK:
-            self._send_command(ssd1608.WRITE_BORDER, 0b00000000)
+            border = 0b00000000
             # GS Transition + Waveform 00 + GSA 0 + GSB 0
         elif self.border_colour == self.RED and self.colour == "red":
-            self._send_command(ssd1608.WRITE_BORDER, 0b00000110)
+            border = 0b00000110
             # GS Transition + Waveform 01 + GSA 1 + GSB 0
         elif self.border_colour == self.YELLOW and self.colour == "yellow":
-            self._send_command(ssd1608.WRITE_BORDER, 0b00001111)
+            border = 0b00001111
             # GS Transition + Waveform 11 + GSA 1 + GSB 1
         elif self.border_colour == self.WHITE:
-            self._send_command(ssd1608.WRITE_BORDER, 0b00000001)
+            border = 0b00000001
             # GS Transition + Waveform 00 + GSA 0 + GSB 1
-
-        # Set RAM address to 0, 0
-        self._send_command(ssd1608.SET_RAMXCOUNT, [0x00])
-        self._send_command(ssd1608.SET_RAMYCOUNT, [0x00, 0x00])
-
-        for data in ((ssd1608.WRITE_RAM, buf_a), (ssd1608.WRITE_ALTRAM, buf_b)):
-            cmd, buf = data
-            self._send_command(cmd, buf)
+        if border is not None:
+            self._write_register(ssd1608.WRITE_BORDER, border)
+
+        if window is not None:
+            for data in ((ssd1608.WRITE_RAM, buf_a), (ssd1608.WRITE_ALTRAM, buf_b)):
+                cmd, buf = data
+                # Skip planes that are identical to what is already in RAM
+                digest = self._plane_digest(buf)
+                if self._plane_digests.get(cmd) == digest:
+                    continue
+
+                # Set RAM address to the start of the window
+                self._send_command(ssd1608.SET_RAMXCOUNT, [x_start])
+                self._send_command(ssd1608.SET_RAMYCOUNT, [y_start & 0xFF, y_start >> 8])
+
+                buf = numpy.asarray(buf, dtype=numpy.uint8).reshape((self.rows, self.cols // 8))
+                self._send_command(cmd, numpy.ascontiguousarray(buf[y_start:y_end + 1, x_start:x_end + 1]))
+                self._plane_digests[cmd] = digest
+
+            # Planes from _pack() are overwritten by the next frame, keep a copy to compare against
+            if not self._windowed_writes:
+                self._last_planes = None
+            elif self._last_planes is None or len(self._last_planes[0]) != len(buf_a):
+                self._last_planes = (numpy.array(buf_a, dtype=numpy.uint8), numpy.array(buf_b, dtype=numpy.uint8))
+            else:
+                numpy.copyto(self._last_planes[0], buf_a)
+                numpy.copyto(self._last_planes[1], buf_b)
 
         self._busy_wait()
         self._send_command(ssd1608.MASTER_ACTIVATE)
+        if busy_wait:
+            self._busy_wait(30.0)
+        else:
+            self._refresh_pending = True
+
+    def _write_register(self, command, data):
+        """Send a command, unless the controller already holds the same data for it.
+
+        :param command: command byte
+        :param data: list of values, or a single value
+
+        """
+        value = bytes([data]) if isinstance(data, int) else bytes(data)
+        if self._registers.get(command) == value:
+            return
+        self._send_command(command, data)
+        self._registers[command] = value
+
+    def _plane_digest(self, buf):
+        """Return a digest of a packed colour plane.
+
+        :param buf: packed plane
+
+        """
+        return hashlib.blake2b(numpy.ascontiguousarray(buf, dtype=numpy.uint8), digest_size=16).digest()
+
+    def _dirty_window(self, buf_a, buf_b):
+        """Find the region of controller RAM that needs to be written.
+
+        Returns the RAM window as (x_start, x_end, y_start, y_end), with x in bytes
+        of 8 pixels and y in gate lines, or None if nothing has changed.
+
+        :param buf_a: Black/White pixels
+        :param buf_b: Yellow/Red pixels
+
+        """
+        full = (0, self.cols // 8 - 1, 0, self.rows - 1)
+
+        if not self._windowed_writes or self._last_planes is None:
+            self._windowed_count = 0
+            return full
+
+        if self._full_write_interval and self._windowed_count >= self._full_write_interval:
+            self._windowed_count = 0
+            self._plane_digests = {}
+            return full
+
+        last_a, last_b = self._last_planes
+        changed = (numpy.asarray(buf_a) != last_a) | (numpy.asarray(buf_b) != last_b)
+        changed = changed.reshape((self.rows, self.cols // 8))
+
+        rows = numpy.flatnonzero(changed.any(axis=1))
+        if len(rows) == 0:
+            return None
+
+        # Frames with nothing to write do not count towards a full write
+        self._windowed_count += 1
+
+        cols = numpy.flatnonzero(changed.any(axis=0))
+        return int(cols[0]), int(cols[-1]), int(rows[0]), int(rows[-1])
+
+    def set_windowed_writes(self, enabled=True, full_write_interval=10):
+        """Send only the region of controller RAM that changed since the last update.
+
+        This only saves SPI traffic. The panel still runs its full refresh
+        waveform over the whole screen, so refresh time, flashing and ghosting
+        are the same as a normal update.
+
+        :param enabled: enable windowed writes, default: True
+        :param full_write_interval: number of windowed writes after which the whole frame is written again, 0 for never, default: 10
+
+        """
+        self._windowed_writes = enabled
+        self._full_write_interval = full_write_interval
+        self._windowed_count = 0
+        if not enabled:
+            self._last_planes = None
 
     def set_pixel(self, x, y, v):
         """Set a single pixel.
@@ -245,7 +398,24 @@ class Inky:
 
         """
         if v in (WHITE, BLACK, RED):
-            self.buf[y][x] = v
+            self.buf[y, x] = v
+
+    def _pack(self):
+        """Flip, rotate and pack the buffer into display data.
+
+        Returns the (Black/White, Yellow/Red) planes in the order they are written to the display.
+
+        The planes are written to buffers that are reused for every frame, copy them to keep them.
+
+        """
+        if self.compact:
+            self.buf.reorient(self.v_flip, self.h_flip, self.rotation)
+            return self.buf.planes
+
+        if self._packer is None or not self._packer.matches(self.buf, self.v_flip, self.h_flip, self.rotation):
+            self._packer = BitPlanePacker(self.buf.shape, self.v_flip, self.h_flip, self.rotation, black=BLACK, red=RED)
+
+        return self._packer.pack(self.buf)
 
     def show(self, busy_wait=True):
         """Show buffer on display.
@@ -253,27 +423,58 @@ class Inky:
         :param busy_wait: If True, wait for display update to finish before returning.
 
         """
-        region = self.buf
+        self._update(*self._pack(), busy_wait=busy_wait)
 
-        if self.v_flip:
-            region = numpy.fliplr(region)
+    async def show_async(self):
+        """Show buffer on display, awaiting the refresh instead of blocking.
 
-        if self.h_flip:
-            region = numpy.flipud(region)
+        The frame is packed and written over SPI in the event loop's executor,
+        then the coroutine yields to the event loop until the display releases
+        its busy line.
 
-        if self.rotation:
-            region = numpy.rot90(region, self.rotation // 90)
+        """
+        # Packing, SPI writes and any reset sleeps block, run them off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: self._update(*self._pack(), busy_wait=False))
+        await self._busy_wait_async(30.0)
+        self._refresh_pending = False
+
+    def compile(self):
+        """Pack the buffer into a frame that can be shown, or saved and shown, any number of times.
+
+        Returns an inky.frame.CompiledFrame.
+
+        """
+        return CompiledFrame(driver_name(self), self.resolution, self.colour, self.border_colour,
+                             tuple(plane.copy() for plane in self._pack()))
+
+    def show_frame(self, frame, busy_wait=True):
+        """Show a compiled frame on display.
 
-        buf_a = numpy.packbits(numpy.where(region == BLACK, 0, 1)).tolist()
-        buf_b = numpy.packbits(numpy.where(region == RED, 1, 0)).tolist()
+        :param frame: CompiledFrame from compile() or CompiledFrame.load()
+        :param busy_wait: If True, wait for display update to finish before returning.
 
-        self._update(buf_a, buf_b, busy_wait=busy_wait)
+        """
+        frame.check(self)
+        self.border_colour = frame.border
+        self._update(*frame.planes, busy_wait=busy_wait)
 
     def set_border(self, colour):
         """Set the border colour."""
         if colour in (WHITE, BLACK, RED):
             self.border_colour = colour
 
+    def _set_buf(self, buf):
+        """Replace the buffer contents with an array of palette indexes.
+
+        :param buf: 2d array the shape of the buffer
+
+        """
+        if self.compact:
+            self.buf.pack(buf)
+        else:
+            self.buf = buf
+
     def set_image(self, image):
         """Copy an image to the display."""
         image = image.resize((self.width, self.height))
@@ -292,23 +493,33 @@ class Inky:
         canvas = Image.new("P", (self.rows, self.cols))
         width, height = image.size
         canvas.paste(image, (self.offset_x, self.offset_y, width + self.offset_x, height + self.offset_y))
-        self.buf = numpy.array(canvas, dtype=numpy.uint8).reshape((self.cols, self.rows))
+        self._set_buf(numpy.array(canvas, dtype=numpy.uint8).reshape((self.cols, self.rows)))
 
     def _spi_write(self, dc, values):
         """Write values over SPI.
 
         :param dc: whether to write as data or command
-        :param values: list of values to write
+        :param values: list of values, or a bytes-like object such as a packed frame, to write
 
         """
         self._gpio.set_value(self.cs_pin, Value.INACTIVE)
         self._gpio.set_value(self.dc_pin, Value.ACTIVE if dc else Value.INACTIVE)
-        try:
-            self._spi_bus.xfer3(values)
-        except AttributeError:
-            for x in range(((len(values) - 1) // _SPI_CHUNK_SIZE) + 1):
-                offset = x * _SPI_CHUNK_SIZE
-                self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE])
+
+        if isinstance(values, list):
+            try:
+                self._spi_bus.xfer3(values)
+            except AttributeError:
+                for x in range(((len(values) - 1) // _SPI_CHUNK_SIZE) + 1):
+                    offset = x * _SPI_CHUNK_SIZE
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE])
+        else:
+            # Packed frames are sent straight from their buffer, never expanded to a list
+            values = memoryview(values).cast("B")
+            try:
+                self._spi_bus.writebytes2(values)
+            except AttributeError:
+                for offset in range(0, len(values), _SPI_CHUNK_SIZE):
+                    self._spi_bus.xfer(values[offset : offset + _SPI_CHUNK_SIZE].tolist())
 
         self._gpio.set_value(self.cs_pin, Value.ACTIVE)
 
@@ -0,0 +1,235 @@
+"""Lookup tables mapping RGB colours to palette indexes.
+
+Tables are opt-in: the drivers' set_image() uses them for dither="none" and
+"bayer", and for colour matching by match="lab". The default, dither=None,
+is PIL's Floyd-Steinberg, which error diffusion needs exact matches for.
+"""
+import hashlib
+import os
+
+import numpy
+
+# Bits kept per channel, giving a 64x64x64 table
+LUT_BITS = 6
+
+_luts = {}
+
+
+def nearest(pixels, colours):
+    """Return the index of the nearest colour for each pixel.
+
+    :param pixels: (n, 3) array of RGB values
+    :param colours: (m, 3) array of palette colours
+
+    """
+    distance = ((pixels[:, None, :] - colours[None, :, :]) ** 2).sum(axis=2)
+    return distance.argmin(axis=1).astype(numpy.uint8)
+
+
+def rgb_to_lab(pixels):
+    """Convert sRGB values to CIELAB, using the D65 white point.
+
+    :param pixels: (..., 3) array of RGB values, 0 to 255
+
+    """
+    rgb = numpy.asarray(pixels, dtype=numpy.float64) / 255.0
+    rgb = numpy.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = rgb @ numpy.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= numpy.array([0.95047, 1.0, 1.08883])
+    f = numpy.where(xyz > (6 / 29) ** 3, numpy.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return numpy.stack((
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ), axis=-1)
+
+
+def ciede2000(lab1, lab2):
+    """Return the CIEDE2000 colour difference between two arrays of Lab colours.
+
+    :param lab1: (..., 3) array of Lab colours
+    :param lab2: (..., 3) array of Lab colours, broadcast against lab1
+
+    """
+    l1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    l2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_mean = (numpy.hypot(a1, b1) + numpy.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - numpy.sqrt(c_mean ** 7 / (c_mean ** 7 + 25.0 ** 7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+    c1, c2 = numpy.hypot(a1, b1), numpy.hypot(a2, b2)
+    h1 = numpy.degrees(numpy.arctan2(b1, a1)) % 360
+    h2 = numpy.degrees(numpy.arctan2(b2, a2)) % 360
+
+    chroma = c1 * c2 != 0
+    dh = h2 - h1
+    dh = numpy.where(dh > 180, dh - 360, numpy.where(dh < -180, dh + 360, dh))
+    dh = numpy.where(chroma, dh, 0)
+    dl = l2 - l1
+    dc = c2 - c1
+    dhh = 2 * numpy.sqrt(c1 * c2) * numpy.sin(numpy.radians(dh / 2))
+
+    l_mean = (l1 + l2) / 2
+    c_mean = (c1 + c2) / 2
+    h_mean = h1 + h2
+    h_mean = numpy.where(numpy.abs(h1 - h2) > 180, numpy.where(h_mean < 360, h_mean + 360, h_mean - 360), h_mean) / 2
+    h_mean = numpy.where(chroma, h_mean, h1 + h2)
+
+    t = (1
+         - 0.17 * numpy.cos(numpy.radians(h_mean - 30))
+         + 0.24 * numpy.cos(numpy.radians(2 * h_mean))
+         + 0.32 * numpy.cos(numpy.radians(3 * h_mean + 6))
+         - 0.20 * numpy.cos(numpy.radians(4 * h_mean - 63)))
+    sl = 1 + 0.015 * (l_mean - 50) ** 2 / numpy.sqrt(20 + (l_mean - 50) ** 2)
+    sc = 1 + 0.045 * c_mean
+    sh = 1 + 0.015 * c_mean * t
+    rt = (-2 * numpy.sqrt(c_mean ** 7 / (c_mean ** 7 + 25.0 ** 7))
+          * numpy.sin(numpy.radians(60 * numpy.exp(-(((h_mean - 275) / 25) ** 2)))))
+
+    return numpy.sqrt((dl / sl) ** 2 + (dc / sc) ** 2 + (dhh / sh) ** 2 + rt * (dc / sc) * (dhh / sh))
+
+
+def cache_dir():
+    """Return the directory lookup tables are stored in, or None if disabled.
+
+    Defaults to ~/.cache/inky, set INKY_CACHE_DIR to change it or to an empty string
+    to keep tables in memory only.
+
+    """
+    path = os.environ.get("INKY_CACHE_DIR")
+    if path is None:
+        path = os.path.join(os.path.expanduser("~"), ".cache", "inky")
+    return path or None
+
+
+def _grid(bits):
+    """Return the centre of every quantized RGB cell as an (n, 3) array."""
+    size = 1 << bits
+    levels = (numpy.arange(size, dtype=numpy.float32) + 0.5) * (256 / size)
+    r, g, b = numpy.meshgrid(levels, levels, levels, indexing="ij")
+    return numpy.stack((r, g, b), axis=-1).reshape((-1, 3))
+
+
+def _build(palette, bits):
+    colours = numpy.array(palette, dtype=numpy.float32).reshape((-1, 3))
+    grid = _grid(bits)
+    lut = numpy.empty(len(grid), dtype=numpy.uint8)
+    # Chunked to keep the (n, m, 3) distance array small
+    for start in range(0, len(grid), 1 << 16):
+        lut[start:start + (1 << 16)] = nearest(grid[start:start + (1 << 16)], colours)
+    size = 1 << bits
+    return lut.reshape((size, size, size))
+
+
+def _build_lab(palette, bits):
+    colours = rgb_to_lab(numpy.array(palette, dtype=numpy.float64).reshape((-1, 3)))
+    grid = rgb_to_lab(_grid(bits))
+    distance = numpy.stack([ciede2000(grid, colour) for colour in colours], axis=1)
+    size = 1 << bits
+    return distance.argmin(axis=1).astype(numpy.uint8).reshape((size, size, size))
+
+
+def _path(kind, palette, bits):
+    directory = cache_dir()
+    if directory is None:
+        return None
+    digest = hashlib.sha1(numpy.array(palette, dtype=numpy.uint8).tobytes()).hexdigest()[:16]
+    return os.path.join(directory, f"lut-{kind}-{bits}-{digest}.npy")
+
+
+def _load(path, bits):
+    size = 1 << bits
+    try:
+        lut = numpy.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if lut.shape != (size, size, size) or lut.dtype != numpy.uint8:
+        return None
+    return lut
+
+
+def _save(path, lut):
+    # Written to a temporary file first so readers never see a partial table
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp, "wb") as f:
+            numpy.save(f, lut)
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+
+
+def cached_lut(kind, palette, bits, build):
+    """Return a lookup table, building and caching it on first use.
+
+    Tables are kept in memory for the life of the process and, unless disabled,
+    saved as .npy files that later processes memory-map instead of rebuilding.
+
+    :param kind: name of the matching method, part of the cache key
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param bits: bits kept per channel
+    :param build: function taking (palette, bits) and returning the table
+
+    """
+    key = (kind, tuple(palette), bits)
+    lut = _luts.get(key)
+    if lut is not None:
+        return lut
+
+    path = _path(kind, palette, bits)
+    if path is not None:
+        lut = _load(path, bits)
+    if lut is None:
+        lut = build(palette, bits)
+        if path is not None:
+            _save(path, lut)
+
+    _luts[key] = lut
+    return lut
+
+
+def palette_lut(palette, bits=LUT_BITS):
+    """Return a table mapping quantized RGB to the nearest palette index.
+
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param bits: bits kept per channel, the table has (2 ** bits) ** 3 entries
+
+    """
+    return cached_lut("rgb", palette, bits, _build)
+
+
+def lab_lut(palette, bits=LUT_BITS):
+    """Return a table mapping quantized RGB to the perceptually nearest palette index.
+
+    Colours are compared in CIELAB with the CIEDE2000 difference, which is too slow
+    to do per pixel but costs nothing once it is baked into a table.
+
+    :param palette: flat list of palette colours, [r, g, b, r, g, b...]
+    :param bits: bits kept per channel, the table has (2 ** bits) ** 3 entries
+
+    """
+    return cached_lut("lab", palette, bits, _build_lab)
+
+
+def lookup(pixels, lut):
+    """Map RGB pixels to palette indexes with a lookup table.
+
+    :param pixels: (..., 3) array of RGB values
+    :param lut: table from palette_lut()
+
+    Returns an array of palette indexes with the shape of pixels minus its last axis.
+
+    """
+    shift = 8 - (lut.shape[0].bit_length() - 1)
+    if pixels.dtype != numpy.uint8:
+        pixels = numpy.clip(pixels, 0, 255).astype(numpy.uint8)
+    index = pixels >> shift
+    return lut[index[..., 0], index[..., 1], index[..., 2]]
@@ -7,6 +7,10 @@ from . import inky, inky_uc8159
 class InkyMock(inky.Inky):
     """Base simulator class for Inky."""
 
+    # Simulated updates are instant, frames are never packed for a controller
+    _pack = None
+    compact = False
+
     def __init__(self, colour, h_flip=False, v_flip=False, resolution=None):
         """Initialise an Inky pHAT Display.
 
@@ -147,6 +151,14 @@ class InkyMock(inky.Inky):
 
         self._simulate(region)
 
+    async def show_async(self):
+        """Show buffer on display.
+
+        Updates are simulated and instant, so there is nothing to await.
+
+        """
+        self.show()
+
 
 class InkyMockPHAT(InkyMock):
     """Inky PHAT (212x104) e-Ink Display Simulator."""
@@ -216,6 +228,10 @@ class InkyMockImpression(InkyMock):
     WIDTH = 600
     HEIGHT = 448
 
+    # Any colour is drawn, masked as by set_pixel()
+    _draw_colours = None
+    _draw_mask = 0x0F
+
     DESATURATED_PALETTE = [
         [0, 0, 0],
         [255, 255, 255],
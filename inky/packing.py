@@ -0,0 +1,257 @@
+"""Pack display buffers into the data sent to the display, without per-frame allocations."""
+from abc import ABC, abstractmethod
+
+import numpy
+
+
+def orient(buf, v_flip=False, h_flip=False, rotation=0):
+    """Return a view of a buffer in the order the display scans it.
+
+    Flips and rotations are strided views, nothing is copied.
+
+    :param buf: 2d buffer of palette indexes
+    :param v_flip: mirror columns
+    :param h_flip: mirror rows
+    :param rotation: rotation in degrees, a multiple of 90
+
+    """
+    if v_flip:
+        buf = buf[:, ::-1]
+
+    if h_flip:
+        buf = buf[::-1, :]
+
+    if rotation:
+        buf = numpy.rot90(buf, rotation // 90)
+
+    return buf
+
+
+def unorient(buf, v_flip=False, h_flip=False, rotation=0):
+    """Return a view of a buffer in display scan order back in the order it was given to orient().
+
+    :param buf: 2d buffer, as returned by orient()
+    :param v_flip: mirror columns
+    :param h_flip: mirror rows
+    :param rotation: rotation in degrees, a multiple of 90
+
+    """
+    if rotation:
+        buf = numpy.rot90(buf, -(rotation // 90))
+
+    if h_flip:
+        buf = buf[::-1, :]
+
+    if v_flip:
+        buf = buf[:, ::-1]
+
+    return buf
+
+
+def orient_index(shape, y, x, v_flip=False, h_flip=False, rotation=0):
+    """Return where pixel (y, x) of a buffer ends up in the view returned by orient().
+
+    :param shape: shape of the buffer
+    :param y: row
+    :param x: column
+    :param v_flip: mirror columns
+    :param h_flip: mirror rows
+    :param rotation: rotation in degrees, a multiple of 90
+
+    """
+    height, width = shape
+    if v_flip:
+        x = width - 1 - x
+
+    if h_flip:
+        y = height - 1 - y
+
+    # numpy.rot90 moves (y, x) to (width - 1 - x, y) for each quarter turn
+    for _ in range((rotation // 90) % 4):
+        y, x = width - 1 - x, y
+        height, width = width, height
+
+    return y, x
+
+
+class Packer(ABC):
+    """Precomputed plan for packing one buffer shape and orientation.
+
+    Output buffers are allocated once, and scratch buffers on the first pack(),
+    then both are reused for every frame, so the planes returned by pack(), also
+    available as .planes, are overwritten by the next call. Copy them to keep
+    them. release() frees the scratch buffers of a plan that is rarely used.
+
+    """
+
+    def __init__(self, shape, v_flip=False, h_flip=False, rotation=0):
+        """Initialise the plan.
+
+        :param shape: shape of the display buffer
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+
+        """
+        self.key = (tuple(shape), bool(v_flip), bool(h_flip), rotation)
+        self.v_flip = v_flip
+        self.h_flip = h_flip
+        self.rotation = rotation
+        self.shape = orient(numpy.empty(shape, dtype=numpy.uint8), v_flip, h_flip, rotation).shape
+
+    def matches(self, buf, v_flip, h_flip, rotation):
+        """Return True if this plan packs a buffer in the given orientation."""
+        return self.key == (buf.shape, bool(v_flip), bool(h_flip), rotation)
+
+    @abstractmethod
+    def pack(self, buf):
+        """Pack a buffer, return the planes to send.
+
+        :param buf: 2d buffer of palette indexes, in the shape and orientation of this plan
+
+        """
+
+    def release(self):
+        """Free the scratch buffers, the next pack() allocates them again. The planes are kept."""
+
+
+class BitPlanePacker(Packer):
+    """Pack a buffer into two 1-bit planes, as for the Inky pHAT and wHAT.
+
+    The first plane has a bit set for every pixel that is not black, the second
+    for every red/yellow pixel. Bits are packed most significant first, with the
+    last byte padded with zeros, as numpy.packbits() does.
+
+    """
+
+    def __init__(self, shape, v_flip=False, h_flip=False, rotation=0, black=1, red=2):
+        """Initialise the plan.
+
+        :param shape: shape of the display buffer
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+        :param black: palette index of black
+        :param red: palette index of red/yellow
+
+        """
+        Packer.__init__(self, shape, v_flip, h_flip, rotation)
+        self.black = black
+        self.red = red
+        length = (self.shape[0] * self.shape[1] + 7) // 8
+        self.planes = (numpy.empty(length, dtype=numpy.uint8), numpy.empty(length, dtype=numpy.uint8))
+        self.release()
+
+    def release(self):
+        """Free the scratch buffers, the next pack() allocates them again. The planes are kept."""
+        self._pixels = self._columns = self._scratch = None
+
+    def _allocate(self):
+        size = self.shape[0] * self.shape[1]
+        length = len(self.planes[0])
+        # One byte per pixel, padded to whole bytes of output
+        bits = numpy.zeros(length * 8, dtype=numpy.uint8)
+        self._pixels = bits[:size].reshape(self.shape)
+        self._columns = bits.reshape((length, 8))
+        self._scratch = numpy.empty(length, dtype=numpy.uint8)
+
+    def _pack_bits(self, out):
+        numpy.left_shift(self._columns[:, 0], 7, out=out)
+        for bit in range(1, 8):
+            numpy.left_shift(self._columns[:, bit], 7 - bit, out=self._scratch)
+            numpy.bitwise_or(out, self._scratch, out=out)
+
+    def pack(self, buf):
+        """Return the (not black, red/yellow) planes for a buffer.
+
+        :param buf: 2d buffer of palette indexes
+
+        """
+        if self._scratch is None:
+            self._allocate()
+        region = orient(buf, self.v_flip, self.h_flip, self.rotation)
+        plane_a, plane_b = self.planes
+
+        numpy.not_equal(region, self.black, out=self._pixels)
+        self._pack_bits(plane_a)
+
+        numpy.equal(region, self.red, out=self._pixels)
+        self._pack_bits(plane_b)
+
+        return self.planes
+
+
+class NibblePacker(Packer):
+    """Pack a buffer into 4 bits per pixel, two pixels per byte, as for the Inky Impressions.
+
+    Each output byte holds the even pixel in its high nibble and the odd pixel
+    in its low nibble. Pixel values can be remapped on the way, eg: to replace
+    "clean" with white.
+
+    """
+
+    def __init__(self, shape, v_flip=False, h_flip=False, rotation=0, remap=None):
+        """Initialise the plan.
+
+        :param shape: shape of the display buffer
+        :param v_flip: mirror columns
+        :param h_flip: mirror rows
+        :param rotation: rotation in degrees, a multiple of 90
+        :param remap: dict of {pixel value: value to send}, eg: {7: 1}
+
+        """
+        Packer.__init__(self, shape, v_flip, h_flip, rotation)
+        height, width = self.shape
+        self.remap = dict(remap or {})
+
+        # Pairs of pixels only share a byte within a row if rows are an even length
+        self._rows = width % 2 == 0
+        if self._rows:
+            self._out = numpy.empty((height, width // 2), dtype=numpy.uint8)
+        else:
+            self._out = numpy.empty(height * width // 2, dtype=numpy.uint8)
+        self.planes = (self._out.reshape(-1),)
+        self.release()
+
+    def release(self):
+        """Free the scratch buffers, the next pack() allocates them again. The planes are kept."""
+        self._flat = self._scratch = self._mask = None
+
+    def _allocate(self):
+        if not self._rows:
+            self._flat = numpy.empty(self.shape[0] * self.shape[1], dtype=numpy.uint8)
+        self._scratch = numpy.empty(self._out.shape, dtype=numpy.uint8)
+        self._mask = numpy.empty(self._out.shape, dtype=bool)
+
+    def _replace(self, nibble_mask, value, replacement):
+        numpy.bitwise_and(self._out, nibble_mask, out=self._scratch)
+        numpy.equal(self._scratch, value, out=self._mask)
+        # uint8 arithmetic wraps, so adding the difference works in either direction
+        numpy.add(self._out, (replacement - value) & 0xFF, out=self._out, where=self._mask)
+
+    def pack(self, buf):
+        """Return a tuple with the nibble-packed frame for a buffer.
+
+        :param buf: 2d buffer of palette indexes
+
+        """
+        if self._scratch is None:
+            self._allocate()
+        region = orient(buf, self.v_flip, self.h_flip, self.rotation)
+
+        if self._rows:
+            high, low = region[:, 0::2], region[:, 1::2]
+        else:
+            pixels = self._flat.reshape(self.shape)
+            numpy.copyto(pixels, region, casting="unsafe")
+            high, low = self._flat[0::2], self._flat[1::2]
+
+        numpy.left_shift(high, 4, out=self._out, casting="unsafe")
+        numpy.bitwise_and(low, 0x0F, out=self._scratch, casting="unsafe")
+        numpy.bitwise_or(self._out, self._scratch, out=self._out)
+
+        for value, replacement in self.remap.items():
+            self._replace(0x0F, value & 0x0F, replacement & 0x0F)
+            self._replace(0xF0, (value << 4) & 0xF0, (replacement << 4) & 0xF0)
+
+        return self.planes
@@ -23,10 +23,11 @@ class InkyPHAT_SSD1608(inky_ssd1608.Inky):
     RED = 2
     YELLOW = 2
 
-    def __init__(self, colour):
+    def __init__(self, colour, compact=False):
         """Initialise an Inky pHAT Display.
 
         :param colour: one of red, black or yellow, default: black
+        :param compact: keep the buffer packed at the display's native bit depth, default: False
 
         """
         inky_ssd1608.Inky.__init__(
@@ -34,7 +35,8 @@ class InkyPHAT_SSD1608(inky_ssd1608.Inky):
             resolution=(self.WIDTH, self.HEIGHT),
             colour=colour,
             h_flip=False,
-            v_flip=False)
+            v_flip=False,
+            compact=compact)
 
 
 class InkyPHAT(inky.Inky):
@@ -59,14 +61,16 @@ class InkyPHAT(inky.Inky):
     RED = 2
     YELLOW = 2
 
-    def __init__(self, colour='black'):
+    def __init__(self, colour='black', compact=False):
         """Initialise an Inky pHAT Display.
 
         :param str colour: one of 'red', 'black' or 'yellow', default: 'black'.
+        :param bool compact: Keep the buffer packed at the display's native bit depth, default: `False`.
         """
         inky.Inky.__init__(
             self,
             resolution=(self.WIDTH, self.HEIGHT),
             colour=colour,
             h_flip=False,
-            v_flip=False)
+            v_flip=False,
+            compact=compact)
@@ -0,0 +1,220 @@
+"""Pipelined display updates for Inky displays."""
+import queue
+import threading
+
+import numpy
+
+
+def _snapshot(display):
+    """Pack the display buffer into a frame that can be sent later.
+
+    Simulated displays update instantly and have nothing to overlap, they are
+    shown straight away and None is returned.
+
+    """
+    pack = getattr(display, "_pack", None)
+    if pack is None:
+        display.show()
+        return None
+
+    # Planes are copied so drawing the next frame cannot change a queued one
+    return tuple(numpy.array(plane, copy=True) for plane in pack())
+
+
+class FramePipeline:
+    """Double-buffered updates for an Inky display.
+
+    The display's buffer acts as the back buffer and can be drawn to, and the
+    next frame packed, while a worker thread sends the front frame and waits
+    for the panel to finish refreshing it. The next transfer starts as soon
+    as the busy line releases.
+
+    """
+
+    def __init__(self, display):
+        """Initialise the pipeline.
+
+        :param display: Inky display driver to update
+
+        """
+        self.display = display
+        self._frames = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="inky-pipeline", daemon=True)
+        self._thread.start()
+
+    def show(self):
+        """Snapshot the display buffer and queue it for display.
+
+        Returns as soon as the frame is queued. At most one frame waits behind
+        the one being refreshed, blocks until there is room for it.
+
+        """
+        self._raise_error()
+
+        planes = _snapshot(self.display)
+        if planes is not None:
+            self._frames.put(planes)
+
+    def wait(self):
+        """Wait for all queued frames to be sent and the last refresh to finish."""
+        self._frames.join()
+        wait_for_refresh = getattr(self.display, "_wait_for_refresh", None)
+        if wait_for_refresh is not None:
+            wait_for_refresh()
+        self._raise_error()
+
+    def close(self):
+        """Wait for queued frames, then stop the worker thread."""
+        try:
+            self.wait()
+        finally:
+            self._frames.put(None)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            planes = self._frames.get()
+            try:
+                if planes is None:
+                    return
+                # _update waits for the previous refresh before sending anything
+                self.display._update(*planes, busy_wait=False)
+            except (OSError, RuntimeError, ValueError) as error:
+                self._error = error
+            finally:
+                self._frames.task_done()
+
+
+class RefreshScheduler:
+    """Latest-wins updates for an Inky display.
+
+    Frames can be submitted from any thread. A frame that is superseded before
+    the panel is free to show it is dropped, so however many frames arrive
+    during a refresh only the newest one is painted.
+
+    """
+
+    def __init__(self, display):
+        """Initialise the scheduler.
+
+        :param display: Inky display driver to update
+
+        """
+        self.display = display
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition()
+        self._frame = None
+        self._sending = False
+        self._closed = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="inky-scheduler", daemon=True)
+        self._thread.start()
+
+    def show(self, image=None, buf=None, **kwargs):
+        """Queue the display buffer, an image or a buffer for display.
+
+        Returns as soon as the frame is queued, replacing any frame that is
+        still waiting for the panel.
+
+        :param image: PIL image to pass to the display's set_image() first, optional
+        :param buf: display buffer to copy in first, eg: from a FrameCache, optional
+        :param kwargs: extra arguments for set_image(), eg: saturation
+
+        Returns a copy of the display buffer the frame was taken from.
+
+        """
+        self._raise_error()
+
+        # The display buffer is shared, only one thread may draw and pack at a time
+        with self._lock:
+            if image is not None:
+                self.display.set_image(image, **kwargs)
+            if buf is not None:
+                buf = numpy.array(buf, dtype=numpy.uint8, copy=True)
+                if getattr(self.display, "compact", False):
+                    # Compact buffers are packed in place, see inky.framebuffer
+                    self.display.buf.pack(buf)
+                else:
+                    self.display.buf = buf
+            frame = numpy.array(self.display.buf, copy=True)
+            planes = _snapshot(self.display)
+
+        if planes is None:
+            return frame
+
+        with self._ready:
+            if self._frame is not None:
+                self.frames_dropped += 1
+            self._frame = planes
+            self._ready.notify_all()
+
+        return frame
+
+    def wait(self):
+        """Wait for the newest frame to be sent and its refresh to finish."""
+        with self._ready:
+            while self._frame is not None or self._sending:
+                self._ready.wait()
+        wait_for_refresh = getattr(self.display, "_wait_for_refresh", None)
+        if wait_for_refresh is not None:
+            wait_for_refresh()
+        self._raise_error()
+
+    def close(self):
+        """Wait for the newest frame, then stop the worker thread."""
+        try:
+            self.wait()
+        finally:
+            with self._ready:
+                self._closed = True
+                self._ready.notify_all()
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while self._frame is None and not self._closed:
+                    self._ready.wait()
+                if self._frame is None:
+                    return
+                self._sending = True
+
+            try:
+                # Wait for the panel before taking a frame, anything submitted
+                # during the refresh replaces the frame that was waiting
+                self.display._wait_for_refresh()
+                with self._ready:
+                    planes, self._frame = self._frame, None
+                self.display._update(*planes, busy_wait=False)
+                self.frames_shown += 1
+            except (OSError, RuntimeError, ValueError) as error:
+                self._error = error
+            finally:
+                with self._ready:
+                    self._sending = False
+                    self._ready.notify_all()
@@ -0,0 +1,212 @@
+"""Prepare images for Inky displays ahead of time.
+
+Converts a directory of images, or a gallery file listing image files and
+URLs, into .inkyframe files that a display can show with no image processing.
+
+Usage: inky-prerender --type impressions73 --output frames/ images/
+
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from urllib.request import urlopen
+
+from PIL import Image
+
+from .emulator import Emulator
+from .factory import HARDWARE_DISPLAY_CLASSES
+
+IMAGE_EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp")
+
+MANIFEST = "manifest.json"
+
+_display = None
+
+
+def prepare_image(image, inky_display, rotation=0, saturation=0.5, verbose=False):
+    """Prepare image for display on Inky."""
+    if verbose:
+        print(f"Original image size: {image.width}x{image.height}")
+        print(f"Display size: {inky_display.width}x{inky_display.height}")
+
+    # Rotate image if needed
+    if rotation:
+        image = image.rotate(rotation, expand=True)
+
+    # Resize image to fit display while maintaining aspect ratio
+    display_width, display_height = inky_display.width, inky_display.height
+    image_ratio = image.width / image.height
+    display_ratio = display_width / display_height
+
+    if image_ratio > display_ratio:
+        # Image is wider than display
+        new_width = display_width
+        new_height = int(display_width / image_ratio)
+    else:
+        # Image is taller than display
+        new_height = display_height
+        new_width = int(display_height * image_ratio)
+
+    # Resize image
+    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    if verbose:
+        print(f"Resized image: {image.width}x{image.height}")
+
+    # Create a blank canvas the size of the display
+    new_image = Image.new("RGBA", (display_width, display_height), (255, 255, 255, 255))
+
+    # Calculate position to center image
+    x = (display_width - new_width) // 2
+    y = (display_height - new_height) // 2
+
+    # Paste the image
+    new_image.paste(image, (x, y))
+
+    # Convert to RGB for compatibility
+    return new_image.convert("RGB")
+
+
+def find_sources(source):
+    """Return the images to render from a directory or a gallery file of paths and URLs.
+
+    :param source: directory of images, or text file listing one image path or URL per line
+
+    """
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        return [os.path.join(source, name) for name in names]
+
+    with open(source, "r") as f:
+        lines = [line.strip() for line in f]
+    # Skip empty lines and comments, as the image viewer does
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def load_image(source):
+    """Load an image from a file path or URL.
+
+    :param source: file path, or http(s) URL
+
+    """
+    if source.startswith(("http://", "https://")):
+        with urlopen(source, timeout=30) as response:
+            image = Image.open(BytesIO(response.read()))
+    else:
+        image = Image.open(source)
+    image.load()
+    return image
+
+
+def _init_worker(display_type, colour):
+    global _display
+    # Frames are packed by the hardware driver, which is wired to an emulated
+    # display so it loads on machines with no HAT, gpiod or spidev
+    emulator = Emulator(display_type, colour=colour, time_scale=0)
+    try:
+        _display = emulator.create()
+    finally:
+        emulator.uninstall()
+
+
+def _render(index, source, output, rotation, saturation, dither, match):
+    """Render one source image to an .inkyframe file, returning its manifest entry."""
+    name = os.path.splitext(os.path.basename(source.rstrip("/")))[0] or "image"
+    path = os.path.join(output, f"{index:04d}-{name}.inkyframe")
+
+    try:
+        image = prepare_image(load_image(source), _display, rotation=rotation, saturation=saturation)
+    except (OSError, ValueError) as e:
+        return {"source": source, "error": str(e)}
+
+    # Different display types have different methods for set_image
+    kwargs = {}
+    if "saturation" in _display.set_image.__code__.co_varnames:
+        kwargs = {"saturation": saturation, "dither": dither, "match": match}
+    _display.set_image(image, **kwargs)
+
+    frame = _display.compile()
+    frame.save(path)
+    return {"source": source, "frame": os.path.basename(path), "crc32": frame.checksum, "driver": frame.driver}
+
+
+def render(sources, output, display_type, colour=None, rotation=0, saturation=0.5, dither=None, match="rgb", jobs=None):
+    """Render images to .inkyframe files and write a manifest listing them.
+
+    :param sources: image file paths or URLs
+    :param output: directory to write frames and manifest.json to
+    :param display_type: display type, eg: "impressions73", see inky.factory.HARDWARE_DISPLAY_CLASSES
+    :param colour: display colour, for displays that need one
+    :param rotation: rotation to apply to each image, in degrees
+    :param saturation: palette saturation for 7-colour displays
+    :param dither: dithering method for 7-colour displays, default: PIL's Floyd-Steinberg
+    :param match: colour matching for 7-colour displays, "rgb" or "lab"
+    :param jobs: number of processes to render with, None for one per CPU core
+
+    Returns the manifest.
+
+    """
+    os.makedirs(output, exist_ok=True)
+    args = [(index, source, output, rotation, saturation, dither, match) for index, source in enumerate(sources)]
+
+    if jobs == 1:
+        _init_worker(display_type, colour)
+        entries = [_render(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(display_type, colour)) as executor:
+            entries = list(executor.map(_render, *zip(*args))) if args else []
+
+    # Every frame comes from the same driver, so it is only listed once
+    drivers = {entry.pop("driver") for entry in entries if "driver" in entry}
+
+    manifest = {
+        "display": display_type,
+        "colour": colour,
+        "driver": drivers.pop() if drivers else None,
+        "rotation": rotation,
+        "saturation": saturation,
+        "dither": dither,
+        "match": match,
+        "frames": entries,
+    }
+    with open(os.path.join(output, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    """Command line entry point for inky-prerender."""
+    parser = argparse.ArgumentParser(description="Pre-render images to .inkyframe files for an Inky display")
+    parser.add_argument("source", help="Directory of images, or gallery file with one image path or URL per line")
+    parser.add_argument("--output", "-o", required=True, help="Directory to write frames and manifest.json to")
+    parser.add_argument("--type", "-t", required=True, choices=sorted(HARDWARE_DISPLAY_CLASSES), help="Display type")
+    parser.add_argument("--colour", "-c", default=None, choices=["red", "black", "yellow"], help="Display colour, for red/black/yellow displays")
+    parser.add_argument("--rotate", "-r", type=int, default=0, choices=[0, 90, 180, 270], help="Rotate images by degrees")
+    parser.add_argument("--saturation", "-s", type=float, default=0.5, help="Palette saturation for 7-colour displays")
+    parser.add_argument("--dither", "-d", default=None, choices=["floyd", "stucki", "atkinson", "bayer", "none"], help="Dithering method for 7-colour displays")
+    parser.add_argument("--match", "-m", default="rgb", choices=["rgb", "lab"], help="Colour matching for 7-colour displays")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Number of processes, default: one per CPU core")
+    args = parser.parse_args(argv)
+
+    sources = find_sources(args.source)
+    if not sources:
+        print(f"No images found in {args.source}")
+        return 1
+
+    t_start = time.time()
+    manifest = render(sources, args.output, args.type, args.colour, args.rotate, args.saturation, args.dither, args.match, args.jobs)
+    elapsed = time.time() - t_start
+
+    failed = [entry for entry in manifest["frames"] if "error" in entry]
+    for entry in failed:
+        print(f"Failed to render {entry['source']}: {entry['error']}")
+    print(f"Rendered {len(sources) - len(failed)} of {len(sources)} images to {args.output} in {elapsed:.2f} seconds")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Frame counting, fps and frame sinks shared by the simulators that render to memory."""
+import os
+import time
+
+
+class FrameRecorderMixin:
+    """Count and time the frames a simulator shows, and pass each to an optional sink.
+
+    Classes using this call _init_recorder() from __init__, and wrap each
+    show() in _frame_started() and _frame_finished(). image() must return the
+    last frame shown.
+
+    """
+
+    def _init_recorder(self, sink=None):
+        """Set up the sink and clear the counters.
+
+        :param sink: directory to write each frame to as a PNG, or a callable to pass each frame's image to, optional
+
+        """
+        self.sink = sink
+        if isinstance(sink, str):
+            os.makedirs(sink, exist_ok=True)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear the frame count and timing used for fps."""
+        self.frames_shown = 0
+        self.show_seconds = 0.0
+        self._t_first = None
+        self._t_last = None
+
+    @property
+    def fps(self):
+        """Frames shown per second, from the start of the first show() to the end of the last."""
+        if self.frames_shown == 0 or self._t_last == self._t_first:
+            return 0.0
+        return self.frames_shown / (self._t_last - self._t_first)
+
+    def _frame_started(self):
+        """Start timing a show(), return the start time for _frame_finished()."""
+        t_start = time.perf_counter()
+        if self._t_first is None:
+            self._t_first = t_start
+        return t_start
+
+    def _frame_finished(self, t_start, shown=True):
+        """Finish timing a show(), and count and sink the frame if one was shown.
+
+        :param t_start: time returned by _frame_started()
+        :param shown: False if show() did not produce a frame
+
+        """
+        if shown:
+            self.frames_shown += 1
+            if self.sink is not None:
+                image = self.image()
+                if callable(self.sink):
+                    self.sink(image)
+                else:
+                    image.save(os.path.join(self.sink, f"frame-{self.frames_shown:06d}.png"))
+
+        self._t_last = time.perf_counter()
+        self.show_seconds += self._t_last - t_start
@@ -3,15 +3,18 @@ import time
 import numpy as np
 from PIL import Image
 from .base import BaseInky
+from .dither import dither as dither_image
+from .timing import TIMINGS, TimingModel
 
 class InkySimpleSimulator(BaseInky):
     """Simple PIL-based simulator for Inky displays."""
 
-    def __init__(self, display_type="impressions", colour="multi", **kwargs):
+    def __init__(self, display_type="impressions", colour="multi", time_warp=None, **kwargs):
         """Initialize a simple Inky Display Simulator.
         
-        :param display_type: Type of display (used to determine resolution)
+        :param display_type: Type of display (used to determine resolution and refresh timing)
         :param colour: Display color capability
+        :param time_warp: How many times faster than real time to refresh, see inky.timing.TimingModel, default: None for a fixed one second
         """
         # Check if resolution is already provided in kwargs
         if 'resolution' not in kwargs:
@@ -46,6 +49,10 @@ class InkySimpleSimulator(BaseInky):
         self.v_flip = kwargs.get('v_flip', False)
         self.rotation = 0
         self.image = None  # Store the last image for show()
+        self.timing = None
+        if time_warp is not None:
+            self.timing = TimingModel(display_type if display_type in TIMINGS else "impressions", time_warp)
+        self._shown = False
         
         # Define color palettes for 7-color displays
         self.DESATURATED_PALETTE = [
@@ -78,15 +85,28 @@ class InkySimpleSimulator(BaseInky):
                 if isinstance(self.buf, list):
                     self.buf[y][x] = v & 0x07
     
-    def set_image(self, image, saturation=0.5):
+    def set_image(self, image, saturation=0.5, dither=None, match="rgb", workers=1):
         """Copy an image to the display.
 
         :param image: PIL image to display
         :param saturation: Saturation for 7-color displays
+        :param dither: Dithering method for RGB images, one of "floyd", "stucki", "atkinson", "bayer" or "none", default: Floyd-Steinberg if workers or match are given
+        :param match: Colour matching, "rgb" distance or "lab" for perceptual CIEDE2000 matching, "lab" maps each pixel to its nearest colour unless dither is given
+        :param workers: Number of processes to dither with, None for one per CPU core
         """
         if not image.size == (self.width, self.height):
             image = image.resize((self.width, self.height))
         
+        if image.mode != "P" and (dither is not None or match != "rgb" or workers != 1):
+            # Matched as the drivers do, anything but RGB distance on one core goes through inky.dither
+            if dither is None:
+                dither = "none" if match == "lab" else "floyd"
+            palette = self._image_palette()
+            self.buf = dither_image(image, palette, dither, match, workers)
+            # Shown as the dithered result rather than the source image
+            image = Image.fromarray(self.buf, "P")
+            image.putpalette(palette)
+        
         self.image = image  # Store for later display
         
         # Try to convert the image to the buffer format
@@ -96,6 +116,16 @@ class InkySimpleSimulator(BaseInky):
             # If we can't convert to numpy array, just store the image
             pass
     
+    def _image_palette(self):
+        """Return the palette RGB images are dithered to, as a flat list."""
+        if self.colour == "multi":
+            return [c for colour in self.DESATURATED_PALETTE[:7] for c in colour]
+        if self.colour == "red":
+            return [255, 255, 255, 0, 0, 0, 255, 0, 0]
+        if self.colour == "yellow":
+            return [255, 255, 255, 0, 0, 0, 255, 255, 0]
+        return [255, 255, 255, 0, 0, 0]
+    
     def set_border(self, colour):
         """Set the border colour.
 
@@ -110,7 +140,7 @@ class InkySimpleSimulator(BaseInky):
     def show(self, busy_wait=True):
         """Show buffer on display using PIL's show method.
 
-        :param busy_wait: Ignored in simple simulator.
+        :param busy_wait: If True and time_warp was given, wait as long as the display would take to refresh.
         """
         print("Displaying image...")
         
@@ -169,8 +199,12 @@ class InkySimpleSimulator(BaseInky):
         except Exception as e:
             print(f"Error showing image: {e}")
         
-        # Simulate e-ink refresh delay
-        time.sleep(1.0)
+        # Simulate e-ink refresh delay, the driver resets the panel the first time it is set up
+        if self.timing is None:
+            time.sleep(1.0)
+        elif busy_wait:
+            self.timing.run(reset=not self._shown or None)
+        self._shown = True
         print("Display updated.")
     
     def wait_for_window_close(self):
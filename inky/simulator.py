@@ -1,11 +1,13 @@
 """Pygame-based simulator for Inky displays."""
+import collections
 import threading
 import time
 import sys
 import numpy as np
-from PIL import Image
 from .base import BaseInky
+from .dither import dither as dither_image
 from .platform import is_raspberry_pi
+from .timing import TimingModel
 
 # Try to import pygame, but don't fail if it's not available
 try:
@@ -19,10 +21,12 @@ except ImportError:
 class InkySimulator(BaseInky):
     """Pygame-based simulator for Inky displays."""
 
-    def __init__(self, colour="multi", **kwargs):
+    def __init__(self, colour="multi", display_type=None, time_warp=None, **kwargs):
         """Initialize an Inky Display Simulator.
 
         :param colour: Display color capability ("multi", "red", "black", "yellow")
+        :param display_type: Display type to time refreshes like, see inky.timing, optional
+        :param time_warp: How many times faster than real time to refresh, see inky.timing.TimingModel, default: None for a short flash
         :param kwargs: Additional keyword arguments including resolution
         """
         # Check for resolution in kwargs
@@ -35,8 +39,10 @@ class InkySimulator(BaseInky):
         if not PYGAME_AVAILABLE:
             print("Falling back to simple simulator...")
             self._simple_simulator = InkySimpleSimulator(
+                display_type=display_type or "impressions",
                 colour=colour, 
                 resolution=resolution,
+                time_warp=time_warp,
                 **kwargs
             )
             return
@@ -52,10 +58,25 @@ class InkySimulator(BaseInky):
         self.v_flip = kwargs.get('v_flip', False)
         self.rotation = 0
         self._running = True
-        self._update_requested = False
-        self._update_complete = threading.Event()
-        self._refresh_fps = 2  # Slow refresh to simulate e-ink
+        # show() queues numbered frames, the display thread renders them in
+        # order and notifies waiters with the number of the last one drawn
+        self._frames = threading.Condition()
+        self._pending = collections.deque()
+        self._requested = 0
+        self._rendered = 0
+        self._frame_event = pygame.USEREVENT
+        # Refreshes are run as steps of (seconds to wait first, function), the
+        # waits are timers so window events are handled during a refresh
+        self._steps = collections.deque()
+        self._step_event = pygame.USEREVENT + 1
+        self._step_timer = False
+        self.timing = None
+        if display_type is not None and time_warp is not None:
+            self.timing = TimingModel(display_type, time_warp)
         self._last_frame = None
+        self._palette = None
+        self._rgb = None
+        self._surface = None
         self.pygame_initialized = False
         self.screen = None
         
@@ -118,48 +139,138 @@ class InkySimulator(BaseInky):
             palette += [0xFFFFFF]
         return palette
     
+    def _image_palette(self, saturation):
+        """Return the palette RGB images are dithered to, as a flat list."""
+        if self.colour == "multi":
+            return self._palette_blend(saturation)[:7 * 3]
+        if self.colour == "red":
+            return [255, 255, 255, 0, 0, 0, 255, 0, 0]
+        if self.colour == "yellow":
+            return [255, 255, 255, 0, 0, 0, 255, 255, 0]
+        return [255, 255, 255, 0, 0, 0]
+    
+    def _palette_array(self):
+        """Return the colour of each buffer value as an (8, 3) array, built on first use."""
+        if self._palette is None:
+            if self.colour == "multi":
+                palette = self._palette_blend(0.5)
+            else:
+                palette = self._image_palette(0.5)
+            # Unused values render black
+            palette = palette + [0, 0, 0] * (8 - len(palette) // 3)
+            self._palette = np.array(palette, dtype=np.uint8).reshape((8, 3))
+        return self._palette
+
     def _display_loop(self):
-        """Main display loop for simulator."""
+        """Main display loop for simulator.
+
+        Sleeps in pygame.event.wait() until there is a window event or a frame
+        to draw, show() posts an event to wake it, and the steps of a refresh
+        post timer events when they are due.
+        """
         # Exit if pygame not available
         if not PYGAME_AVAILABLE:
             return
-            
+
         try:
+            while self._running and not self.pygame_initialized:
+                try:
+                    self._init_pygame()
+                except Exception as e:
+                    print(f"Error initializing pygame: {e}")
+                    time.sleep(1.0)
+
+            # Frames queued before pygame could take the wake up event
+            self._render_pending()
+
             while self._running:
-                if not self.pygame_initialized:
-                    try:
-                        self._init_pygame()
-                    except Exception as e:
-                        print(f"Error initializing pygame: {e}")
-                        time.sleep(1.0)
-                        continue
-                
-                # Handle events
+                event = pygame.event.wait()
                 try:
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            self._running = False
-                        elif event.type == pygame.KEYDOWN:
-                            if event.key in self.key_mappings:
-                                button = self.key_mappings[event.key]
-                                if button in self.button_handlers:
-                                    for handler in self.button_handlers[button]:
-                                        handler(button)
+                    if event.type == pygame.QUIT:
+                        self._stop()
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key in self.key_mappings:
+                            button = self.key_mappings[event.key]
+                            if button in self.button_handlers:
+                                for handler in self.button_handlers[button]:
+                                    handler(button)
+                    elif event.type == self._frame_event:
+                        self._render_pending()
+                    elif event.type == self._step_event:
+                        self._step_timer = False
+                        self._render_pending()
                 except Exception as e:
                     print(f"Error handling pygame events: {e}")
-                
-                # Update display if requested
-                if self._update_requested:
-                    try:
-                        self._update_display()
-                        self._update_requested = False
-                        self._update_complete.set()
-                    except Exception as e:
-                        print(f"Error updating display: {e}")
-                
-                time.sleep(1.0 / 30)  # 30 FPS UI
         except Exception as e:
             print(f"Display loop error: {e}")
+        finally:
+            self._stop()
+
+    def _render_pending(self):
+        """Run the steps of refreshing queued frames, oldest first, until one has to wait for a timer."""
+        while not self._step_timer:
+            if not self._steps:
+                with self._frames:
+                    if not self._pending:
+                        return
+                    sequence, region = self._pending.popleft()
+                self._steps.extend(self._refresh_steps(sequence, region))
+
+            seconds, step = self._steps[0]
+            if seconds > 0:
+                self._steps[0] = (0, step)
+                self._step_timer = True
+                pygame.time.set_timer(self._step_event, max(1, round(seconds * 1000)), 1)
+                return
+
+            self._steps.popleft()
+            try:
+                step()
+            except Exception as e:
+                print(f"Error updating display: {e}")
+
+    def _refresh_steps(self, sequence, region):
+        """Return the steps of showing a frame, as a list of (seconds to wait first, function).
+
+        With a timing model the window waits through each phase of showing a
+        frame, flashing during the refresh, otherwise it flashes briefly. Power
+        off is short enough to fold into the refresh.
+
+        :param sequence: number of the frame, marked rendered by the last step
+        :param region: copy of the buffer taken when the frame was shown
+        """
+        if self.timing is not None:
+            # The driver resets the panel the first time it is set up
+            phases = dict(self.timing.phases(reset=self._last_frame is None or None))
+            # The panel flashes for most of the refresh, then settles on the new image
+            flash = phases["refresh"] / 3
+            steps = [
+                (self.timing.real_seconds(phases["reset"] + phases["transfer"] + phases["power_on"]), lambda: self._fill((255, 255, 255))),
+                (self.timing.real_seconds(flash), lambda: self._fill((0, 0, 0))),
+                (self.timing.real_seconds(flash * 2 + phases["power_off"]), lambda: self._update_display(region)),
+            ]
+        elif self._last_frame is not None:
+            # Simulate e-ink refresh effect
+            steps = [
+                (0, lambda: self._fill((255, 255, 255))),
+                (0.2, lambda: self._fill((0, 0, 0))),
+                (0.2, lambda: self._update_display(region)),
+            ]
+        else:
+            steps = [(0, lambda: self._update_display(region))]
+        return steps + [(0, lambda: self._frame_rendered(sequence))]
+
+    def _frame_rendered(self, sequence):
+        """Mark a frame rendered and wake show() calls waiting for it."""
+        with self._frames:
+            self._rendered = sequence
+            self._frames.notify_all()
+
+    def _stop(self):
+        """Stop the display loop and wake anything waiting on it."""
+        with self._frames:
+            self._running = False
+            self._frames.notify_all()
     
     def _init_pygame(self):
         """Initialize pygame display."""
@@ -171,15 +282,15 @@ class InkySimulator(BaseInky):
         self.screen = pygame.display.set_mode((self.width, self.height))
         self.pygame_initialized = True
     
-    def _update_display(self):
-        """Update the pygame display with current buffer."""
+    def _update_display(self, region):
+        """Update the pygame display with a frame.
+
+        :param region: copy of the buffer taken when the frame was shown
+        """
         if not PYGAME_AVAILABLE or not self.pygame_initialized:
             return
         
         try:
-            # Create PIL image from buffer
-            region = self.buf.copy() if isinstance(self.buf, np.ndarray) else np.array(self.buf)
-            
             if self.v_flip:
                 region = np.fliplr(region)
             
@@ -189,59 +300,33 @@ class InkySimulator(BaseInky):
             if self.rotation:
                 region = np.rot90(region, self.rotation // 90)
             
-            # Create PIL image with palette
-            img = Image.fromarray(region.astype(np.uint8))
-            
-            # Apply palette based on color mode
-            if self.colour == "multi":
-                palette = self._palette_blend(0.5)
-                palette_img = Image.new("P", (1, 1))
-                palette_img.putpalette(palette + [0, 0, 0] * 248)  # Fill remaining palette
-                img = img.convert("RGB", palette=palette_img.getpalette())
-            else:
-                # For red/black/yellow displays
-                if self.colour == "red":
-                    palette = [255, 255, 255, 0, 0, 0, 255, 0, 0]
-                elif self.colour == "yellow":
-                    palette = [255, 255, 255, 0, 0, 0, 255, 255, 0]
-                else:  # black
-                    palette = [255, 255, 255, 0, 0, 0]
-                
-                palette_img = Image.new("P", (1, 1))
-                palette_img.putpalette(palette + [0, 0, 0] * 252)  # Fill remaining palette
-                img = img.convert("P", palette=palette_img)
-            
-            # Simulate e-ink refresh effect
-            if self._last_frame is not None:
-                # First flash to white
-                self.screen.fill((255, 255, 255))
-                pygame.display.flip()
-                time.sleep(0.2)
-                
-                # Then flash to black
-                self.screen.fill((0, 0, 0))
-                pygame.display.flip()
-                time.sleep(0.2)
-            
-            # Convert to pygame surface and display
-            mode = img.mode
-            size = img.size
-            data = img.tobytes()
-            
-            # Handle different image modes
-            if mode == "P":
-                # Convert to RGB for pygame
-                img = img.convert("RGB")
-                mode = img.mode
-                data = img.tobytes()
-                
-            surface = pygame.image.fromstring(data, size, mode)
-            self.screen.blit(surface, (0, 0))
+            # Look up every pixel's colour at once, into an array reused between frames
+            if self._rgb is None or self._rgb.shape[:2] != region.shape:
+                self._rgb = np.empty(region.shape + (3,), dtype=np.uint8)
+                self._surface = pygame.Surface((region.shape[1], region.shape[0]))
+            np.take(self._palette_array(), region, axis=0, out=self._rgb, mode="clip")
+
+            # Write straight into the surface's pixels, indexed [x, y]
+            pixels = pygame.surfarray.pixels3d(self._surface)
+            pixels[...] = self._rgb.swapaxes(0, 1)
+            # The surface is locked until its pixel view is released
+            del pixels
+            self.screen.blit(self._surface, (0, 0))
             pygame.display.flip()
-            
+
             self._last_frame = region
         except Exception as e:
             print(f"Error in _update_display: {e}")
+
+    def _fill(self, colour):
+        """Fill the window with one colour, as a panel flashes during a refresh.
+
+        :param colour: (r, g, b) colour
+        """
+        if not PYGAME_AVAILABLE or not self.pygame_initialized:
+            return
+        self.screen.fill(colour)
+        pygame.display.flip()
     
     # Delegate to simple simulator if pygame not available
     def _check_pygame(self, method_name):
@@ -251,6 +336,13 @@ class InkySimulator(BaseInky):
             return method
         return None
         
+    def _draw_buf(self):
+        """Return the buffer to draw into, the simple simulator's if pygame is not available."""
+        delegate = self._check_pygame('_draw_buf')
+        if delegate:
+            return delegate()
+        return self.buf
+
     def set_pixel(self, x, y, v):
         """Set a single pixel.
 
@@ -270,19 +362,29 @@ class InkySimulator(BaseInky):
                 if isinstance(self.buf, list):
                     self.buf[y][x] = v & 0x07
     
-    def set_image(self, image, saturation=0.5):
+    def set_image(self, image, saturation=0.5, dither=None, match="rgb", workers=1):
         """Copy an image to the display.
 
         :param image: PIL image to display
         :param saturation: Saturation for 7-color displays
+        :param dither: Dithering method for RGB images, one of "floyd", "stucki", "atkinson", "bayer" or "none", default: Floyd-Steinberg if workers or match are given
+        :param match: Colour matching, "rgb" distance or "lab" for perceptual CIEDE2000 matching, "lab" maps each pixel to its nearest colour unless dither is given
+        :param workers: Number of processes to dither with, None for one per CPU core
         """
         delegate = self._check_pygame('set_image')
         if delegate:
-            return delegate(image, saturation)
+            return delegate(image, saturation, dither, match, workers)
             
         if not image.size == (self.width, self.height):
             image = image.resize((self.width, self.height))
         
+        if image.mode != "P" and (dither is not None or match != "rgb" or workers != 1):
+            # Matched as the drivers do, anything but RGB distance on one core goes through inky.dither
+            if dither is None:
+                dither = "none" if match == "lab" else "floyd"
+            self.buf = dither_image(image, self._image_palette(saturation), dither, match, workers)
+            return
+        
         try:
             self.buf = np.array(image, dtype=np.uint8).reshape((self.height, self.width))
         except:
@@ -315,10 +417,24 @@ class InkySimulator(BaseInky):
         if delegate:
             return delegate(busy_wait)
             
-        self._update_requested = True
+        # Copy the buffer, it may be drawn into again before this frame is rendered
+        region = np.array(self.buf, dtype=np.uint8)
+        with self._frames:
+            if not self._running:
+                return
+            self._requested += 1
+            sequence = self._requested
+            self._pending.append((sequence, region))
+
+        try:
+            pygame.event.post(pygame.event.Event(self._frame_event))
+        except pygame.error:
+            # Not initialised yet, the display loop renders queued frames once it is
+            pass
+
         if busy_wait:
-            self._update_complete.clear()
-            self._update_complete.wait()
+            with self._frames:
+                self._frames.wait_for(lambda: self._rendered >= sequence or not self._running)
     
     def wait_for_window_close(self):
         """Wait until the pygame window has closed."""
@@ -327,9 +443,9 @@ class InkySimulator(BaseInky):
             return delegate()
             
         if self.pygame_initialized:
-            while self._running:
-                time.sleep(0.1)
-        self._running = False
+            with self._frames:
+                self._frames.wait_for(lambda: not self._running)
+        self._stop()
     
     def register_button_handler(self, button, handler):
         """Register a handler for button presses.
@@ -0,0 +1,116 @@
+"""Refresh timing for each Inky display, for simulators and for planning how often content can change."""
+import collections
+import math
+import time
+
+# spi_speed_hz: bus clock each driver sets
+# frame_bytes: data sent for a full frame, both planes for two and three colour panels
+# reset: time setup() spends in a hardware reset, sleeps and busy wait together
+# reset_each_show: the driver puts the panel into deep sleep after a refresh, so every show resets it
+# power_on, refresh, power_off: time the busy line is held for each phase
+Timing = collections.namedtuple("Timing", "spi_speed_hz frame_bytes reset reset_each_show power_on refresh power_off")
+
+TIMINGS = {
+    "phat": Timing(488000, 2 * 212 * 104 // 8, 0.21, True, 0.0, 15.0, 0.0),
+    "what": Timing(488000, 2 * 400 * 300 // 8, 0.21, True, 0.0, 15.0, 0.0),
+    "phatssd1608": Timing(488000, 2 * 250 * 136 // 8, 2.01, False, 0.0, 15.0, 0.0),
+    "whatssd1683": Timing(10000000, 2 * 400 * 300 // 8, 2.01, False, 0.0, 15.0, 0.0),
+    "impressions": Timing(3000000, 600 * 448 // 2, 0.25, False, 0.1, 27.0, 0.05),
+    "7colour": Timing(3000000, 600 * 448 // 2, 0.25, False, 0.1, 27.0, 0.05),
+    "impressions73": Timing(5000000, 800 * 480 // 2, 0.35, False, 0.15, 41.0, 0.05),
+}
+
+
+class TimingModel:
+    """How long a display takes to show a frame, phase by phase, optionally run faster or slower than real time.
+
+    :Example: ::
+
+        >>> timing = TimingModel("impressions73")
+        >>> timing.phases()
+        [('reset', 0.0), ('transfer', 0.3072), ('power_on', 0.15), ('refresh', 41.0), ('power_off', 0.05)]
+        >>> print(f"{timing.refreshes_per_hour():.0f} refreshes an hour")
+        87 refreshes an hour
+        >>> TimingModel("impressions73", time_warp=100).run()  # About 0.4 seconds
+
+    """
+
+    def __init__(self, display_type, time_warp=1.0, spi_speed_hz=None):
+        """Initialise the model.
+
+        :param display_type: display type, eg: "phat", see TIMINGS
+        :param time_warp: how many times faster than real time run() goes, eg: 2.0 for twice as fast, 0.5 for half, or math.inf to not wait at all
+        :param spi_speed_hz: bus clock, default: the rate the driver sets
+
+        """
+        if display_type not in TIMINGS:
+            raise ValueError(f"Unknown display type: {display_type}")
+        if not time_warp > 0:
+            raise ValueError(f"time_warp must be greater than zero, not {time_warp}")
+
+        self.display_type = display_type
+        self.timing = TIMINGS[display_type]
+        self.time_warp = time_warp
+        self.spi_speed_hz = spi_speed_hz or self.timing.spi_speed_hz
+
+    @property
+    def transfer_seconds(self):
+        """Time to clock a full frame out over SPI."""
+        return self.timing.frame_bytes * 8 / self.spi_speed_hz
+
+    def phases(self, reset=None):
+        """Return the phases of showing a frame, as a list of (name, seconds) in order.
+
+        :param reset: include a hardware reset, default: only for drivers that reset on every show
+
+        """
+        timing = self.timing
+        if reset is None:
+            reset = timing.reset_each_show
+        return [
+            ("reset", timing.reset if reset else 0.0),
+            ("transfer", self.transfer_seconds),
+            ("power_on", timing.power_on),
+            ("refresh", timing.refresh),
+            ("power_off", timing.power_off),
+        ]
+
+    def show_seconds(self, reset=None):
+        """Return the real time showing a frame takes, from show() until it returns.
+
+        :param reset: include a hardware reset, default: only for drivers that reset on every show
+
+        """
+        return sum(seconds for _, seconds in self.phases(reset))
+
+    def refreshes_per_hour(self):
+        """Return how many frames can be shown an hour, back to back."""
+        return 3600.0 / self.show_seconds()
+
+    def real_seconds(self, seconds):
+        """Return the real time a span of display time takes, scaled by time_warp.
+
+        :param seconds: display time
+
+        """
+        if seconds <= 0 or math.isinf(self.time_warp):
+            return 0.0
+        return seconds / self.time_warp
+
+    def sleep(self, seconds):
+        """Wait for a span of display time, scaled by time_warp.
+
+        :param seconds: display time to wait
+
+        """
+        seconds = self.real_seconds(seconds)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def run(self, reset=None):
+        """Wait as long as showing a frame takes, scaled by time_warp.
+
+        :param reset: include a hardware reset, default: only for drivers that reset on every show
+
+        """
+        self.sleep(self.show_seconds(reset))
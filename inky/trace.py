@@ -0,0 +1,434 @@
+"""Record the SPI traffic of an Inky display to a trace, and analyse or replay it.
+
+A TraceRecorder attached to a display logs every SPI write, with its
+data/command state and length, the chip select window around it and how
+long it took, along with every busy wait and reset, to a compact binary
+.inkytrace file.
+
+Usage: inky-trace report refresh.inkytrace
+       inky-trace replay --repeat 10 refresh.inkytrace
+
+"""
+import argparse
+import inspect
+import json
+import struct
+import sys
+import threading
+import time
+
+from .frame import driver_name
+
+MAGIC = b"INKYTRC\x00"
+VERSION = 1
+
+# Magic, format version and the length of the JSON header that follows
+_PREAMBLE = struct.Struct("<8sHI")
+
+# Kind, flags, start and end in nanoseconds from the start of the trace, and
+# length, followed by length bytes of payload if FLAG_PAYLOAD is set
+_RECORD = struct.Struct("<BBQQI")
+
+# Record kinds. A write is one chip select window, busy waits store their
+# timeout in milliseconds as the length
+WRITE = 1
+BUSY_WAIT = 2
+RESET = 3
+
+FLAG_DATA = 0x01
+FLAG_PAYLOAD = 0x02
+FLAG_TIMEOUT = 0x04
+
+KIND_NAMES = {WRITE: "write", BUSY_WAIT: "busy wait", RESET: "reset"}
+
+
+class Record:
+    """One entry of a trace."""
+
+    __slots__ = ("end", "flags", "kind", "length", "payload", "start")
+
+    def __init__(self, kind, flags, start, end, length, payload=None):
+        """Initialise a record.
+
+        :param kind: WRITE, BUSY_WAIT or RESET
+        :param flags: FLAG_ bits
+        :param start: start time, nanoseconds from the start of the trace
+        :param end: end time, nanoseconds from the start of the trace
+        :param length: bytes written, or timeout in milliseconds for a busy wait
+        :param payload: bytes written, if they were recorded
+
+        """
+        self.kind = kind
+        self.flags = flags
+        self.start = start
+        self.end = end
+        self.length = length
+        self.payload = payload
+
+    @property
+    def dc(self):
+        """True for data, False for a command."""
+        return bool(self.flags & FLAG_DATA)
+
+    @property
+    def duration(self):
+        """Duration in seconds."""
+        return (self.end - self.start) / 1e9
+
+    def __repr__(self):
+        return f"Record({KIND_NAMES.get(self.kind, self.kind)}, flags=0x{self.flags:02x}, start={self.start}, end={self.end}, length={self.length})"
+
+
+class TraceRecorder:
+    """Record the SPI writes, busy waits and resets of a display driver to an .inkytrace file.
+
+    The driver's _spi_write(), _busy_wait() and setup() methods are wrapped on
+    the instance, and put back by close(). Command bytes are always recorded,
+    data only has its length recorded unless payload is True, which makes the
+    trace large but lets it be replayed byte for byte.
+
+    :Example: ::
+
+        >>> with TraceRecorder(display, "refresh.inkytrace"):
+        >>>     display.show()
+
+    """
+
+    def __init__(self, display, path, payload=False):
+        """Initialise the recorder and start recording.
+
+        :param display: Inky display driver to record
+        :param path: file to write the trace to
+        :param payload: record the data bytes of every write, not just their length
+
+        """
+        self.display = display
+        self.payload = payload
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")  # noqa: SIM115 closed by close()
+        try:
+            header = json.dumps({
+                "driver": driver_name(display),
+                "resolution": list(display.resolution),
+                "colour": display.colour,
+                "payload": payload,
+                "started": time.time(),
+            }).encode("utf-8")
+            self._file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            self._file.write(header)
+
+            self._spi_write = display._spi_write
+            self._busy_wait = display._busy_wait
+            self._busy_wait_async = getattr(display, "_busy_wait_async", None)
+            self._setup = display.setup
+        except Exception:
+            self._file.close()
+            raise
+
+        self._t0 = time.perf_counter_ns()
+        display._spi_write = self._record_spi_write
+        display._busy_wait = self._record_busy_wait
+        if self._busy_wait_async is not None:
+            display._busy_wait_async = self._record_busy_wait_async
+        display.setup = self._record_setup
+
+    def _now(self):
+        return time.perf_counter_ns() - self._t0
+
+    def _write(self, kind, flags, start, end, length, payload=None):
+        with self._lock:
+            if self._file is None:
+                return
+            if payload is not None:
+                flags |= FLAG_PAYLOAD
+            self._file.write(_RECORD.pack(kind, flags, start, end, length))
+            if payload is not None:
+                self._file.write(payload)
+
+    def _record_spi_write(self, dc, values):
+        start = self._now()
+        self._spi_write(dc, values)
+        end = self._now()
+
+        data = bytes(values) if isinstance(values, list) else memoryview(values).cast("B")
+        payload = None
+        # Commands are a byte or two, always worth keeping
+        if not dc or self.payload:
+            payload = bytes(data)
+        self._write(WRITE, FLAG_DATA if dc else 0, start, end, len(data), payload)
+
+    def _timeout_ms(self, function, args, kwargs):
+        arguments = inspect.signature(function).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        return int(arguments.arguments.get("timeout", 0) * 1000)
+
+    def _record_busy_wait(self, *args, **kwargs):
+        start = self._now()
+        flags = 0
+        try:
+            return self._busy_wait(*args, **kwargs)
+        except RuntimeError:
+            flags = FLAG_TIMEOUT
+            raise
+        finally:
+            self._write(BUSY_WAIT, flags, start, self._now(), self._timeout_ms(self._busy_wait, args, kwargs))
+
+    async def _record_busy_wait_async(self, *args, **kwargs):
+        start = self._now()
+        flags = 0
+        try:
+            return await self._busy_wait_async(*args, **kwargs)
+        except RuntimeError:
+            flags = FLAG_TIMEOUT
+            raise
+        finally:
+            self._write(BUSY_WAIT, flags, start, self._now(), self._timeout_ms(self._busy_wait_async, args, kwargs))
+
+    def _record_setup(self, *args, **kwargs):
+        if getattr(self.display, "_reset_required", False):
+            self._write(RESET, 0, self._now(), self._now(), 0)
+        return self._setup(*args, **kwargs)
+
+    def close(self):
+        """Stop recording, restore the driver's methods and close the trace file."""
+        for name in ("_spi_write", "_busy_wait", "_busy_wait_async", "setup"):
+            self.display.__dict__.pop(name, None)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Trace:
+    """A recorded trace, loaded from an .inkytrace file."""
+
+    def __init__(self, header, records):
+        """Initialise a trace.
+
+        :param header: dict of trace metadata, the driver, resolution and colour of the display
+        :param records: list of Record
+
+        """
+        self.header = header
+        self.records = records
+
+    @classmethod
+    def load(cls, path):
+        """Load a trace from an .inkytrace file.
+
+        :param path: file to read
+
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        try:
+            magic, version, length = _PREAMBLE.unpack_from(data)
+        except struct.error:
+            raise ValueError(f"{path} is not an Inky trace") from None
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Inky trace")
+        if version != VERSION:
+            raise ValueError(f"{path} is an Inky trace version {version}, expected {VERSION}")
+
+        offset = _PREAMBLE.size + length
+        header = json.loads(data[_PREAMBLE.size:offset].decode("utf-8"))
+
+        records = []
+        # A trace cut short, eg: by a crash, keeps every record that was written in full
+        while offset + _RECORD.size <= len(data):
+            kind, flags, start, end, length = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            payload = None
+            if flags & FLAG_PAYLOAD:
+                if offset + length > len(data):
+                    break
+                payload = data[offset:offset + length]
+                offset += length
+            records.append(Record(kind, flags, start, end, length, payload))
+
+        return cls(header, records)
+
+    def commands(self):
+        """Return {command byte: (times sent, data bytes sent after it)}."""
+        commands = {}
+        command = None
+        for record in self.records:
+            if record.kind != WRITE:
+                continue
+            if not record.dc:
+                for command in record.payload or b"":
+                    count, length = commands.get(command, (0, 0))
+                    commands[command] = (count + 1, length)
+            elif command is not None:
+                count, length = commands[command]
+                commands[command] = (count, length + record.length)
+        return commands
+
+    def analyse(self):
+        """Return a dict summarising the trace.
+
+        Gaps are the time between one write ending and the next starting, not
+        counting any busy wait between them, which is time spent in the host.
+
+        """
+        writes = [record for record in self.records if record.kind == WRITE]
+        waits = [record for record in self.records if record.kind == BUSY_WAIT]
+
+        gaps = []
+        previous = None
+        waited = 0
+        for record in self.records:
+            if record.kind == BUSY_WAIT:
+                waited += record.end - record.start
+            elif record.kind == WRITE:
+                if previous is not None:
+                    gaps.append(max(record.start - previous.end - waited, 0) / 1e9)
+                previous = record
+                waited = 0
+
+        duration = (self.records[-1].end - self.records[0].start) / 1e9 if self.records else 0.0
+        data_bytes = sum(record.length for record in writes if record.dc)
+        write_seconds = sum(record.duration for record in writes)
+
+        return {
+            "duration": duration,
+            "writes": len(writes),
+            "bytes": sum(record.length for record in writes),
+            "data_bytes": data_bytes,
+            "write_seconds": write_seconds,
+            "throughput": data_bytes / write_seconds if write_seconds else 0.0,
+            "gaps": len(gaps),
+            "gap_seconds": sum(gaps),
+            "gap_max": max(gaps, default=0.0),
+            "gap_mean": sum(gaps) / len(gaps) if gaps else 0.0,
+            "busy_waits": len(waits),
+            "busy_seconds": sum(record.duration for record in waits),
+            "busy_max": max((record.duration for record in waits), default=0.0),
+            "busy_timeouts": sum(1 for record in waits if record.flags & FLAG_TIMEOUT),
+            "resets": sum(1 for record in self.records if record.kind == RESET),
+            "commands": self.commands(),
+        }
+
+    def display_type(self):
+        """Return the inky.factory display type of the recorded driver, or None."""
+        from .factory import HARDWARE_DISPLAY_CLASSES
+
+        for display_type, class_path in HARDWARE_DISPLAY_CLASSES.items():
+            if class_path == self.header.get("driver"):
+                return display_type
+        return None
+
+
+def replay(trace, emulator, realtime=False):
+    """Send the transactions of a trace to an emulated display, see inky.emulator.
+
+    Writes with no recorded payload are sent as zeros of the recorded length.
+    Busy waits wait for the emulated busy line, as the driver did.
+
+    :param trace: Trace to replay
+    :param emulator: inky.emulator.Emulator to send it to
+    :param realtime: keep to the recorded timing, rather than sending as fast as possible
+
+    Returns the time taken, in seconds.
+
+    """
+    t_start = time.perf_counter()
+    for record in trace.records:
+        if realtime:
+            delay = record.start / 1e9 - (time.perf_counter() - t_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        if record.kind == WRITE:
+            emulator.set_line(emulator.cs_pin, False)
+            emulator.set_line(emulator.dc_pin, record.dc)
+            emulator.transfer(record.payload if record.payload is not None else bytes(record.length))
+            emulator.set_line(emulator.cs_pin, True)
+        elif record.kind == BUSY_WAIT:
+            if emulator.busy.busy:
+                emulator.busy.wait(record.length / 1000)
+                emulator.busy.read()
+        elif record.kind == RESET:
+            emulator.set_line(emulator.reset_pin, False)
+            emulator.set_line(emulator.reset_pin, True)
+    return time.perf_counter() - t_start
+
+
+def report(trace, file=sys.stdout):
+    """Print a summary of a trace.
+
+    :param trace: Trace to summarise
+    :param file: file to print to
+
+    """
+    summary = trace.analyse()
+    header = trace.header
+    resolution = "x".join(str(n) for n in header.get("resolution", []))
+    print(f"Driver: {header.get('driver')} {resolution} ({header.get('colour')})", file=file)
+    print(f"Duration: {summary['duration']:.3f}s, {summary['resets']} resets", file=file)
+    print(f"Writes: {summary['writes']}, {summary['bytes']} bytes, {summary['data_bytes']} data bytes "
+          f"in {summary['write_seconds']:.3f}s ({summary['throughput'] / 1024:.1f} KiB/s)", file=file)
+    print(f"Gaps: {summary['gaps']}, {summary['gap_seconds']:.3f}s total, "
+          f"mean {summary['gap_mean'] * 1000:.3f}ms, max {summary['gap_max'] * 1000:.3f}ms", file=file)
+    print(f"Busy waits: {summary['busy_waits']}, {summary['busy_seconds']:.3f}s total, "
+          f"max {summary['busy_max']:.3f}s, {summary['busy_timeouts']} timed out", file=file)
+    print("Command  Count  Data bytes", file=file)
+    for command, (count, length) in sorted(summary["commands"].items()):
+        print(f"   0x{command:02x}  {count:5d}  {length:10d}", file=file)
+
+
+def main(argv=None):
+    """Command line entry point for inky-trace."""
+    parser = argparse.ArgumentParser(description="Analyse or replay a recorded Inky SPI trace")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_report = commands.add_parser("report", help="Report bytes per command, gaps between writes and busy waits")
+    parser_report.add_argument("trace", help="Trace file to read")
+
+    parser_replay = commands.add_parser("replay", help="Replay a trace against an emulated display")
+    parser_replay.add_argument("trace", help="Trace file to read")
+    parser_replay.add_argument("--type", "-t", default=None, help="Display type to emulate, default: the recorded driver's")
+    parser_replay.add_argument("--colour", "-c", default=None, help="Display colour, default: the recorded colour")
+    parser_replay.add_argument("--time-scale", type=float, default=0.0, help="Scale for emulated busy times, default: 0")
+    parser_replay.add_argument("--repeat", "-r", type=int, default=1, help="Number of times to replay the trace")
+    parser_replay.add_argument("--realtime", action="store_true", help="Keep to the recorded timing")
+    args = parser.parse_args(argv)
+
+    trace = Trace.load(args.trace)
+
+    if args.command == "report":
+        report(trace)
+        return 0
+
+    from .emulator import Emulator
+
+    display_type = args.type or trace.display_type()
+    if display_type is None:
+        print(f"Unknown driver {trace.header.get('driver')}, choose a display type with --type")
+        return 1
+    colour = args.colour or trace.header.get("colour")
+    emulator = Emulator(display_type, colour=None if colour == "multi" else colour, time_scale=args.time_scale)
+
+    times = []
+    try:
+        for _ in range(args.repeat):
+            times.append(replay(trace, emulator, realtime=args.realtime))
+    finally:
+        emulator.close()
+
+    stats = emulator.stats
+    print(f"Replayed {len(trace.records)} records {args.repeat} times against {display_type}")
+    print(f"Time: min {min(times) * 1000:.3f}ms, mean {sum(times) / len(times) * 1000:.3f}ms, max {max(times) * 1000:.3f}ms")
+    print(f"Bytes: {stats.bytes}, ignored: {stats.ignored_bytes}, refreshes: {stats.refreshes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
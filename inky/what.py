@@ -31,14 +31,16 @@ class InkyWHAT(inky.Inky):
     RED = 2
     YELLOW = 2
 
-    def __init__(self, colour='black'):
+    def __init__(self, colour='black', compact=False):
         """Initialise an Inky wHAT Display.
 
         :param str colour: one of 'red', 'black' or 'yellow', default: 'black'.
+        :param bool compact: Keep the buffer packed at the display's native bit depth, default: `False`.
         """
         inky.Inky.__init__(
             self,
             resolution=(self.WIDTH, self.HEIGHT),
             colour=colour,
             h_flip=False,
-            v_flip=False)
+            v_flip=False,
+            compact=compact)
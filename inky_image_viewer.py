@@ -19,6 +19,9 @@ from PIL import Image
 
 # Import from new cross-platform Inky library framework
 from inky import auto, create_inky, is_raspberry_pi
+from inky.cache import FrameCache, display_params, image_digest
+from inky.pipeline import RefreshScheduler
+from inky.prerender import prepare_image
 from inky.platform import get_implementation_type
 
 # Get the path to the script's directory
@@ -42,6 +45,12 @@ class GalleryViewer:
                  saturation=0.5, verbose=False, simulation=False):
         """Initialize the gallery viewer."""
         self.inky_display = inky_display
+        # Frames requested while the panel is refreshing replace each other,
+        # only the newest is painted once it is free
+        self.scheduler = RefreshScheduler(inky_display)
+        # Converted frames, so going back to an image skips loading and processing it,
+        # it also remembers the digest of the image loaded from each URL or file
+        self.frame_cache = FrameCache()
         self.image_urls = image_urls or []
         self.image_files = image_files or []
         self.saturation = saturation
@@ -216,6 +225,36 @@ class GalleryViewer:
         elif "file" in source:
             return load_image_from_file(source["file"], self.verbose)
     
+    def get_source_id(self, source):
+        """Get a hashable identity for an image source, files are identified by path and modification time.
+
+        URLs return None, their content can change with nothing to tell, so they are always downloaded.
+        """
+        if "url" in source:
+            return None
+        try:
+            mtime = os.path.getmtime(source["file"])
+        except OSError:
+            mtime = None
+        return ("file", source["file"], mtime)
+    
+    def get_frame_key(self, source, digest=None):
+        """Get the frame cache key for an image source, or None if it has not been loaded yet.
+
+        :param digest: digest of the source's image, default: the one remembered for the source
+        """
+        if digest is None:
+            source_id = self.get_source_id(source)
+            digest = None if source_id is None else self.frame_cache.source_digest(source_id)
+        if digest is None:
+            return None
+        return FrameCache.key(
+            digest,
+            rotation=self.rotation,
+            saturation=self.saturation,
+            **display_params(self.inky_display)
+        )
+    
     def show_current(self):
         """Display the current image with current rotation."""
         if self.verbose:
@@ -229,13 +268,37 @@ class GalleryViewer:
         
         # Load and display image
         try:
+            source = self.get_current_image_source()
+            key = self.get_frame_key(source)
+            buf = None if key is None else self.frame_cache.get(key)
+            if buf is not None:
+                if self.verbose:
+                    print("Using cached frame")
+                self.scheduler.show(buf=buf)
+                return
+            
             image = self.load_current_image()
-            self.display_image(image)
+            digest = image_digest(image)
+            source_id = self.get_source_id(source)
+            if source_id is not None:
+                self.frame_cache.remember_source(source_id, digest)
+
+            # A downloaded image may still have been converted before
+            key = self.get_frame_key(source, digest)
+            buf = self.frame_cache.get(key)
+            if buf is not None:
+                if self.verbose:
+                    print("Using cached frame")
+                self.scheduler.show(buf=buf)
+                return
+
+            buf = self.display_image(image)
+            self.frame_cache.put(key, buf)
         except Exception as e:
             print(f"Error loading image: {e}")
     
     def display_image(self, image):
-        """Prepare and display an image on the Inky display."""
+        """Prepare and display an image on the Inky display, returning the display buffer."""
         processed_image = prepare_image(
             image, 
             self.inky_display, 
@@ -247,24 +310,24 @@ class GalleryViewer:
         if self.verbose:
             print("Processing image for display...")
         
-        # Different display types have different methods for set_image
-        if 'saturation' in self.inky_display.set_image.__code__.co_varnames:
-            # For 7-color displays that support saturation
-            self.inky_display.set_image(processed_image, saturation=self.saturation)
-        else:
-            # For other displays
-            self.inky_display.set_image(processed_image)
-        
         if self.verbose:
             print("Updating display...")
         
         # Update the display
         start_time = time.time()
-        self.inky_display.show()
+        # Different display types have different methods for set_image
+        if 'saturation' in self.inky_display.set_image.__code__.co_varnames:
+            # For 7-color displays that support saturation
+            buf = self.scheduler.show(processed_image, saturation=self.saturation)
+        else:
+            # For other displays
+            buf = self.scheduler.show(processed_image)
         elapsed = time.time() - start_time
         
         if self.verbose:
-            print(f"Display updated in {elapsed:.2f} seconds")
+            print(f"Display update queued in {elapsed:.2f} seconds")
+        
+        return buf
     
     def start(self):
         """Start the gallery viewer with the first image."""
@@ -278,6 +341,8 @@ class GalleryViewer:
         self.running = False
         if self.button_thread:
             self.button_thread.join(timeout=1.0)
+        # Let the newest frame finish refreshing before exiting
+        self.scheduler.close()
 
 def get_args():
     """Parse command line arguments."""
@@ -364,49 +429,6 @@ def load_urls_from_file(file_path, verbose=False):
         print(f"Error opening URL file: {e}")
         sys.exit(1)
 
-def prepare_image(image, inky_display, rotation=0, saturation=0.5, verbose=False):
-    """Prepare image for display on Inky."""
-    if verbose:
-        print(f"Original image size: {image.width}x{image.height}")
-        print(f"Display size: {inky_display.width}x{inky_display.height}")
-    
-    # Rotate image if needed
-    if rotation:
-        image = image.rotate(rotation, expand=True)
-    
-    # Resize image to fit display while maintaining aspect ratio
-    display_width, display_height = inky_display.width, inky_display.height
-    image_ratio = image.width / image.height
-    display_ratio = display_width / display_height
-    
-    if image_ratio > display_ratio:
-        # Image is wider than display
-        new_width = display_width
-        new_height = int(display_width / image_ratio)
-    else:
-        # Image is taller than display
-        new_height = display_height
-        new_width = int(display_height * image_ratio)
-    
-    # Resize image
-    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-    
-    if verbose:
-        print(f"Resized image: {image.width}x{image.height}")
-    
-    # Create a blank canvas the size of the display
-    new_image = Image.new("RGBA", (display_width, display_height), (255, 255, 255, 255))
-    
-    # Calculate position to center image
-    x = (display_width - new_width) // 2
-    y = (display_height - new_height) // 2
-    
-    # Paste the image
-    new_image.paste(image, (x, y))
-    
-    # Convert to RGB for compatibility
-    return new_image.convert("RGB")
-
 def signal_handler(sig, frame):
     """Handle Ctrl+C to exit gracefully."""
     print("Exiting...")
@@ -28,6 +28,7 @@ if not IS_SIMULATION:
 
     try:
         from inky.auto import auto
+        from inky.pipeline import RefreshScheduler
     except ImportError:
         print("Please install the Inky library: pip install inky")
         sys.exit(1)
@@ -115,6 +116,9 @@ class StoryBuilder:
     def __init__(self, inky_display, theme="cinematic_noir", verbose=False, simulation=False):
         """Initialize the story builder with display and theme"""
         self.inky_display = inky_display
+        # Updates requested while the panel is refreshing replace each other,
+        # only the newest is painted once it is free
+        self.scheduler = None if IS_SIMULATION else RefreshScheduler(inky_display)
         self.verbose = verbose
         self.simulation = simulation
         self.current_theme = theme
@@ -450,8 +454,11 @@ class StoryBuilder:
     
     def display_image(self, img):
         """Display an image on the e-ink display"""
-        self.inky_display.set_image(img)
-        self.inky_display.show()
+        if self.scheduler is None:
+            self.inky_display.set_image(img)
+            self.inky_display.show()
+        else:
+            self.scheduler.show(img)
     
     def run(self):
         """Main run loop for the story builder"""
@@ -495,6 +502,9 @@ class StoryBuilder:
         self.running = False
         if self.button_thread:
             self.button_thread.join(timeout=1.0)
+        # Let the newest frame finish refreshing before exiting
+        if self.scheduler is not None:
+            self.scheduler.close()
 
 def main():
     # Parse command line arguments
@@ -7,9 +7,10 @@ that might otherwise have runtime side-effects.
 import sys
 from unittest import mock
 
+import numpy
 import pytest
 
-from tools import MockSMBus
+from tools import MockPygameEvents, MockSMBus
 
 
 @pytest.fixture(scope='function', autouse=True)
@@ -85,3 +86,36 @@ def PIL():
     sys.modules['PIL'] = PIL
     yield PIL
     del sys.modules['PIL']
+
+
+@pytest.fixture(scope='function', autouse=False)
+def pygame():
+    """Mock pygame module, with a working event queue."""
+    pygame = mock.MagicMock()
+    pygame.error = RuntimeError
+    pygame.QUIT, pygame.KEYDOWN, pygame.USEREVENT = 256, 768, 32866
+    pygame.K_a, pygame.K_b, pygame.K_c, pygame.K_d = 97, 98, 99, 100
+    pygame.event = MockPygameEvents()
+    pygame.time.set_timer.side_effect = pygame.event.set_timer
+    # Surfaces are their own pixel arrays, indexed [x, y], so tests can see what was drawn
+    pygame.Surface.side_effect = lambda size, *args, **kwargs: numpy.zeros(size + (3,), dtype=numpy.uint8)
+    pygame.surfarray.pixels3d.side_effect = lambda surface: surface
+    sys.modules['pygame'] = pygame
+    yield pygame
+    del sys.modules['pygame']
+
+
+@pytest.fixture(scope='function', autouse=False)
+def emulator():
+    """Create emulated displays, see inky.emulator, and close them after the test."""
+    from inky.emulator import Emulator
+
+    emulators = []
+
+    def create(display_type, colour="red", time_scale=0):
+        emulators.append(Emulator(display_type, colour=colour, time_scale=time_scale).install())
+        return emulators[-1]
+
+    yield create
+    for emulator in emulators:
+        emulator.close()
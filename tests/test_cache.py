@@ -0,0 +1,84 @@
+"""Frame cache tests for Inky."""
+import pytest
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_frame_cache_evicts_least_recently_used(tmp_path, monkeypatch, on_disk):
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path) if on_disk else "")
+    from inky.cache import FrameCache
+
+    frames = [numpy.full((10, 100), i, dtype=numpy.uint8) for i in range(3)]
+    cache = FrameCache(max_bytes=2500)
+
+    cache.put("a", frames[0])
+    cache.put("b", frames[1])
+    assert (cache.get("a") == frames[0]).all()
+
+    cache.put("c", frames[2])
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.size <= 2500
+    assert cache.get("b") is None
+
+    if on_disk:
+        assert len(list(tmp_path.glob("frames/*.npy"))) == 2
+
+
+def test_frame_cache_persists(tmp_path, monkeypatch):
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky.cache import FrameCache
+
+    FrameCache().put("a", numpy.arange(16, dtype=numpy.uint8))
+
+    cache = FrameCache()
+    assert len(cache) == 1
+    assert cache.get("a").tolist() == list(range(16))
+
+
+def test_frame_cache_key():
+    from PIL import Image
+
+    from inky.cache import FrameCache, image_digest
+
+    red = image_digest(Image.new("RGB", (4, 4), (255, 0, 0)))
+    assert red == image_digest(Image.new("RGB", (4, 4), (255, 0, 0)))
+    assert red != image_digest(Image.new("RGB", (4, 4), (0, 0, 255)))
+
+    assert FrameCache.key(red, rotation=0, saturation=0.5) == FrameCache.key(red, saturation=0.5, rotation=0)
+    assert FrameCache.key(red, rotation=0, saturation=0.5) != FrameCache.key(red, rotation=90, saturation=0.5)
+
+
+def test_frame_cache_scan_enforces_max_bytes(tmp_path, monkeypatch):
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky.cache import FrameCache
+
+    cache = FrameCache()
+    for key in "abc":
+        cache.put(key, numpy.zeros(1000, dtype=numpy.uint8))
+
+    cache = FrameCache(max_bytes=2500)
+    assert cache.size <= 2500
+    assert "a" not in cache
+    assert "c" in cache
+    assert len(list(tmp_path.glob("frames/*.npy"))) == len(cache)
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_frame_cache_remembers_sources(tmp_path, monkeypatch, on_disk):
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path) if on_disk else "")
+    from inky.cache import FrameCache
+
+    cache = FrameCache()
+    assert cache.source_digest(("file", "a.png", 1.0)) is None
+    cache.remember_source(("file", "a.png", 1.0), "abc")
+    assert cache.source_digest(("file", "a.png", 1.0)) == "abc"
+
+    # Found again after a restart, without loading the image
+    restarted = FrameCache()
+    assert restarted.source_digest(("file", "a.png", 1.0)) == ("abc" if on_disk else None)
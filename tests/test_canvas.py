@@ -0,0 +1,67 @@
+"""PIL canvas tests for Inky."""
+import importlib
+
+import numpy
+import pytest
+
+from tools import MockSPIBus
+
+
+@pytest.mark.parametrize('driver,kwargs', [
+    ('inky', {'resolution': (212, 104)}),
+    ('inky_ssd1608', {}),
+    ('inky_uc8159', {}),
+    ('inky_ac073tc1a', {'compact': True}),
+])
+def test_canvas_draws_into_buffer(GPIO, spidev, smbus2, driver, kwargs):
+    """Drawing on the canvas should land in the display buffer."""
+    from PIL import ImageDraw
+
+    Inky = importlib.import_module(f'inky.{driver}').Inky
+    display = Inky(spi_bus=MockSPIBus(), **kwargs)
+
+    with display.canvas() as image:
+        assert image.mode == "P"
+        assert image.size == (display.width, display.height)
+        ImageDraw.Draw(image).rectangle((5, 6, 9, 8), fill=display.RED)
+
+    buf = numpy.array(display.buf)
+    x0, y0 = getattr(display, "offset_x", 0), getattr(display, "offset_y", 0)
+    assert (buf[y0 + 6:y0 + 9, x0 + 5:x0 + 10] == display.RED).all()
+    assert (buf == display.RED).sum() == 15
+
+
+def test_canvas_shares_memory(GPIO, spidev, smbus2):
+    """The canvas should write straight into the buffer, before the context exits."""
+    from inky.inky_uc8159 import Inky
+
+    display = Inky(spi_bus=MockSPIBus())
+    buf = display.buf
+    with display.canvas() as image:
+        image.putpixel((3, 4), display.BLUE)
+        assert buf[4, 3] == display.BLUE
+    assert display.buf is buf
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_canvas_matches_set_image(GPIO, spidev, smbus2, compact):
+    """The canvas should cover the same pixels as set_image(), on a panel that shows a window onto its buffer."""
+    from PIL import Image, ImageDraw
+
+    from inky.inky_ssd1608 import Inky
+
+    drawn = []
+    for use_canvas in (False, True):
+        display = Inky(spi_bus=MockSPIBus(), colour="red", compact=compact)
+        assert display.offset_y
+        if use_canvas:
+            with display.canvas() as image:
+                ImageDraw.Draw(image).rectangle((0, 0, 20, 3), fill=display.RED)
+        else:
+            image = Image.new("P", (display.width, display.height), display.WHITE)
+            ImageDraw.Draw(image).rectangle((0, 0, 20, 3), fill=display.RED)
+            display.set_image(image)
+        drawn.append(numpy.array(display.buf))
+
+    assert (drawn[0] == display.RED).sum() == 21 * 4
+    assert numpy.array_equal(drawn[0], drawn[1])
@@ -0,0 +1,114 @@
+"""Dithering tests for Inky."""
+import pytest
+
+PALETTE = [0, 0, 0, 255, 255, 255, 0, 255, 0, 0, 0, 255, 255, 0, 0, 255, 255, 0, 255, 128, 0]
+
+
+@pytest.mark.parametrize('kernel', ['floyd', 'stucki', 'atkinson'])
+def test_diffuse_matches_serial(kernel):
+    """Wavefront order should give the same result as pixel-by-pixel diffusion."""
+    import numpy
+
+    from inky.dither import KERNELS, diffuse
+
+    image = numpy.random.default_rng(0).integers(0, 256, (17, 23, 3)).astype(numpy.float32)
+    colours = numpy.array(PALETTE, dtype=numpy.float32).reshape((-1, 3))
+    divisor, weights = KERNELS[kernel]
+
+    work = image.copy()
+    height, width, _ = work.shape
+    expected = numpy.zeros((height, width), dtype=numpy.uint8)
+    for y in range(height):
+        for x in range(width):
+            value = numpy.clip(work[y, x], 0, 255)
+            index = ((colours - value) ** 2).sum(axis=1).argmin()
+            expected[y, x] = index
+            for dy, dx, weight in weights:
+                if y + dy < height and 0 <= x + dx < width:
+                    work[y + dy, x + dx] += (value - colours[index]) * numpy.float32(weight / divisor)
+
+    assert (diffuse(image, PALETTE, kernel) == expected).all()
+
+
+def test_dither_unknown_method():
+    from inky.dither import dither
+
+    with pytest.raises(ValueError):
+        dither([[[0, 0, 0]]], PALETTE, "jarvis")
+
+
+@pytest.mark.parametrize('method', ['floyd', 'bayer', 'none'])
+@pytest.mark.parametrize('match', ['rgb', 'lab'])
+def test_uc8159_set_image_dither(GPIO, spidev, smbus2, tmp_path, monkeypatch, method, match):
+    from PIL import Image
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+
+    from inky.inky_uc8159 import BLACK, GREEN, Inky
+
+    display = Inky()
+    image = Image.new("RGB", display.resolution, (0, 255, 0))
+    image.putpixel((0, 0), (0, 0, 0))
+    display.set_image(image, saturation=0, dither=method, match=match)
+
+    assert display.buf.shape == (display.rows, display.cols)
+    assert display.buf[0, 0] == BLACK
+    assert display.buf[-1, -1] == GREEN
+
+
+@pytest.mark.parametrize('method', ['floyd', 'bayer', 'none'])
+def test_dither_workers(tmp_path, monkeypatch, method):
+    """Splitting the image into bands should only change error diffusion near seams."""
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky.dither import SEAM_ROWS, dither
+
+    # A smooth gradient keeps diffusion well behaved, unlike noise
+    gradient = numpy.linspace(0, 255, 90, dtype=numpy.float32)
+    image = numpy.stack(numpy.broadcast_arrays(gradient[:, None], gradient[None, :], 128.0), axis=-1)
+
+    single = dither(image, PALETTE, method)
+    banded = dither(image, PALETTE, method, workers=3)
+
+    assert banded.shape == single.shape
+    if method == 'floyd':
+        # The first band is dithered exactly as before, later ones keep the same average colour
+        assert (banded[:SEAM_ROWS] == single[:SEAM_ROWS]).all()
+        colours = numpy.array(PALETTE, dtype=numpy.float32).reshape((-1, 3))
+        blocks = [colours[result].reshape((9, 10, 9, 10, 3)).mean(axis=(1, 3)) for result in (single, banded)]
+        assert numpy.abs(blocks[0] - blocks[1]).max() < 24
+    else:
+        assert (banded == single).all()
+
+
+def test_simple_simulator_set_image_dither():
+    from PIL import Image
+
+    from inky.simple_simulator import InkySimpleSimulator
+
+    display = InkySimpleSimulator(display_type="what", colour="red")
+    display.set_image(Image.new("RGB", (400, 300), (255, 0, 0)), dither="floyd")
+
+    assert display.image.mode == "P"
+    assert (display.buf == 2).all()
+
+
+def test_simulators_dither_with_workers(pygame):
+    """The simulators should dither when only workers or match is given, as the drivers do."""
+    import numpy
+    from PIL import Image
+
+    from inky import dither
+    from inky.simple_simulator import InkySimpleSimulator
+    from inky.simulator import InkySimulator
+
+    image = Image.fromarray(numpy.random.default_rng(2).integers(0, 256, (30, 40, 3), dtype=numpy.uint8), "RGB")
+    for display in (InkySimpleSimulator(colour="red", resolution=(40, 30)), InkySimulator(colour="red", resolution=(40, 30))):
+        palette = display._image_palette() if isinstance(display, InkySimpleSimulator) else display._image_palette(0.5)
+
+        display.set_image(image, workers=2)
+        assert numpy.array_equal(display.buf, dither.dither(image, palette, "floyd", "rgb"))
+
+        display.set_image(image, match="lab")
+        assert numpy.array_equal(display.buf, dither.dither(image, palette, "none", "lab"))
@@ -0,0 +1,84 @@
+"""Bulk drawing tests for Inky."""
+import importlib
+
+import numpy
+import pytest
+
+from tools import MockSPIBus
+
+DRIVERS = [
+    ('inky', {'resolution': (212, 104)}),
+    ('inky_ssd1608', {}),
+    ('inky_ssd1683', {}),
+    ('inky_uc8159', {}),
+    ('inky_ac073tc1a', {'compact': True}),
+    ('inky', {'resolution': (400, 300), 'compact': True, 'h_flip': True}),
+]
+
+
+def displays(driver, kwargs):
+    Inky = importlib.import_module(f'inky.{driver}').Inky
+    return Inky(spi_bus=MockSPIBus(), **kwargs), Inky(spi_bus=MockSPIBus(), **kwargs)
+
+
+@pytest.mark.parametrize('driver,kwargs', DRIVERS)
+def test_set_pixels_matches_set_pixel(GPIO, spidev, smbus2, driver, kwargs):
+    """set_pixels should clip and validate exactly as set_pixel does."""
+    bulk, single = displays(driver, kwargs)
+
+    rng = numpy.random.default_rng(0)
+    xs = rng.integers(-10, bulk.width + 10, 2000)
+    ys = rng.integers(-10, bulk.height + 10, 2000)
+    values = rng.integers(0, 16, 2000)
+
+    bulk.set_pixels(xs, ys, values)
+    for x, y, v in zip(xs, ys, values):
+        if 0 <= x < single.width and 0 <= y < single.height:
+            single.set_pixel(int(x), int(y), int(v))
+
+    assert numpy.array_equal(numpy.array(bulk.buf), numpy.array(single.buf))
+
+
+@pytest.mark.parametrize('driver,kwargs', DRIVERS)
+def test_fill_rect_and_lines(GPIO, spidev, smbus2, driver, kwargs):
+    """Rectangles and lines should be clipped to the display."""
+    display, _ = displays(driver, kwargs)
+    red = display.RED
+
+    display.fill_rect(-5, -5, 15, 10, red)
+    display.hline(display.width - 3, 20, 10, red)
+    display.vline(30, display.height - 2, 10, red)
+
+    buf = numpy.array(display.buf)[:display.height, :display.width]
+    expected = numpy.zeros_like(buf)
+    expected[0:5, 0:10] = red
+    expected[20, display.width - 3:] = red
+    expected[display.height - 2:, 30] = red
+    assert numpy.array_equal(buf == red, expected == red)
+
+
+def test_blit_skips_invalid_colours(GPIO, spidev, smbus2):
+    """Colours a two colour display does not support should leave the pixel beneath."""
+    from inky.inky import Inky
+
+    display = Inky((400, 300), spi_bus=MockSPIBus())
+    display.fill_rect(0, 0, 400, 300, display.BLACK)
+
+    sprite = numpy.array([[0, 2], [5, 1]])
+    display.blit(sprite, 398, -1)
+
+    # The top row is clipped, the bottom row lands on row 0 and 5 is not a colour
+    assert display.buf[0:2, 398:400].tolist() == [[display.BLACK, display.BLACK], [display.BLACK, display.BLACK]]
+
+    display.blit(sprite, 10, 10)
+    assert display.buf[10:12, 10:12].tolist() == [[0, 2], [1, 1]]
+
+
+def test_simulator_draws(GPIO):
+    """Simulators should share the drawing methods."""
+    from inky.simple_simulator import InkySimpleSimulator
+
+    display = InkySimpleSimulator("impressions")
+    display.fill_rect(10, 10, 20, 5, 0x13)
+    assert display.buf[12, 15] == 3
+    assert display.buf[9, 15] == 0
@@ -0,0 +1,107 @@
+"""Test the emulated display controllers against the real drivers."""
+import numpy
+import pytest
+
+DISPLAY_TYPES = ["phat", "what", "phatssd1608", "whatssd1683", "impressions", "impressions73"]
+
+
+def _fill(display):
+    colours = [display.WHITE, display.BLACK, display.RED]
+    rng = numpy.random.default_rng(1)
+    display.blit(rng.choice(colours, size=(display.height, display.width)))
+
+
+@pytest.mark.parametrize("display_type", DISPLAY_TYPES)
+@pytest.mark.parametrize("compact", [False, True])
+def test_emulator_decodes_frame(emulator, display_type, compact):
+    """Test a frame shown through the emulator decodes back to the display buffer."""
+    board = emulator(display_type)
+    display = board.create(compact=compact)
+    _fill(display)
+    display.show()
+
+    assert board.stats.refreshes == 1
+    assert board.stats.ignored_bytes == 0
+    assert numpy.array_equal(board.pixels(), numpy.asarray(display.buf))
+    assert board.image().size == (display.width, display.height)
+
+
+def test_emulator_counts_bytes(emulator):
+    """Test data bytes are counted per command."""
+    board = emulator("phat")
+    display = board.create()
+    display.set_pixel(0, 0, display.RED)
+    display.show()
+
+    plane_size = 212 * 104 // 8
+    assert board.stats.command_bytes[0x24] == plane_size
+    assert board.stats.command_bytes[0x26] == plane_size
+    assert board.stats.commands[0x20] == 1
+
+    display.set_pixel(1, 0, display.BLACK)
+    display.show()
+
+    # Deep sleep after the first refresh needs a reset, both planes are sent again after it
+    assert board.stats.command_bytes[0x24] == plane_size * 2
+    assert board.stats.command_bytes[0x26] == plane_size * 2
+    assert board.stats.ignored_bytes == 0
+    assert numpy.array_equal(board.pixels(), numpy.asarray(display.buf))
+
+
+def test_emulator_uc8159_commands(emulator):
+    """Test the UC8159 resolution, frame data and refresh are decoded."""
+    board = emulator("impressions")
+    display = board.create()
+    display.set_pixel(10, 5, display.ORANGE)
+    display.show()
+
+    controller = board.controller
+    assert (controller.width, controller.height) == (600, 448)
+    assert board.stats.command_bytes[0x10] == 600 * 448 // 2
+    assert not controller.powered
+    assert board.pixels()[5, 10] == display.ORANGE
+    assert board.image().getpixel((10, 5)) == display.ORANGE
+
+
+def test_emulator_busy_until_refresh_waited(emulator):
+    """Test the busy line is held through a refresh until the driver waits for it."""
+    board = emulator("what", time_scale=0.001)
+    display = board.create()
+    display.show(busy_wait=False)
+
+    assert board.busy.busy
+    display._wait_for_refresh()
+    assert not board.busy.busy
+    assert board.stats.busy_seconds >= board.controller.refresh_time
+
+
+def test_emulator_lut(emulator):
+    """Test the waveform LUT sent by the driver is kept."""
+    board = emulator("phat", colour="red")
+    display = board.create()
+    display.show()
+
+    assert board.controller.lut == bytes(display._luts[display.lut])
+
+
+def test_emulator_eeprom(emulator):
+    """Test the emulated EEPROM identifies the display."""
+    emulator("whatssd1683", colour="yellow")
+
+    from inky import eeprom
+
+    display = eeprom.read_eeprom()
+    assert (display.width, display.height) == (400, 300)
+    assert display.get_color() == "yellow"
+    assert display.display_variant == 19
+
+
+def test_emulator_unknown_display():
+    """Test unknown display types and colours are rejected."""
+    from inky.emulator import Emulator
+
+    with pytest.raises(ValueError):
+        Emulator("nope")
+
+    with pytest.raises(ValueError):
+        Emulator("phat", colour="blue")
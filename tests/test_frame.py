@@ -0,0 +1,49 @@
+"""Compiled frame tests for Inky."""
+import pytest
+
+from tools import MockSPIBus
+
+
+@pytest.mark.parametrize('driver', ['inky', 'inky_ssd1683', 'inky_uc8159', 'inky_ac073tc1a'])
+def test_compiled_frame_round_trip(GPIO, spidev, smbus2, tmp_path, driver):
+    """A saved and loaded frame should send the same data as show()."""
+    import importlib
+
+    module = importlib.import_module(f'inky.{driver}')
+    bus = MockSPIBus()
+    display = module.Inky(spi_bus=bus)
+    display.set_pixel(1, 1, display.BLACK if hasattr(display, 'BLACK') else 1)
+    display.show()
+    sent = bus.data()
+
+    from inky.frame import CompiledFrame
+
+    display.compile().save(tmp_path / "frame.inkyframe")
+    frame = CompiledFrame.load(tmp_path / "frame.inkyframe")
+    assert frame.resolution == display.resolution
+
+    display = module.Inky(spi_bus=bus)
+    bus.transfers = []
+    display.show_frame(frame)
+    assert bus.data() == sent
+
+
+def test_compiled_frame_checks(GPIO, spidev, smbus2, tmp_path):
+    from inky.frame import CompiledFrame
+    from inky.inky import Inky
+
+    frame = Inky((400, 300), spi_bus=MockSPIBus()).compile()
+    with pytest.raises(ValueError):
+        Inky((212, 104), spi_bus=MockSPIBus()).show_frame(frame)
+
+    path = tmp_path / "frame.inkyframe"
+    frame.save(path)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        CompiledFrame.load(path)
+
+    path.write_bytes(b"not a frame")
+    with pytest.raises(ValueError):
+        CompiledFrame.load(path)
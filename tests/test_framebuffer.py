@@ -0,0 +1,96 @@
+"""Compact framebuffer tests for Inky."""
+import importlib
+import tracemalloc
+
+import numpy
+import pytest
+
+from tools import MockSPIBus
+
+
+def draw(display, seed):
+    rng = numpy.random.default_rng(seed)
+    colours = 8 if display.colour == "multi" else 3
+    for x, y, v in zip(rng.integers(0, display.width, 500), rng.integers(0, display.height, 500), rng.integers(0, colours, 500)):
+        display.set_pixel(int(x), int(y), int(v))
+
+
+@pytest.mark.parametrize('driver,kwargs', [
+    ('inky', {'resolution': (400, 300)}),
+    ('inky', {'resolution': (212, 104), 'colour': 'red'}),
+    ('inky_ssd1608', {'colour': 'yellow'}),
+    ('inky_ssd1683', {'h_flip': True}),
+    ('inky_uc8159', {'v_flip': True}),
+    ('inky_ac073tc1a', {}),
+])
+def test_compact_matches_array(GPIO, spidev, smbus2, driver, kwargs):
+    """A compact buffer should send the same data as a regular one, in less memory."""
+    Inky = importlib.import_module(f'inky.{driver}').Inky
+
+    sent = []
+    for compact in (False, True):
+        bus = MockSPIBus()
+        display = Inky(spi_bus=bus, compact=compact, **kwargs)
+        draw(display, 0)
+        display.show()
+        sent.append((bus.data(), numpy.array(display.buf), display.buf.nbytes))
+
+    (regular, regular_buf, regular_bytes), (compact, compact_buf, compact_bytes) = sent
+    assert compact == regular
+    assert compact_bytes * 2 <= regular_bytes
+    if driver != 'inky_ac073tc1a':
+        # The 7.3" display stores clean as white
+        assert numpy.array_equal(compact_buf, regular_buf)
+
+
+def test_compact_set_image_and_reorient(GPIO, spidev, smbus2):
+    """Images and changes of orientation should survive packing."""
+    from PIL import Image
+
+    from inky.inky_uc8159 import Inky
+
+    image = Image.fromarray(numpy.random.default_rng(1).integers(0, 7, (448, 600), dtype=numpy.uint8), "L").convert("P")
+
+    regular = Inky(spi_bus=MockSPIBus())
+    compact = Inky(spi_bus=MockSPIBus(), compact=True)
+    for display in (regular, compact):
+        display.set_image(image)
+        display.set_pixel(5, 6, display.ORANGE)
+        display.h_flip = True
+
+    assert compact.buf[6, 5] == compact.ORANGE
+    assert numpy.array_equal(numpy.array(compact.buf), regular.buf)
+    assert bytes(compact._pack()[0]) == bytes(regular._pack()[0])
+
+
+def test_bit_plane_padding():
+    """Unused bits in the last byte should stay clear."""
+    from inky.framebuffer import BitPlaneFramebuffer
+
+    buf = BitPlaneFramebuffer((3, 3))
+    buf[2, 2] = 2
+    assert [plane[-1] for plane in buf.planes] == [0x80, 0x80]
+    assert buf[2, 2] == 2
+    assert buf[-1, -1] == 2
+    with pytest.raises(IndexError):
+        buf[3, 0] = 1
+
+
+@pytest.mark.parametrize('cls,shape,kwargs,divisor', [
+    ('BitPlaneFramebuffer', (300, 400), {}, 4),
+    ('NibbleFramebuffer', (480, 800), {'remap': {7: 1}}, 2),
+    ('NibbleFramebuffer', (480, 799), {}, 2),
+])
+def test_compact_memory(cls, shape, kwargs, divisor):
+    """A compact buffer should hold only its packed planes, even after a write that repacks it."""
+    from inky import framebuffer
+
+    size = shape[0] * shape[1]
+    tracemalloc.start()
+    buf = getattr(framebuffer, cls)(shape, rotation=90, **kwargs)
+    buf[10:20, 10:20] = 1
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert buf[15, 15] == 1
+    assert held < size // divisor + 4096
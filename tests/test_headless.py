@@ -0,0 +1,92 @@
+"""Test the headless simulator."""
+import os
+
+import numpy
+import pytest
+from PIL import Image
+
+
+def test_headless_create():
+    """Test the headless simulator is selected with simulation="headless"."""
+    from inky.factory import create_inky
+    from inky.headless import InkyHeadless
+
+    display = create_inky("phat", "red", simulation="headless")
+    assert isinstance(display, InkyHeadless)
+    assert display.resolution == (212, 104)
+    assert display.colour == "red"
+
+    display = create_inky("impressions73", simulation="headless")
+    assert display.resolution == (800, 480)
+    assert display.colour == "multi"
+
+    with pytest.raises(ValueError):
+        create_inky("nope", simulation="headless")
+
+
+def test_headless_ring_buffer():
+    """Test the most recent frames are kept, oldest first."""
+    from inky.headless import InkyHeadless
+
+    display = InkyHeadless(resolution=(40, 30), frames=3)
+    for colour in range(5):
+        display.fill_rect(0, 0, 40, 30, colour)
+        display.show()
+
+    assert display.frames_shown == 5
+    assert [int(frame[0, 0]) for frame in display.frames] == [2, 3, 4]
+    assert display.image().getpixel((0, 0)) == 4
+    assert display.fps > 0
+
+
+def test_headless_orientation():
+    """Test frames are flipped and rotated as a display would show them."""
+    from inky.headless import InkyHeadless
+
+    display = InkyHeadless(resolution=(40, 30), colour="red", rotation=90, h_flip=True)
+    display.set_pixel(1, 2, display.RED)
+    display.show()
+
+    expected = numpy.rot90(numpy.asarray(display.buf)[::-1, :], 1)
+    assert numpy.array_equal(display.frames[-1], expected)
+    assert display.image().size == (30, 40)
+
+
+def test_headless_set_image():
+    """Test RGB images are matched to the display colours."""
+    from inky.headless import InkyHeadless
+
+    display = InkyHeadless(resolution=(40, 30), colour="red")
+    display.set_image(Image.new("RGB", (40, 30), (255, 0, 0)))
+    display.show()
+
+    assert (display.frames[-1] == display.RED).all()
+
+
+def test_headless_sink(tmpdir):
+    """Test frames are written to a PNG sink, or passed to a callable."""
+    from inky.headless import InkyHeadless
+
+    path = str(tmpdir.join("frames"))
+    display = InkyHeadless(resolution=(40, 30), sink=path)
+    display.show()
+    display.show()
+    assert sorted(os.listdir(path)) == ["frame-000001.png", "frame-000002.png"]
+
+    images = []
+    display = InkyHeadless(resolution=(40, 30), sink=images.append)
+    display.show()
+    assert len(images) == 1
+    assert images[0].size == (40, 30)
+
+
+def test_headless_no_frames():
+    """Test image() is None before the first show(), and a ring buffer needs a frame."""
+    from inky.headless import InkyHeadless
+
+    display = InkyHeadless(resolution=(40, 30))
+    assert display.image() is None
+    assert display.frames == []
+
+    with pytest.raises(ValueError):
+        InkyHeadless(resolution=(40, 30), frames=0)
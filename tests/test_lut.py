@@ -0,0 +1,72 @@
+"""Palette lookup table tests for Inky."""
+PALETTE = [0, 0, 0, 255, 255, 255, 0, 255, 0, 0, 0, 255, 255, 0, 0, 255, 255, 0, 255, 128, 0]
+
+
+def test_palette_lut_matches_nearest(tmp_path, monkeypatch):
+    """The table should agree with a direct search at the centre of each cell."""
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky.lut import _grid, lookup, nearest, palette_lut
+
+    lut = palette_lut(PALETTE, bits=5)
+    assert lut.shape == (32, 32, 32)
+
+    grid = _grid(5)
+    colours = numpy.array(PALETTE, dtype=numpy.float32).reshape((-1, 3))
+    assert (lookup(grid, lut) == nearest(grid, colours)).all()
+
+
+def test_palette_lut_cached_on_disk(tmp_path, monkeypatch):
+    """A second process should memory-map the table instead of building it."""
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky import lut
+
+    table = lut.palette_lut(PALETTE, bits=4)
+    assert lut.palette_lut(PALETTE, bits=4) is table
+    assert len(list(tmp_path.glob("lut-rgb-4-*.npy"))) == 1
+
+    lut._luts.clear()
+    monkeypatch.setattr(lut, "_build", None)
+    loaded = lut.palette_lut(PALETTE, bits=4)
+    assert isinstance(loaded, numpy.memmap)
+    assert (loaded == table).all()
+
+
+def test_palette_lut_memory_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("INKY_CACHE_DIR", "")
+    from inky.lut import cache_dir, palette_lut
+
+    assert cache_dir() is None
+    assert palette_lut(PALETTE, bits=3).shape == (8, 8, 8)
+
+
+def test_ciede2000_reference():
+    """Check against reference pairs from Sharma, Wu and Dalal (2005)."""
+    import numpy
+
+    from inky.lut import ciede2000
+
+    pairs = [
+        ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+        ((50.0, 2.5, 0.0), (50.0, 0.0, -2.5), 4.3065),
+        ((50.0, 2.5, 0.0), (73.0, 25.0, -18.0), 27.1492),
+        ((2.0776, 0.0795, -1.135), (0.9033, -0.0636, -0.5514), 0.9082),
+        ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ]
+    lab1, lab2, expected = (numpy.array(column) for column in zip(*pairs))
+    assert numpy.allclose(ciede2000(lab1, lab2), expected, atol=1e-4)
+
+
+def test_lab_lut(tmp_path, monkeypatch):
+    import numpy
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmp_path))
+    from inky.lut import lab_lut, lookup
+
+    lut = lab_lut(PALETTE, bits=4)
+    assert len(list(tmp_path.glob("lut-lab-4-*.npy"))) == 1
+    assert lookup(numpy.array([[255, 255, 255]], dtype=numpy.uint8), lut).tolist() == [1]
+    assert lookup(numpy.array([[250, 10, 10]], dtype=numpy.uint8), lut).tolist() == [4]
@@ -0,0 +1,78 @@
+"""Packing plan tests for Inky."""
+import tracemalloc
+
+import numpy
+import pytest
+
+ORIENTATIONS = [(v_flip, h_flip, rotation) for v_flip in (False, True) for h_flip in (False, True) for rotation in (0, 90, 180, 270)]
+
+
+def reference_region(buf, v_flip, h_flip, rotation):
+    region = buf
+    if v_flip:
+        region = numpy.fliplr(region)
+    if h_flip:
+        region = numpy.flipud(region)
+    if rotation:
+        region = numpy.rot90(region, rotation // 90)
+    return region
+
+
+@pytest.mark.parametrize('shape', [(104, 212), (122, 250), (300, 400)])
+@pytest.mark.parametrize('v_flip,h_flip,rotation', ORIENTATIONS)
+def test_bit_planes_match_packbits(shape, v_flip, h_flip, rotation):
+    """Bit planes should match numpy.packbits, including a padded last byte."""
+    from inky.packing import BitPlanePacker
+
+    buf = numpy.random.default_rng(0).integers(0, 3, shape, dtype=numpy.uint8)
+    region = reference_region(buf, v_flip, h_flip, rotation)
+
+    plane_a, plane_b = BitPlanePacker(shape, v_flip, h_flip, rotation, black=1, red=2).pack(buf)
+    assert numpy.array_equal(plane_a, numpy.packbits(region != 1))
+    assert numpy.array_equal(plane_b, numpy.packbits(region == 2))
+
+
+@pytest.mark.parametrize('v_flip,h_flip,rotation', ORIENTATIONS)
+def test_nibbles_match_reference(v_flip, h_flip, rotation):
+    """Nibble packing should match packing the flattened buffer, with clean sent as white."""
+    from inky.packing import NibblePacker
+
+    buf = numpy.random.default_rng(0).integers(0, 8, (448, 600), dtype=numpy.uint8)
+    flat = numpy.ascontiguousarray(reference_region(buf, v_flip, h_flip, rotation)).ravel()
+    expected = ((flat[::2] << 4) & 0xF0) | (flat[1::2] & 0x0F)
+    expected = numpy.where(expected & 0x0F == 0x07, (expected & 0xF0) | 0x01, expected)
+    expected = numpy.where(expected & 0xF0 == 0x70, (expected & 0x0F) | 0x10, expected)
+
+    (packed,) = NibblePacker(buf.shape, v_flip, h_flip, rotation, remap={7: 1}).pack(buf)
+    assert numpy.array_equal(packed, expected)
+
+
+def test_pack_reuses_buffers():
+    """Packing a frame should not allocate frame-sized arrays once the plan exists."""
+    from inky.packing import NibblePacker
+
+    buf = numpy.zeros((480, 800), dtype=numpy.uint8)
+    packer = NibblePacker(buf.shape, True, False, 90, remap={7: 1})
+    (first,) = packer.pack(buf)
+
+    tracemalloc.start()
+    (second,) = packer.pack(buf)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert second is first
+    assert peak < buf.size // 8
+
+
+def test_driver_compile_keeps_copy(GPIO, spidev, smbus2):
+    """Compiled frames should not change when the driver packs the next frame."""
+    from inky.inky_uc8159 import Inky
+    from tools import MockSPIBus
+
+    display = Inky(spi_bus=MockSPIBus())
+    frame = display.compile()
+    before = bytes(frame.planes[0])
+
+    display.set_pixel(0, 0, 3)
+    display._pack()
+    assert bytes(frame.planes[0]) == before
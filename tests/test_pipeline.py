@@ -0,0 +1,84 @@
+"""Pipelined show tests for Inky."""
+from tools import MockSPIBus
+
+
+def test_pipeline_snapshots_frames(GPIO, spidev, smbus2):
+    """Frames should be sent as they were when queued, not as the buffer is now."""
+    from inky.inky_uc8159 import UC8159_DTM1, UC8159_POF, Inky
+    from inky.pipeline import FramePipeline
+
+    display = Inky(spi_bus=MockSPIBus())
+    frames = []
+    commands = []
+    send_command = display._send_command
+
+    def record(command, data=None):
+        commands.append(command)
+        if command == UC8159_DTM1:
+            frames.append(bytes(data))
+        send_command(command, data)
+
+    display._send_command = record
+
+    with FramePipeline(display) as pipeline:
+        display.set_pixel(0, 0, display.GREEN)
+        pipeline.show()
+        display.set_pixel(0, 0, display.BLUE)
+        pipeline.show()
+
+    assert [frame[0] >> 4 for frame in frames] == [display.GREEN, display.BLUE]
+    # Power off is only sent once each refresh has finished
+    assert commands.count(UC8159_POF) == 2
+    assert commands[-1] == UC8159_POF
+    assert not display._refresh_pending
+
+
+def test_pipeline_simulator(GPIO, spidev, smbus2):
+    """Displays without packed frames should be shown straight away."""
+    from unittest import mock
+
+    from inky.pipeline import FramePipeline
+
+    display = mock.Mock(spec=["show"])
+    with FramePipeline(display) as pipeline:
+        pipeline.show()
+
+    display.show.assert_called_once_with()
+
+
+def test_scheduler_coalesces_frames(GPIO, spidev, smbus2):
+    """Frames submitted during a refresh should be replaced by the newest one."""
+    import threading
+
+    from inky.pipeline import RefreshScheduler
+
+    class Display:
+        def __init__(self):
+            self.buf = [0]
+            self.sent = []
+            self.refreshing = threading.Event()
+            self.release = threading.Event()
+
+        def _pack(self):
+            return (list(self.buf),)
+
+        def _wait_for_refresh(self):
+            if self.sent:
+                self.release.wait()
+
+        def _update(self, buf, busy_wait=True):
+            self.sent.append(buf[0])
+            self.refreshing.set()
+
+    display = Display()
+    with RefreshScheduler(display) as scheduler:
+        scheduler.show()
+        display.refreshing.wait()
+        for value in range(1, 6):
+            display.buf = [value]
+            scheduler.show()
+        display.release.set()
+
+    assert display.sent == [0, 5]
+    assert scheduler.frames_shown == 2
+    assert scheduler.frames_dropped == 4
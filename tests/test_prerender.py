@@ -0,0 +1,66 @@
+"""Pre-render tests for Inky."""
+import json
+
+from PIL import Image
+
+
+def test_prerender_directory(GPIO, spidev, smbus2, tmp_path):
+    """Every image in a directory should become a frame listed in the manifest."""
+    from inky.frame import CompiledFrame
+    from inky.prerender import main
+
+    source = tmp_path / "images"
+    source.mkdir()
+    Image.new("RGB", (200, 100), (255, 0, 0)).save(source / "red.png")
+    Image.new("RGB", (100, 200), (0, 0, 255)).save(source / "blue.jpg")
+    (source / "notes.txt").write_text("not an image")
+
+    output = tmp_path / "frames"
+    assert main([str(source), "--output", str(output), "--type", "impressions73", "--jobs", "1"]) == 0
+
+    manifest = json.loads((output / "manifest.json").read_text())
+    assert manifest["driver"] == "inky.inky_ac073tc1a.Inky"
+    assert [entry["source"] for entry in manifest["frames"]] == [str(source / "blue.jpg"), str(source / "red.png")]
+
+    for entry in manifest["frames"]:
+        frame = CompiledFrame.load(output / entry["frame"])
+        assert frame.checksum == entry["crc32"]
+        assert frame.resolution == (800, 480)
+
+
+def test_prerender_without_gpio(tmp_path):
+    """Frames should be compiled without the GPIO and SPI mocks, as on a build machine, and leave sys.modules as it was."""
+    import sys
+
+    from inky.frame import CompiledFrame
+    from inky.prerender import render
+
+    modules = {module: sys.modules.get(module) for module in ("gpiod", "gpiod.line", "gpiodevice", "spidev", "smbus2")}
+
+    Image.new("RGB", (300, 200), (255, 0, 0)).save(tmp_path / "red.png")
+    manifest = render([str(tmp_path / "red.png")], str(tmp_path / "frames"), "impressions", jobs=1)
+
+    assert manifest["driver"] == "inky.inky_uc8159.Inky"
+    frame = CompiledFrame.load(tmp_path / "frames" / manifest["frames"][0]["frame"])
+    assert frame.resolution == (600, 448)
+    assert {module: sys.modules.get(module) for module in modules} == modules
+
+
+def test_prerender_gallery_errors(GPIO, spidev, smbus2, tmp_path):
+    """Missing images in a gallery file should be reported without stopping the rest."""
+    from inky.prerender import render
+
+    Image.new("RGB", (300, 200), (0, 0, 0)).save(tmp_path / "black.png")
+    gallery = tmp_path / "gallery.txt"
+    gallery.write_text("# comment\n{}\n\n{}\n".format(tmp_path / "missing.png", tmp_path / "black.png"))
+
+    from inky.prerender import find_sources
+
+    sources = find_sources(str(gallery))
+    assert len(sources) == 2
+
+    manifest = render(sources, str(tmp_path / "frames"), "what", colour="red", jobs=1)
+    missing, black = manifest["frames"]
+    assert "error" in missing
+    assert black["frame"] == "0001-black.inkyframe"
+    assert manifest["driver"] == "inky.what.InkyWHAT"
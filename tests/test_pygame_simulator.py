@@ -0,0 +1,146 @@
+"""Test the pygame simulator's display loop."""
+import threading
+import time
+
+
+def _drawn(pygame):
+    screen = pygame.display.set_mode.return_value
+    return [c.args[0] for c in screen.blit.call_args_list]
+
+
+def _record(update_display, delay):
+    owner = update_display.__self__
+    owner._drawn = []
+
+    def record(region):
+        time.sleep(delay)
+        owner._drawn.append(region)
+        update_display(region)
+
+    return record
+
+
+def test_simulator_frames_in_order(pygame):
+    """Test back-to-back frames are all drawn, in the order they were shown."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="red", resolution=(8, 4))
+    display._update_display = _record(display._update_display, delay=0)
+
+    for colour in (display.BLACK, display.RED, display.WHITE):
+        display.fill_rect(0, 0, 8, 4, colour)
+        display.show(busy_wait=False)
+    display.show()
+
+    frames = display._drawn
+    assert [int(frame[0, 0]) for frame in frames] == [display.BLACK, display.RED, display.WHITE, display.WHITE]
+    assert len(_drawn(pygame)) == 4
+
+
+def test_simulator_show_waits_for_its_frame(pygame):
+    """Test show() returns once its own frame has been drawn, not an earlier one."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="black", resolution=(8, 4))
+    display._update_display = _record(display._update_display, delay=0.05)
+
+    display.show(busy_wait=False)
+    display.show()
+    assert len(display._drawn) == 2
+
+
+def test_simulator_idle_without_frames(pygame):
+    """Test the display loop sleeps until there is an event, rather than polling."""
+    from inky.simulator import InkySimulator
+
+    InkySimulator(colour="black", resolution=(8, 4))
+    time.sleep(0.1)
+    assert pygame.display.flip.call_count == 0
+    assert pygame.event.queue.empty()
+
+
+def test_simulator_quit_releases_waiters(pygame):
+    """Test closing the window wakes anything waiting on it."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="black", resolution=(8, 4))
+    display.show()
+    threading.Timer(0.05, pygame.event.post, (pygame.event.Event(pygame.QUIT),)).start()
+    display.wait_for_window_close()
+    assert not display._running
+
+    # Frames shown after the window closed are dropped
+    display.show()
+
+
+
+def test_simulator_draws_palette_colours(pygame):
+    """Test frames are drawn in the display's colours into one surface reused between frames."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="red", resolution=(8, 4))
+    display.set_pixel(2, 1, display.RED)
+    display.show()
+    display.set_pixel(3, 1, display.BLACK)
+    display.show()
+
+    surface = _drawn(pygame)[-1]
+    assert surface.shape == (8, 4, 3)
+    assert tuple(surface[2, 1]) == (255, 0, 0)
+    assert tuple(surface[3, 1]) == (0, 0, 0)
+    assert tuple(surface[0, 0]) == (255, 255, 255)
+    assert pygame.Surface.call_count == 1
+
+
+def test_simulator_multi_palette(pygame):
+    """Test 7-colour displays are drawn with the blended palette."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="multi", resolution=(8, 4))
+    display.set_pixel(0, 0, display.GREEN)
+    display.show()
+
+    palette = display._palette_blend(0.5)
+    assert list(_drawn(pygame)[-1][0, 0]) == palette[display.GREEN * 3:display.GREEN * 3 + 3]
+
+
+def test_simulator_refresh_timing(pygame):
+    """Test a display type's refresh takes the modelled time, scaled by time_warp."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="red", resolution=(8, 4), display_type="phat", time_warp=100)
+    t_start = time.monotonic()
+    display.show()
+    elapsed = time.monotonic() - t_start
+
+    assert elapsed >= display.timing.show_seconds() / 100
+    assert elapsed < display.timing.show_seconds() / 10
+
+
+def test_simulator_untimed_by_default(pygame):
+    """Test the timing model is only used when a time_warp is given."""
+    from inky.factory import create_simulator_inky
+
+    display = create_simulator_inky("impressions73")
+    assert display.timing is None
+
+    t_start = time.monotonic()
+    display.show()
+    display.show()
+    assert time.monotonic() - t_start < 2.0
+
+
+def test_simulator_events_during_refresh(pygame):
+    """Test key presses are handled while a refresh is still waiting out its phases."""
+    from inky.simulator import InkySimulator
+
+    display = InkySimulator(colour="multi", resolution=(8, 4), display_type="impressions", time_warp=50)
+    pressed = []
+    display.register_button_handler("A", lambda button: pressed.append(display._rendered))
+
+    display.show(busy_wait=False)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    display.show()
+
+    assert pressed == [0]
+    assert display._rendered == 2
@@ -26,3 +26,41 @@ def test_inky_set_image(GPIO, spidev, smbus2, resolution):
     data[0] = 2
 
     assert phat.buf.flatten().tolist()[0:width] == data
+
+
+@pytest.mark.parametrize('driver', ['inky_uc8159', 'inky_ac073tc1a'])
+def test_7colour_set_image_reuses_palette(GPIO, spidev, smbus2, driver):
+    """The quantization palette should be built once per saturation."""
+    import importlib
+
+    from PIL import Image
+
+    display = importlib.import_module(f'inky.{driver}').Inky()
+    image = Image.new("RGB", display.resolution, (255, 0, 0))
+
+    display.set_image(image)
+    palette_image = display._palette_image(0.5)
+    display.set_image(image)
+
+    assert display._palette_image(0.5) is palette_image
+    assert display._palette_image(1.0) is not palette_image
+    assert (display.buf == display.RED).all()
+
+
+def test_7colour_set_image_lab_without_dither(GPIO, spidev, smbus2, tmpdir, monkeypatch):
+    """Perceptual matching with no dither method should map pixels to their nearest colour, not diffuse error."""
+    import numpy
+    from PIL import Image
+
+    from inky import dither
+    from inky.inky_uc8159 import Inky
+
+    monkeypatch.setenv("INKY_CACHE_DIR", str(tmpdir))
+    display = Inky()
+    rng = numpy.random.default_rng(1)
+    image = Image.fromarray(rng.integers(0, 256, size=(display.height, display.width, 3), dtype=numpy.uint8))
+
+    display.set_image(image, match="lab")
+
+    palette = display._palette_blend(0.5)[:7 * 3]
+    assert numpy.array_equal(display.buf, dither.dither(image, palette, "none", "lab"))
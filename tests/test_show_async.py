@@ -0,0 +1,123 @@
+"""Asyncio show tests for Inky."""
+import asyncio
+
+import pytest
+
+from tools import MockGPIORequest, MockSPIBus
+
+
+def _run(display, gpio, commands):
+    """Run show_async, releasing the busy line after a short delay."""
+    ticks = []
+
+    async def ticker():
+        # Only reached once show_async has yielded to the event loop
+        asyncio.get_running_loop().call_later(0.05, gpio.edge)
+        while gpio.busy:
+            ticks.append(len(commands))
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(display.show_async(), ticker())
+
+    asyncio.run(main())
+    return ticks
+
+
+def _record(display):
+    commands = []
+    send_command = display._send_command
+
+    def record(command, data=None):
+        commands.append(command)
+        send_command(command, data)
+
+    display._send_command = record
+    return commands
+
+
+def test_inky_show_async(GPIO, spidev, smbus2):
+    """The event loop should keep running while the display is busy."""
+    from inky.inky import Inky
+
+    gpio = MockGPIORequest()
+    display = Inky((400, 300), colour="red", spi_bus=MockSPIBus(), gpio=gpio)
+    commands = _record(display)
+
+    ticks = _run(display, gpio, commands)
+
+    assert len(ticks) > 1
+    assert 0x10 not in commands[:ticks[-1]]
+    assert commands[-1] == 0x10
+    assert display._reset_required
+
+
+@pytest.mark.parametrize('driver', ['inky_uc8159', 'inky_ac073tc1a'])
+def test_7colour_show_async(GPIO, spidev, smbus2, driver):
+    """Power off should only be sent once the refresh has completed."""
+    import importlib
+
+    module = importlib.import_module(f'inky.{driver}')
+    gpio = MockGPIORequest("RISING_EDGE")
+    display = module.Inky(spi_bus=MockSPIBus(), gpio=gpio)
+    display._reset_required = False
+    gpio.busy = False
+    commands = _record(display)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, gpio.edge)
+        await display.show_async()
+
+    asyncio.run(main())
+
+    assert commands.count(0x02) == 1
+    assert commands[-1] == 0x02
+
+
+def test_show_async_ignores_other_edges(GPIO, spidev, smbus2):
+    """Edges of the wrong type should not end the wait for the busy line."""
+    from inky.inky_ssd1683 import Inky
+
+    gpio = MockGPIORequest()
+    display = Inky(spi_bus=MockSPIBus(), gpio=gpio)
+    display._reset_required = False
+    finished = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.02, gpio.edge, False)
+        loop.call_later(0.1, lambda: finished.append(False) or gpio.edge())
+        await display.show_async()
+        finished.append(True)
+
+    asyncio.run(main())
+
+    assert finished == [False, True]
+
+
+def test_show_async_writes_off_event_loop(GPIO, spidev, smbus2):
+    """SPI writes should run in the executor, not on the event loop thread."""
+    import threading
+
+    from inky.inky_ssd1683 import Inky
+
+    gpio = MockGPIORequest()
+    display = Inky(spi_bus=MockSPIBus(), gpio=gpio)
+    display._reset_required = False
+    threads = set()
+    spi_write = display._spi_write
+
+    def record(dc, values):
+        threads.add(threading.current_thread())
+        spi_write(dc, values)
+
+    display._spi_write = record
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.05, gpio.edge)
+        await display.show_async()
+
+    asyncio.run(main())
+
+    assert threads and threading.main_thread() not in threads
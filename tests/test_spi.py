@@ -0,0 +1,206 @@
+"""SPI transport tests for Inky."""
+import pytest
+
+from tools import MockSPIBus, MockSPIBusLegacy
+
+
+@pytest.mark.parametrize('resolution', [(400, 300), (212, 104)])
+def test_inky_show_sends_packed_planes(GPIO, spidev, smbus2, resolution):
+    """Frame planes should be written as bytes, not lists of ints."""
+    from inky.inky import Inky
+
+    bus = MockSPIBus()
+    display = Inky(resolution, colour="red", spi_bus=bus)
+    display.set_pixel(0, 0, display.RED)
+    display.show()
+
+    width, height = resolution
+    buf_a, buf_b = bus.data()
+    assert len(buf_a) == len(buf_b) == width * height // 8
+    assert sum(buf_b) != 0
+
+
+def test_uc8159_show_sends_packed_nibbles(GPIO, spidev, smbus2):
+    """7-colour frames should pack two pixels per byte."""
+    from inky.inky_uc8159 import Inky
+
+    bus = MockSPIBus()
+    display = Inky(spi_bus=bus)
+    display.set_pixel(0, 0, display.GREEN)
+    display.set_pixel(1, 0, display.BLUE)
+    display.show()
+
+    frame = next(data for data in bus.data() if len(data) > 4)
+    assert len(frame) == 600 * 448 // 2
+    assert frame[0] == 0x23
+
+
+def test_ac073tc1a_show_replaces_clean(GPIO, spidev, smbus2):
+    """The 7.3" Impression should never be sent the clean colour."""
+    from inky.inky_ac073tc1a import Inky
+
+    bus = MockSPIBus()
+    display = Inky(spi_bus=bus)
+    display.set_pixel(0, 0, display.CLEAN)
+    display.set_pixel(3, 0, display.CLEAN)
+    display.show()
+
+    frame = next(data for data in bus.data() if len(data) > 4)
+    assert frame[0:2] == [0x10, 0x01]
+
+
+@pytest.mark.parametrize('driver', ['inky_uc8159', 'inky_ac073tc1a'])
+def test_spi_write_string(GPIO, spidev, smbus2, driver):
+    """Strings should be sent as the code of each character."""
+    import importlib
+
+    Inky = importlib.import_module(f"inky.{driver}").Inky
+
+    bus = MockSPIBus()
+    display = Inky(spi_bus=bus)
+    display.setup()
+    bus.transfers = []
+    display._spi_write(True, "AB")
+    assert bus.transfers == [("xfer3", [0x41, 0x42])]
+
+
+def test_spi_write_legacy_chunks(GPIO, spidev, smbus2):
+    """Without writebytes2 frames should be sent in 4096 byte chunks."""
+    from inky.inky_uc8159 import Inky
+
+    bus = MockSPIBusLegacy()
+    display = Inky(spi_bus=bus)
+    display.show()
+
+    chunks = [values for method, values in bus.transfers if len(values) == 4096]
+    assert len(chunks) == (600 * 448 // 2) // 4096
+
+
+@pytest.mark.parametrize('driver', ['inky_ssd1608', 'inky_ssd1683'])
+def test_ssd_windowed_writes(GPIO, spidev, smbus2, driver):
+    """Only the changed region of RAM should be sent after the first update."""
+    import importlib
+
+    Inky = importlib.import_module(f"inky.{driver}").Inky
+
+    bus = MockSPIBus()
+    display = Inky(spi_bus=bus)
+    display.set_windowed_writes(True, full_write_interval=2)
+    stride = display.cols // 8
+
+    display.show()
+    assert [len(data) for data in bus.data()] == [stride * display.rows] * 2
+
+    bus.transfers = []
+    display.set_pixel(10, 10, display.BLACK)
+    display.show()
+    assert [len(data) for data in bus.data()] == [1]
+
+    # Frames with nothing to write do not count towards the full write
+    bus.transfers = []
+    display.show()
+    display.show()
+    assert bus.data() == []
+
+    bus.transfers = []
+    display.set_pixel(20, 20, display.BLACK)
+    display.show()
+    assert [len(data) for data in bus.data()] == [1]
+
+    bus.transfers = []
+    display.show()
+    assert [len(data) for data in bus.data()] == [stride * display.rows] * 2
+
+    # The last frame is only kept while windowed writes are on
+    display.set_windowed_writes(False)
+    assert display._last_planes is None
+    display.show()
+    assert display._last_planes is None
+
+
+def test_inky_skips_unchanged_planes(GPIO, spidev, smbus2):
+    """Planes identical to the ones already in RAM should not be resent."""
+    from inky.inky import Inky
+
+    bus = MockSPIBus()
+    display = Inky((400, 300), colour="red", spi_bus=bus)
+    display.show(busy_wait=False)
+    assert len(bus.data()) == 2
+
+    bus.transfers = []
+    display.set_pixel(0, 0, display.BLACK)
+    display.show(busy_wait=False)
+    assert [len(data) for data in bus.data()] == [400 * 300 // 8]
+
+    bus.transfers = []
+    display.show(busy_wait=False)
+    assert bus.data() == []
+
+
+def test_inky_resends_planes_after_reset(GPIO, spidev, smbus2):
+    """Both planes should be sent after the reset that follows deep sleep."""
+    from inky.inky import Inky
+
+    bus = MockSPIBus()
+    display = Inky((400, 300), colour="red", spi_bus=bus)
+    display.show()
+
+    bus.transfers = []
+    display.show()
+    assert len(bus.data()) == 2
+
+
+def test_uc8159_registers_sent_once(GPIO, spidev, smbus2):
+    """Registers should only be resent when their value changes."""
+    from inky.inky_uc8159 import UC8159_CDI, UC8159_DRF, UC8159_DTM1, UC8159_POF, UC8159_PON, Inky
+
+    display = Inky(spi_bus=MockSPIBus())
+    send_command = display._send_command
+    commands = []
+
+    def record(command, data=None):
+        commands.append(command)
+        send_command(command, data)
+
+    display._send_command = record
+
+    display.show()
+    assert len(commands) > 4
+
+    del commands[:]
+    display.show()
+    assert commands == [UC8159_DTM1, UC8159_PON, UC8159_DRF, UC8159_POF]
+
+    del commands[:]
+    display.set_border(display.BLACK)
+    display.show()
+    assert commands == [UC8159_CDI, UC8159_DTM1, UC8159_PON, UC8159_DRF, UC8159_POF]
+
+
+@pytest.mark.parametrize('driver', ['inky_ssd1608', 'inky_ssd1683'])
+def test_ssd_show_waits_for_refresh(GPIO, spidev, smbus2, driver):
+    """A blocking show should wait out the whole refresh, a non-blocking one should leave it pending."""
+    import importlib
+
+    Inky = importlib.import_module(f"inky.{driver}").Inky
+
+    display = Inky(spi_bus=MockSPIBus())
+    busy_wait = display._busy_wait
+    timeouts = []
+
+    def record(timeout=5.0):
+        timeouts.append(timeout)
+        busy_wait(timeout)
+
+    display._busy_wait = record
+
+    display.show()
+    assert not display._refresh_pending
+    assert timeouts[-1] == 30.0
+
+    display.show(busy_wait=False)
+    assert display._refresh_pending
+
+    del timeouts[:]
+    display.show(busy_wait=False)
+    assert timeouts[0] == 30.0
@@ -0,0 +1,70 @@
+"""Test the display timing model."""
+import math
+import time
+
+import pytest
+
+
+def test_timing_phases():
+    """Test the phases of a show add up, with SPI time from the bus clock."""
+    from inky.timing import TimingModel
+
+    timing = TimingModel("impressions73")
+    phases = dict(timing.phases())
+    assert phases["transfer"] == pytest.approx(800 * 480 // 2 * 8 / 5000000)
+    assert phases["reset"] == 0
+    assert timing.show_seconds() == pytest.approx(sum(phases.values()))
+    assert timing.show_seconds(reset=True) > timing.show_seconds()
+    assert timing.refreshes_per_hour() == pytest.approx(3600 / timing.show_seconds())
+
+    # A faster bus only shortens the transfer
+    fast = TimingModel("impressions73", spi_speed_hz=20000000)
+    assert fast.transfer_seconds == pytest.approx(phases["transfer"] / 4)
+
+
+def test_timing_reset_each_show():
+    """Test drivers that deep sleep after a refresh pay for a reset every show."""
+    from inky.timing import TimingModel
+
+    assert dict(TimingModel("phat").phases())["reset"] > 0
+    assert dict(TimingModel("whatssd1683").phases())["reset"] == 0
+
+
+def test_timing_time_warp():
+    """Test time_warp scales the time run() waits."""
+    from inky.timing import TimingModel
+
+    timing = TimingModel("what", time_warp=1000)
+    t_start = time.monotonic()
+    timing.run()
+    elapsed = time.monotonic() - t_start
+    assert timing.show_seconds() / 1000 <= elapsed < timing.show_seconds() / 100
+
+    assert TimingModel("what", time_warp=2).real_seconds(3) == 1.5
+    assert TimingModel("what", time_warp=math.inf).real_seconds(3) == 0
+
+    t_start = time.monotonic()
+    TimingModel("impressions", time_warp=math.inf).run(reset=True)
+    assert time.monotonic() - t_start < 0.01
+
+
+def test_timing_invalid():
+    """Test unknown displays and time warps are rejected."""
+    from inky.timing import TimingModel
+
+    with pytest.raises(ValueError):
+        TimingModel("nope")
+
+    with pytest.raises(ValueError):
+        TimingModel("phat", time_warp=0)
+
+
+def test_timing_matches_emulator():
+    """Test the emulator holds busy through a refresh for as long as the model says."""
+    from inky.emulator import Emulator
+    from inky.timing import TIMINGS
+
+    for display_type in TIMINGS:
+        emulator = Emulator(display_type, time_scale=0)
+        assert emulator.controller.refresh_time == TIMINGS[display_type].refresh
+        emulator.close()
@@ -0,0 +1,117 @@
+"""Test SPI trace recording, analysis and replay."""
+from unittest import mock
+
+import numpy
+import pytest
+
+
+def _record(emulator, tmpdir, display_type, payload=False):
+    from inky.trace import TraceRecorder
+
+    board = emulator(display_type)
+    display = board.create()
+    display.fill_rect(0, 0, 20, 10, display.RED)
+    path = str(tmpdir.join("refresh.inkytrace"))
+    with TraceRecorder(display, path, payload=payload):
+        display.show()
+    return board, display, path
+
+
+def test_trace_record(emulator, tmpdir):
+    """Test every write and busy wait is recorded, and the driver is restored."""
+    from inky.trace import BUSY_WAIT, RESET, WRITE, Trace
+
+    board, display, path = _record(emulator, tmpdir, "phat")
+    trace = Trace.load(path)
+
+    assert trace.header["driver"] == "inky.phat.InkyPHAT"
+    assert trace.display_type() == "phat"
+    assert sum(record.length for record in trace.records if record.kind == WRITE) == board.stats.bytes
+    assert any(record.kind == BUSY_WAIT for record in trace.records)
+    assert trace.records[0].kind == RESET
+    # Data is only recorded by length
+    assert all(record.payload is None for record in trace.records if record.kind == WRITE and record.dc)
+    assert "_spi_write" not in display.__dict__
+    assert "setup" not in display.__dict__
+
+
+def test_trace_analyse(emulator, tmpdir):
+    """Test the analysis counts bytes per command."""
+    from inky.trace import Trace
+
+    board, _, path = _record(emulator, tmpdir, "impressions")
+    summary = Trace.load(path).analyse()
+
+    assert summary["bytes"] == board.stats.bytes
+    assert summary["commands"][0x10] == (1, 600 * 448 // 2)
+    assert summary["commands"][0x12] == (1, 0)
+    assert summary["busy_waits"] >= 3
+    assert summary["busy_timeouts"] == 0
+    assert summary["gaps"] == summary["writes"] - 1
+
+
+def test_trace_replay(emulator, tmpdir):
+    """Test a trace with payloads replays to the same panel contents."""
+    from inky.emulator import Emulator
+    from inky.trace import Trace, replay
+
+    board, display, path = _record(emulator, tmpdir, "whatssd1683", payload=True)
+
+    replayed = Emulator("whatssd1683", colour="red", time_scale=0)
+    replay(Trace.load(path), replayed)
+    replayed.close()
+
+    assert replayed.stats.bytes == board.stats.bytes
+    assert replayed.stats.refreshes == 1
+    assert numpy.array_equal(replayed.pixels(), numpy.asarray(display.buf))
+
+
+def test_trace_truncated(emulator, tmpdir):
+    """Test a trace cut short keeps its complete records."""
+    from inky.trace import Trace
+
+    _, _, path = _record(emulator, tmpdir, "phat")
+    records = len(Trace.load(path).records)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-5])
+
+    assert len(Trace.load(path).records) == records - 1
+
+
+def test_trace_record_closes_file_on_error(tmpdir):
+    """Test the trace file is closed if the display cannot be recorded."""
+    from inky.trace import TraceRecorder
+
+    path = str(tmpdir.join("refresh.inkytrace"))
+    with mock.patch("inky.trace.open", mock.mock_open(), create=True) as opened, pytest.raises(AttributeError):
+        TraceRecorder(object(), path)
+
+    opened.assert_called_once_with(path, "wb")
+    opened.return_value.close.assert_called_once_with()
+
+
+def test_trace_not_a_trace(tmpdir):
+    """Test other files are rejected."""
+    from inky.trace import Trace
+
+    path = tmpdir.join("frame.inkytrace")
+    path.write_binary(b"INKYFRM\x00" + bytes(16))
+    with pytest.raises(ValueError):
+        Trace.load(str(path))
+
+
+def test_trace_cli(emulator, tmpdir, capsys):
+    """Test the report and replay commands."""
+    from inky.trace import main
+
+    _, _, path = _record(emulator, tmpdir, "phat")
+
+    assert main(["report", path]) == 0
+    output = capsys.readouterr().out
+    assert "0x24" in output
+    assert "Busy waits" in output
+
+    assert main(["replay", "--repeat", "2", path]) == 0
+    assert "Replayed" in capsys.readouterr().out
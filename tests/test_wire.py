@@ -0,0 +1,102 @@
+"""Test the wire-accurate simulator."""
+import os
+import sys
+
+import numpy
+import pytest
+
+DISPLAY_TYPES = ["phat", "what", "phatssd1608", "whatssd1683", "impressions", "impressions73"]
+
+
+@pytest.fixture(scope='function', autouse=False)
+def wire():
+    """Create wire simulators with create_inky, and close them after the test."""
+    from inky.factory import create_inky
+
+    simulators = []
+
+    def create(display_type, colour="red", **kwargs):
+        display = create_inky(display_type, colour, simulation="wire", **kwargs)
+        simulators.append(display.wire)
+        return display
+
+    yield create
+    for simulator in simulators:
+        simulator.close()
+
+
+@pytest.mark.parametrize("display_type", DISPLAY_TYPES)
+def test_wire_renders_driver_output(wire, display_type):
+    """Test frames are decoded from the bytes the real driver sent."""
+    display = wire(display_type)
+    assert display.wire.image() is None
+
+    display.set_pixel(3, 20, display.BLACK)
+    display.set_pixel(4, 20, display.RED)
+    display.show()
+
+    assert display.wire.frames_shown == 1
+    assert display.wire.stats.refreshes == 1
+    assert numpy.array_equal(display.wire.pixels(), numpy.asarray(display.buf))
+    image = display.wire.image()
+    assert image.size == (display.width, display.height)
+    # Some panels show a window onto the buffer
+    panel = display.wire.emulator.panel
+    assert image.getpixel((4 - panel.offset_x, 20 - panel.offset_y)) == display.RED
+
+
+def test_wire_sink_and_fps(wire, tmpdir):
+    """Test each refresh is written to the sink and timed."""
+    path = str(tmpdir.join("frames"))
+    display = wire("what", sink=path, compact=True)
+    display.show()
+    display.fill_rect(0, 0, 10, 10, display.BLACK)
+    display.show()
+
+    assert sorted(os.listdir(path)) == ["frame-000001.png", "frame-000002.png"]
+    assert display.wire.fps > 0
+    assert display.wire.show_seconds > 0
+    assert display.wire.stats.bytes > 0
+
+
+def test_wire_close_restores_driver(wire):
+    """Test closing the simulator puts back the driver's show()."""
+    display = wire("phat")
+    display.wire.close()
+
+    assert "show" not in display.__dict__
+    assert not hasattr(display, "wire")
+
+
+def test_wire_unknown_display():
+    """Test unknown display types are rejected."""
+    from inky.factory import create_inky
+
+    with pytest.raises(ValueError):
+        create_inky("nope", simulation="wire")
+
+
+def test_wire_driver_imported_first(GPIO, wire):
+    """Test a driver imported before the emulator, as inky does on a Pi, is wired to the emulator and not the real lines."""
+    _, gpiodevice = GPIO
+    import inky.inky_uc8159  # noqa: F401
+
+    display = wire("impressions")
+    display.set_pixel(5, 5, display.RED)
+    display.show()
+
+    gpiodevice.find_chip_by_platform.assert_not_called()
+    assert display.wire.stats.refreshes == 1
+    assert display.wire.image().getpixel((5, 5)) == display.RED
+
+
+def test_wire_restores_modules(wire):
+    """Test the stand-in modules are only installed while the driver is created."""
+    names = ("gpiod", "gpiod.line", "gpiodevice", "gpiodevice.platform", "spidev", "smbus2")
+    modules = {name: sys.modules.get(name) for name in names}
+
+    display = wire("impressions73")
+    assert {name: sys.modules.get(name) for name in names} == modules
+
+    display.show()
+    assert display.wire.stats.refreshes == 1
@@ -1,4 +1,9 @@
 """Test hardware mocking tools."""
+import os
+import queue
+import sys
+import threading
+from types import SimpleNamespace
 
 
 class MockSMBus:
@@ -24,3 +29,122 @@ class MockSMBus:
     def read_i2c_block_data(self, i2c_address, register, length):
         """Read a block of i2c data bytes."""
         return self.regs[register:register + length]
+
+
+class MockSPIBusLegacy:
+    """Mock an old spidev.SpiDev instance with only xfer().
+
+    Records every transfer in self.transfers as (method, list of bytes).
+
+    """
+
+    def __init__(self):
+        """Initialize mock SPI bus."""
+        self.transfers = []
+        self.max_speed_hz = 0
+        self.no_cs = False
+
+    def open(self, bus, device):
+        """Open the bus, does nothing."""
+
+    def xfer(self, values):
+        """Transfer a chunk of at most 4096 bytes."""
+        assert isinstance(values, list)
+        assert len(values) <= 4096
+        self.transfers.append(("xfer", values))
+
+
+class MockSPIBus(MockSPIBusLegacy):
+    """Mock a spidev.SpiDev instance that supports xfer3() and writebytes2()."""
+
+    def xfer3(self, values):
+        """Transfer a list of bytes."""
+        assert isinstance(values, list)
+        self.transfers.append(("xfer3", values))
+
+    def writebytes2(self, values):
+        """Write a bytes-like object."""
+        assert isinstance(values, memoryview)
+        self.transfers.append(("writebytes2", values.tolist()))
+
+    def data(self):
+        """Return the payloads of all writebytes2() calls."""
+        return [values for method, values in self.transfers if method == "writebytes2"]
+
+
+class MockGPIORequest:
+    """Mock a gpiod line request whose busy line is raised until an edge is queued.
+
+    Edges are signalled through a pipe so the request has a real file descriptor
+    that an event loop can wait on.
+
+    """
+
+    def __init__(self, event_type="FALLING_EDGE"):
+        """Initialize mock line request.
+
+        :param event_type: name of the gpiod.EdgeEvent.Type that releases the busy line
+
+        """
+        self._active = sys.modules['gpiod.line'].Value.ACTIVE
+        self._event_type = getattr(sys.modules['gpiod'].EdgeEvent.Type, event_type)
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        self.fd = self._read_fd
+        self.busy = True
+
+    def set_value(self, pin, value):
+        """Set an output line, ignored."""
+
+    def get_value(self, pin):
+        """Read a line, active while the display is busy."""
+        return self._active if self.busy else None
+
+    def wait_edge_events(self, timeout):
+        """Return immediately so synchronous waits do not stall the tests."""
+        return True
+
+    def edge(self, release=True):
+        """Queue an edge event.
+
+        :param release: release the busy line, False queues an edge of the other type
+
+        """
+        if release:
+            self.busy = False
+        os.write(self._write_fd, b"\x01" if release else b"\x00")
+
+    def read_edge_events(self):
+        """Read the queued edge events."""
+        try:
+            edges = os.read(self._read_fd, 64)
+        except BlockingIOError:
+            return []
+        return [SimpleNamespace(event_type=self._event_type if release else None) for release in edges]
+
+
+class MockPygameEvents:
+    """Mock the pygame.event module with a real, blocking event queue."""
+
+    def __init__(self):
+        """Initialize an empty event queue."""
+        self.queue = queue.Queue()
+
+    def Event(self, type, **kwargs):
+        """Create an event."""
+        return SimpleNamespace(type=type, **kwargs)
+
+    def post(self, event):
+        """Queue an event."""
+        self.queue.put(event)
+
+    def wait(self, timeout=0):
+        """Block until there is an event."""
+        return self.queue.get()
+
+    def set_timer(self, event, millis, loops=0):
+        """Post an event once, after millis, as pygame.time.set_timer(event, millis, 1) does."""
+        if millis > 0:
+            timer = threading.Timer(millis / 1000.0, self.post, (self.Event(event),))
+            timer.daemon = True
+            timer.start()